@@ -1,4 +1,6 @@
 name: Bot Automation Workflows
+# Judul run = nama event; bot memakainya untuk menghitung run download yang aktif
+run-name: ${{ github.event.action }}
 
 on:
   repository_dispatch:
@@ -54,17 +56,36 @@ jobs:
       PAYLOAD_URL: ${{ github.event.client_payload.url }}
       PAYLOAD_SENDER: ${{ github.event.client_payload.sender }}
       PAYLOAD_MODE: ${{ github.event.client_payload.mode }}
+      # Isi 'profile: "1"' di payload untuk mengaktifkan cProfile + tracemalloc
+      BOT_PROFILE: ${{ github.event.client_payload.profile }}
       BOT_TOKEN: ${{ vars.BOT_TOKEN }}
       API_ID: ${{ vars.API_ID }}
       API_HASH: ${{ vars.API_HASH }}
       GOOGLE_CLIENT_ID: ${{ vars.CLIENT_ID }}
       GOOGLE_CLIENT_SECRET: ${{ vars.CLIENT_SECRET }}
       OWNER_ID: ${{ vars.OWNER_ID }}
+      # "playwright" = resolver async multi-halaman; kosong = Selenium
+      BROWSER_ENGINE: ${{ vars.BROWSER_ENGINE }}
       
     steps:
       
+      # Access token dari broker bot (opsional); upload.py memakainya tanpa refresh.
+      # Dibaca langsung dari file event dan di-mask sebelum masuk env, agar tidak
+      # pernah tercetak di header langkah maupun log
+      - name: Load Broker Access Token
+        if: env.PAYLOAD_MODE == 'gdrive' || env.PAYLOAD_MODE == 'both'
+        run: |
+            TOKEN=$(jq -r '.client_payload.access_token // empty' "$GITHUB_EVENT_PATH")
+            EXPIRY=$(jq -r '.client_payload.access_token_expiry // empty' "$GITHUB_EVENT_PATH")
+            if [ -n "$TOKEN" ]; then
+                echo "::add-mask::$TOKEN"
+                echo "DRIVE_ACCESS_TOKEN=$TOKEN" >> "$GITHUB_ENV"
+                echo "DRIVE_ACCESS_TOKEN_EXPIRY=$EXPIRY" >> "$GITHUB_ENV"
+            fi
+        shell: bash
+
       - name: Set Drive Refresh Token
-        if: env.PAYLOAD_MODE == 'gdrive'
+        if: env.PAYLOAD_MODE == 'gdrive' || env.PAYLOAD_MODE == 'both'
         run: |
             if [ "${{ env.PAYLOAD_SENDER }}" == "${{ env.OWNER_ID }}" ]; then
                 echo "DRIVE_REFRESH_TOKEN=${{ vars.DRIVE_REFRESH_TOKEN_OWNER }}" >> $GITHUB_ENV
@@ -90,24 +111,6 @@ jobs:
           sudo chown -R $USER:$USER /var/cache/apt
           sudo chown -R $USER:$USER /var/lib/apt
           chmod +x man-db-fast.sh && sh man-db-fast.sh
-      - name: Cache APT packages
-        if: contains(env.PAYLOAD_URL, 'mega.nz')
-        uses: actions/cache@v3
-        with:
-          path: |
-            /var/cache/apt/archives
-            /var/lib/apt/lists
-          key: ${{ runner.os }}-apt-megatools
-          restore-keys: |
-            ${{ runner.os }}-apt-
-
-      - name: Install megatools
-        if: contains(env.PAYLOAD_URL, 'mega.nz')
-        run: |
-          chmod +x man-db-fast.sh && ./man-db-fast.sh
-          sudo DEBIAN_FRONTEND=noninteractive apt-get update
-          sudo DEBIAN_FRONTEND=noninteractive apt-get install --no-install-recommends -y megatools
-          
       - name: Create YouTube cookies file from secret
         env:
           YOUTUBE_COOKIES_SECRET: ${{ secrets.YOUTUBE_COOKIES }}
@@ -139,12 +142,43 @@ jobs:
           else
             echo "Venv cache hit. Skipping pip install."
           fi
+
+      - name: Install Playwright Chromium
+        if: env.BROWSER_ENGINE == 'playwright'
+        run: python -m playwright install --with-deps chromium
           
 # -----------------------------------------------------------------------------
 # --- DOWNLOAD & UNGGAH ---
 # -----------------------------------------------------------------------------
 
+      - name: Restore Bot State Cache (host stats, index Drive)
+        uses: actions/cache/restore@v3
+        with:
+          path: |
+            ~/.cache/bot/host_stats.json
+            ~/.cache/bot/drive_index.json
+            ~/.cache/bot/resolutions.json
+          key: bot-state-${{ github.run_id }}
+          restore-keys: |
+            bot-state-
+
+      # Checkpoint unduhan per URL: job yang gagal/dibatalkan menyimpan data parsial,
+      # job berikutnya dengan URL yang sama melanjutkan dari sana
+      - name: Calculate Checkpoint Key
+        run: echo "CHECKPOINT_KEY=$(python -c 'import os; from checkpoint import checkpoint_key; print(checkpoint_key(os.environ["PAYLOAD_URL"]))')" >> $GITHUB_ENV
+        shell: bash
+
+      - name: Restore Download Checkpoint
+        uses: actions/cache/restore@v3
+        with:
+          path: ~/.cache/bot/checkpoints/${{ env.CHECKPOINT_KEY }}
+          key: checkpoint-${{ env.CHECKPOINT_KEY }}-${{ github.run_id }}
+          restore-keys: |
+            checkpoint-${{ env.CHECKPOINT_KEY }}-
+
       - name: Run Downloader Script
+        # Di bawah batas job (360 menit) agar langkah simpan checkpoint sempat jalan
+        timeout-minutes: 330
         run: python main.py
         env:
           OWNER_ID: ${{ env.PAYLOAD_SENDER }}
@@ -159,8 +193,13 @@ jobs:
             echo "Error: downloaded_filename.txt not found. Exiting."
             exit 1
           fi
-          FILE_NAME=$(cat downloaded_filename.txt | tr -d '\n')
-          echo "file_name=$FILE_NAME" >> $GITHUB_OUTPUT
+          # Satu nama file per baris (URL folder menghasilkan banyak file)
+          echo "file_count=$(grep -c . downloaded_filename.txt)" >> $GITHUB_OUTPUT
+          {
+            echo "file_name<<EOF_FILENAMES"
+            cat downloaded_filename.txt
+            echo "EOF_FILENAMES"
+          } >> $GITHUB_OUTPUT
         shell: bash
 
       - name : Upload to Telegram (telegram_upload.py) 🗣️
@@ -179,6 +218,24 @@ jobs:
           DRIVE_REFRESH_TOKEN: ${{ env.DRIVE_REFRESH_TOKEN }} 
           FILENAME: ${{ steps.get_filename.outputs.file_name }}
 
+      - name : Upload to Telegram + Google Drive (fanout_upload.py) 🔀
+        if: env.PAYLOAD_MODE == 'both'
+        run: python fanout_upload.py
+        shell: bash
+        env:
+          GH_TOKEN: ${{ vars.GH_PAT }}
+          DRIVE_REFRESH_TOKEN: ${{ env.DRIVE_REFRESH_TOKEN }}
+
+      - name: Upload Profiling Reports
+        if: always() && env.BOT_PROFILE != ''
+        uses: actions/upload-artifact@v4
+        with:
+          name: profiles-${{ github.run_id }}
+          path: |
+            profiles/
+            timings.jsonl
+          if-no-files-found: ignore
+
 # -----------------------------------------------------------------------------
 # ✅ REVISI: LANGKAH SAVE CACHE DENGAN if: always()
 # -----------------------------------------------------------------------------
@@ -191,6 +248,23 @@ jobs:
           key: ${{ runner.os }}-venv-${{ hashFiles('requirements.txt') }}
 
 
+      - name: Save Bot State Cache (Always)
+        uses: actions/cache/save@v3
+        if: always()
+        with:
+          path: |
+            ~/.cache/bot/host_stats.json
+            ~/.cache/bot/drive_index.json
+            ~/.cache/bot/resolutions.json
+          key: bot-state-${{ github.run_id }}
+
+      - name: Save Download Checkpoint (Failure)
+        uses: actions/cache/save@v3
+        if: (failure() || cancelled()) && env.CHECKPOINT_KEY != ''
+        with:
+          path: ~/.cache/bot/checkpoints/${{ env.CHECKPOINT_KEY }}
+          key: checkpoint-${{ env.CHECKPOINT_KEY }}-${{ github.run_id }}
+
       - name: Clean up apt cache
         run: |
           sudo rm -f /var/cache/apt/archives/lock
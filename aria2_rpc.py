@@ -0,0 +1,155 @@
+import os
+import time
+import atexit
+import socket
+import secrets
+import threading
+import subprocess
+import requests
+
+# =========================================================
+# KONSTANTA & KONFIGURASI ARIA2 RPC
+# =========================================================
+
+# "process" = satu aria2c per unduhan (default), "rpc" = satu daemon bersama via JSON-RPC
+ARIA2_MODE = os.environ.get("ARIA2_MODE", "process").lower()
+ARIA2_RPC_PORT = int(os.environ.get("ARIA2_RPC_PORT", "0"))  # 0 = pilih port kosong
+ARIA2_MAX_CONCURRENT = int(os.environ.get("ARIA2_MAX_CONCURRENT", "8"))
+# Batas kecepatan global semua unduhan di daemon (format aria2, mis. "50M"; "0" = tanpa batas)
+ARIA2_MAX_OVERALL_DOWNLOAD_LIMIT = os.environ.get("ARIA2_MAX_OVERALL_DOWNLOAD_LIMIT", "0")
+ARIA2_STARTUP_TIMEOUT = 10
+RPC_TIMEOUT = 10
+
+
+class Aria2RPCError(Exception):
+    pass
+
+# =========================================================
+# DAEMON ARIA2C
+# =========================================================
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Aria2Daemon:
+    """
+    Satu proses aria2c berumur panjang dengan RPC aktif (hanya localhost, pakai
+    secret acak). Unduhan dikirim lewat addUri; status (byte selesai, kecepatan,
+    error) dibaca persis lewat tellStatus, bukan ditebak dari ukuran file.
+    """
+
+    def __init__(self, port=ARIA2_RPC_PORT, max_concurrent=ARIA2_MAX_CONCURRENT,
+                 max_overall_download_limit=ARIA2_MAX_OVERALL_DOWNLOAD_LIMIT):
+        self.port = port or _free_port()
+        self.secret = secrets.token_hex(16)
+        self.max_concurrent = max_concurrent
+        self.max_overall_download_limit = max_overall_download_limit
+        self.url = f"http://127.0.0.1:{self.port}/jsonrpc"
+        self.process = None
+        self._session = requests.Session()
+        self._request_id = 0
+        self._id_lock = threading.Lock()
+
+    def start(self):
+        command = [
+            'aria2c', '--enable-rpc', '--rpc-listen-all=false', f'--rpc-listen-port={self.port}',
+            f'--rpc-secret={self.secret}', f'--max-concurrent-downloads={self.max_concurrent}',
+            f'--max-overall-download-limit={self.max_overall_download_limit}',
+            '--continue', '--allow-overwrite', '--async-dns=false', '--quiet=true',
+        ]
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + ARIA2_STARTUP_TIMEOUT
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise Aria2RPCError(f"aria2c daemon keluar saat start (kode {self.process.returncode}).")
+            try:
+                self.call("getVersion")
+                return self
+            except (requests.exceptions.RequestException, Aria2RPCError):
+                time.sleep(0.2)
+        self.stop()
+        raise Aria2RPCError("aria2c daemon tidak merespons RPC.")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            try:
+                # shutdown menyimpan file .aria2 unduhan aktif agar bisa dilanjutkan
+                self.call("shutdown")
+                self.process.wait(timeout=10)
+            except Exception:
+                self.process.kill()
+        self.process = None
+        self._session.close()
+
+    def call(self, method, *params):
+        with self._id_lock:
+            self._request_id += 1
+            request_id = self._request_id
+        payload = {
+            "jsonrpc": "2.0",
+            "id": str(request_id),
+            "method": f"aria2.{method}",
+            "params": [f"token:{self.secret}", *params],
+        }
+        response = self._session.post(self.url, json=payload, timeout=RPC_TIMEOUT)
+        data = response.json()
+        if "error" in data:
+            raise Aria2RPCError(f"{method}: {data['error'].get('message')}")
+        return data["result"]
+
+    # --- Operasi unduhan ---
+
+    def add_uri(self, uris, options=None, position=None):
+        """Menambah unduhan. Mengembalikan GID."""
+        params = [list(uris), options or {}]
+        if position is not None:
+            params.append(position)
+        return self.call("addUri", *params)
+
+    def tell_status(self, gid, keys=None):
+        if keys:
+            return self.call("tellStatus", gid, list(keys))
+        return self.call("tellStatus", gid)
+
+    def change_option(self, gid, options):
+        """
+        Mengubah opsi satu unduhan. Untuk split/max-connection-per-server aria2
+        memulai ulang unduhan tersebut (lanjut dari file .aria2), jadi statusnya
+        sempat kembali ke waiting; max-download-limit berlaku langsung.
+        """
+        return self.call("changeOption", gid, options)
+
+    def change_global_option(self, options):
+        """Mengubah opsi global (mis. max-overall-download-limit) untuk semua unduhan."""
+        return self.call("changeGlobalOption", options)
+
+    def remove(self, gid):
+        try:
+            return self.call("forceRemove", gid)
+        except Aria2RPCError:
+            # Unduhan sudah selesai/berhenti; cukup bersihkan hasilnya dari daftar
+            return None
+        finally:
+            try:
+                self.call("removeDownloadResult", gid)
+            except Aria2RPCError:
+                pass
+
+    def get_global_stat(self):
+        return self.call("getGlobalStat")
+
+
+_shared_daemon = None
+_shared_daemon_lock = threading.Lock()
+
+def get_shared_daemon():
+    """Daemon bersama per proses (dibuat saat pertama dipakai, dimatikan saat exit)."""
+    global _shared_daemon
+    with _shared_daemon_lock:
+        if _shared_daemon is None or _shared_daemon.process is None or _shared_daemon.process.poll() is not None:
+            _shared_daemon = Aria2Daemon().start()
+            atexit.register(_shared_daemon.stop)
+        return _shared_daemon
@@ -0,0 +1,357 @@
+import os
+import json
+import time
+import fcntl
+import itertools
+import threading
+
+# =========================================================
+# KONSTANTA & KONFIGURASI ALOKASI BANDWIDTH
+# =========================================================
+
+# "0" mematikan alokator (semua aliran tanpa batas)
+BANDWIDTH_ALLOCATOR = os.environ.get("BANDWIDTH_ALLOCATOR", "1") != "0"
+# Kapasitas link (byte/detik). 0 = diperkirakan dari throughput gabungan yang teramati
+BANDWIDTH_LIMIT = int(os.environ.get("BANDWIDTH_LIMIT", "0"))
+# State bersama semua proses di worker (downloader, upload.py, telegram_upload.py)
+BANDWIDTH_STATE_PATH = os.environ.get(
+    "BANDWIDTH_STATE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "bandwidth.json"),
+)
+# Bobot prioritas per jenis aliran: upload adalah langkah terakhir yang ditunggu
+# pengguna, jadi tidak boleh kalah oleh aria2c 16 koneksi
+BANDWIDTH_WEIGHTS = {
+    "upload": float(os.environ.get("BANDWIDTH_WEIGHT_UPLOAD", "2")),
+    "download": float(os.environ.get("BANDWIDTH_WEIGHT_DOWNLOAD", "1")),
+}
+# Interval minimum sinkronisasi dengan state bersama (detik)
+BANDWIDTH_SYNC_SECONDS = 1.0
+# Alokasi baru baru diterapkan jika berubah lebih dari fraksi ini (anti thrashing)
+BANDWIDTH_HYSTERESIS = float(os.environ.get("BANDWIDTH_HYSTERESIS", "0.2"))
+# Aliran yang memakai >= fraksi ini dari jatahnya dianggap masih ingin lebih
+BANDWIDTH_SATURATION = 0.9
+# Jatah aliran yang tidak jenuh = pemakaian x faktor ini (ruang untuk naik)
+BANDWIDTH_DEMAND_HEADROOM = 1.2
+# Jatah minimum aliran yang dibatasi (0 berarti tanpa batas, jadi tidak boleh dibulatkan ke 0)
+BANDWIDTH_MIN_RATE = 256 * 1024
+# Kapasitas perkiraan sedikit dilebihkan agar aliran jenuh bisa menemukan link yang lebih cepat
+BANDWIDTH_PROBE_FACTOR = 1.1
+# Perkiraan kapasitas meluruh per sinkronisasi (link yang melambat ikut terdeteksi)
+BANDWIDTH_CAPACITY_DECAY = 0.99
+# Aliran tanpa laporan selama ini (proses mati/macet) dihapus dari state
+BANDWIDTH_FLOW_TTL = 15
+# Mesin yang harus di-restart untuk mengganti batas (aria2c mode process) hanya
+# menerapkan alokasi baru paling sering sekali per interval ini, dan hanya jika
+# batasnya berubah minimal sebesar fraksi ini (restart memutus semua koneksi)
+BANDWIDTH_RESTART_SECONDS = int(os.environ.get("BANDWIDTH_RESTART_SECONDS", "120"))
+BANDWIDTH_RESTART_MIN_CHANGE = float(os.environ.get("BANDWIDTH_RESTART_MIN_CHANGE", "0.5"))
+# Token bucket pacing: ledakan maksimum = rate x detik ini
+BANDWIDTH_BURST_SECONDS = 1.0
+# Interval sinkron heartbeat untuk aliran yang lama di antara dua pace()
+# (chunk upload Drive besar, tidur pacing panjang); harus jauh di bawah TTL
+BANDWIDTH_HEARTBEAT_SECONDS = 5.0
+# Bobot sampel baru dalam rata-rata kecepatan (EMA)
+RATE_SMOOTHING = 0.5
+
+# =========================================================
+# ALOKASI WEIGHTED MAX-MIN (WATER-FILLING)
+# =========================================================
+
+def allocate(capacity, flows):
+    """
+    flows: {flow_id: (weight, demand)}; demand None = ingin sebanyak mungkin.
+    Aliran yang butuh kurang dari jatah berbobotnya mendapat kebutuhannya; sisa
+    kapasitas dibagi ulang ke aliran lain sesuai bobot (link tetap terpakai penuh).
+    """
+    allocations = {}
+    remaining = dict(flows)
+    while remaining:
+        total_weight = sum(weight for weight, _ in remaining.values()) or 1.0
+        share = max(capacity, 0.0) / total_weight
+        satisfied = {flow_id: demand for flow_id, (weight, demand) in remaining.items()
+                     if demand is not None and demand <= share * weight}
+        if not satisfied:
+            for flow_id, (weight, _) in remaining.items():
+                allocations[flow_id] = share * weight
+            break
+        for flow_id, demand in satisfied.items():
+            allocations[flow_id] = demand
+            capacity -= demand
+            del remaining[flow_id]
+    return allocations
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class BandwidthState:
+    """
+    File JSON bersama yang dikunci flock: {"capacity", "flows": {flow_id: {...}}}.
+    Setiap sync() menulis pemakaian aliran pemanggil, membuang aliran mati, lalu
+    menghitung ulang alokasi semua aliran sekaligus.
+    """
+
+    def __init__(self, path=BANDWIDTH_STATE_PATH, limit=BANDWIDTH_LIMIT):
+        self.path = path
+        self.limit = limit
+        self._lock = threading.Lock()
+
+    def _transaction(self, mutate):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    try:
+                        with open(self.path, "r") as f:
+                            state = json.load(f)
+                    except (OSError, ValueError):
+                        state = {}
+                    state.setdefault("capacity", 0)
+                    state.setdefault("flows", {})
+                    result = mutate(state)
+                    tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, "w") as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self.path)
+                    return result
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rebalance(self, state, now):
+        flows = state["flows"]
+        for flow_id in [fid for fid, f in flows.items()
+                        if now - f["updated"] > BANDWIDTH_FLOW_TTL or not _pid_alive(f["pid"])]:
+            del flows[flow_id]
+
+        observed = sum(f["rate"] for f in flows.values())
+        if self.limit:
+            state["capacity"] = self.limit
+        else:
+            state["capacity"] = max(observed, state["capacity"] * BANDWIDTH_CAPACITY_DECAY)
+        capacity = state["capacity"] if self.limit else state["capacity"] * BANDWIDTH_PROBE_FACTOR
+
+        # Satu aliran atau kapasitas belum diketahui: tidak ada yang perlu dibagi
+        if len(flows) < 2 or capacity <= 0:
+            for f in flows.values():
+                f["allocated"] = 0
+            return
+
+        demands = {}
+        for flow_id, f in flows.items():
+            saturated = not f["allocated"] or f["rate"] >= f["allocated"] * BANDWIDTH_SATURATION
+            demands[flow_id] = (f["weight"], None if saturated else max(f["rate"] * BANDWIDTH_DEMAND_HEADROOM, BANDWIDTH_MIN_RATE))
+        for flow_id, rate in allocate(capacity, demands).items():
+            current = flows[flow_id]["allocated"]
+            # Perubahan kecil diabaikan: aliran tidak terus-menerus di-retune
+            if not current or abs(rate - current) > current * BANDWIDTH_HYSTERESIS:
+                flows[flow_id]["allocated"] = max(int(rate), BANDWIDTH_MIN_RATE)
+
+    def sync(self, flow_id, name, kind, weight, rate):
+        """Mencatat pemakaian aliran lalu mengembalikan alokasinya (byte/detik, 0 = tanpa batas)."""
+        def mutate(state):
+            now = time.time()
+            entry = state["flows"].setdefault(flow_id, {"allocated": 0})
+            entry.update({"pid": os.getpid(), "name": name, "kind": kind, "weight": weight,
+                          "rate": rate, "updated": now})
+            self._rebalance(state, now)
+            return state["flows"].get(flow_id, {}).get("allocated", 0)
+        return self._transaction(mutate)
+
+    def remove(self, flow_id):
+        def mutate(state):
+            state["flows"].pop(flow_id, None)
+            self._rebalance(state, time.time())
+        self._transaction(mutate)
+
+    def snapshot(self):
+        """Salinan state: kapasitas dan alokasi semua aliran yang masih hidup."""
+        def mutate(state):
+            self._rebalance(state, time.time())
+            return json.loads(json.dumps(state))
+        return self._transaction(mutate)
+
+# =========================================================
+# ALIRAN (SATU UNDUHAN / UPLOAD)
+# =========================================================
+
+_flow_ids = itertools.count(1)
+
+
+def restart_worthwhile(applied_rate, rate):
+    """
+    Untuk mesin yang harus di-restart: apakah batas baru cukup berbeda dari yang
+    sedang berlaku? Memasang/melepas batas selalu dihitung perubahan besar.
+    """
+    if rate == applied_rate:
+        return False
+    if not rate or not applied_rate:
+        return True
+    return abs(rate - applied_rate) >= max(rate, applied_rate) * BANDWIDTH_RESTART_MIN_CHANGE
+
+
+class Flow:
+    """
+    Satu aliran transfer. update(done_bytes) melaporkan progres dan mengembalikan
+    batas kecepatan saat ini (untuk mesin yang membatasi sendiri, mis. aria2c);
+    pace(done_bytes) juga menahan pemanggil agar tidak melebihi batas itu.
+    """
+
+    def __init__(self, name, kind="download", weight=None, state=None):
+        self.name = name
+        self.kind = kind
+        self.weight = weight or BANDWIDTH_WEIGHTS.get(kind, 1.0)
+        self.state = state
+        self.flow_id = f"{os.getpid()}-{next(_flow_ids)}"
+        self.rate = 0
+        self.observed = 0.0
+        self._last_bytes = None
+        self._last_time = None
+        self._synced_at = 0
+        self._tokens = 0.0
+        self._tokens_at = time.monotonic()
+        self._paced_bytes = None
+        self._sync_lock = threading.Lock()
+        self._heartbeat = None
+        self._heartbeat_stop = threading.Event()
+
+    def _observe(self, done_bytes, now):
+        if self._last_bytes is None or done_bytes < self._last_bytes:
+            # Awal aliran atau penghitung byte mulai ulang (mis. format berikutnya yt-dlp)
+            self._last_bytes, self._last_time = done_bytes, now
+        elapsed = now - self._last_time
+        if elapsed >= BANDWIDTH_SYNC_SECONDS:
+            sample = (done_bytes - self._last_bytes) / elapsed
+            self.observed = sample if not self.observed else (
+                RATE_SMOOTHING * sample + (1 - RATE_SMOOTHING) * self.observed)
+            self._last_bytes, self._last_time = done_bytes, now
+
+    def update(self, done_bytes):
+        if not self.state:
+            return 0
+        now = time.monotonic()
+        self._observe(done_bytes, now)
+        if now - self._synced_at >= BANDWIDTH_SYNC_SECONDS:
+            self._sync(now)
+        return self.rate
+
+    def _sync(self, now):
+        # Kecepatan teramati terakhir dilaporkan apa adanya: heartbeat di tengah
+        # chunk tidak boleh membuat aliran tampak diam (lalu jatahnya diciutkan)
+        with self._sync_lock:
+            if not self.state:
+                return
+            self._synced_at = now
+            try:
+                self.rate = self.state.sync(self.flow_id, self.name, self.kind, self.weight, self.observed)
+            except OSError as e:
+                print(f"Peringatan: State bandwidth tidak bisa dibaca: {e}")
+                self.rate = 0
+
+    def start_heartbeat(self):
+        """
+        Sinkron berkala di thread terpisah, untuk transfer yang lama di antara dua
+        pace() (mis. satu chunk upload Drive 64 MB): tanpa ini aliran dihapus
+        setelah BANDWIDTH_FLOW_TTL dan jatahnya diambil aliran lain.
+        """
+        if not self.state or self._heartbeat:
+            return self
+
+        def beat():
+            while not self._heartbeat_stop.wait(BANDWIDTH_HEARTBEAT_SECONDS):
+                self._sync(time.monotonic())
+
+        self._heartbeat = threading.Thread(target=beat, daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def pace(self, done_bytes):
+        """Melaporkan progres dan tidur secukupnya agar kecepatan <= alokasi (token bucket)."""
+        rate = self.update(done_bytes)
+        now = time.monotonic()
+        previous = self._paced_bytes
+        self._paced_bytes = done_bytes
+        consumed = done_bytes - previous if previous is not None and done_bytes >= previous else 0
+        if not rate:
+            self._tokens, self._tokens_at = 0.0, now
+            return
+        # Byte satu laporan dikirim sepanjang selang sejak laporan sebelumnya, jadi
+        # token selang itu dihitung sebelum batas burst (chunk besar tidak dihukum dua kali)
+        self._tokens = min(rate * BANDWIDTH_BURST_SECONDS, self._tokens + (now - self._tokens_at) * rate - consumed)
+        self._tokens_at = now
+        # Tidur sampai utang token lunas, dipotong per heartbeat: aliran tetap
+        # tersinkron (tidak dihapus karena TTL) dan jatah baru langsung dipakai
+        while self._tokens < 0:
+            time.sleep(min(-self._tokens / rate, BANDWIDTH_HEARTBEAT_SECONDS))
+            now = time.monotonic()
+            self._tokens += (now - self._tokens_at) * rate
+            self._tokens_at = now
+            if self._tokens < 0:
+                self._sync(now)
+                rate = self.rate
+                if not rate:
+                    self._tokens = 0.0
+                    break
+
+    def close(self):
+        if self._heartbeat:
+            self._heartbeat_stop.set()
+            self._heartbeat.join(timeout=BANDWIDTH_HEARTBEAT_SECONDS)
+            self._heartbeat = None
+        with self._sync_lock:
+            state, self.state = self.state, None
+        if state:
+            try:
+                state.remove(self.flow_id)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+_default_state = None
+_default_state_lock = threading.Lock()
+
+def get_default_state():
+    global _default_state
+    with _default_state_lock:
+        if _default_state is None:
+            _default_state = BandwidthState()
+        return _default_state
+
+
+def open_flow(name, kind="download", weight=None):
+    """Aliran terdaftar di state bersama (atau aliran tanpa batas jika alokator dimatikan)."""
+    return Flow(name, kind, weight, state=get_default_state() if BANDWIDTH_ALLOCATOR else None)
+
+
+def allocations():
+    """Daftar alokasi saat ini: [{name, kind, weight, rate, allocated}] terurut per aliran."""
+    snapshot = get_default_state().snapshot()
+    return [dict(flow, flow_id=flow_id) for flow_id, flow in sorted(snapshot["flows"].items())]
+
+
+def describe_allocations():
+    from stall_watchdog import format_rate
+    snapshot = get_default_state().snapshot()
+    lines = [f"📶 Kapasitas: {format_rate(snapshot['capacity'])}"]
+    for flow in snapshot["flows"].values():
+        limit = format_rate(flow["allocated"]) if flow["allocated"] else "tanpa batas"
+        lines.append(f"  {flow['kind']:<8} {flow['name']}: {format_rate(flow['rate'])} (jatah {limit}, bobot {flow['weight']:g})")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(describe_allocations())
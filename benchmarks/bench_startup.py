@@ -0,0 +1,74 @@
+"""
+Mengukur waktu import tiap skrip dengan `python -X importtime` dan memastikan
+modul browser/video (Selenium, selenium_stealth, webdriver_manager, yt-dlp,
+pycryptodome) TIDAK ikut dimuat saat startup.
+
+Pemakaian:
+    python benchmarks/bench_startup.py [--max-ms 1500]
+Keluar dengan kode 1 jika ada skrip yang gagal di-import, modul berat yang
+ter-import, atau batas waktu terlampaui.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ("main", "upload", "telegram_upload")
+HEAVY_MODULES = ("selenium", "selenium_stealth", "webdriver_manager", "yt_dlp", "Crypto")
+
+# Format baris: "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+        env={**os.environ, "BOT_PROFILE": ""},
+    )
+    imported = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        imported[name] = int(match.group(2))
+        # Modul tingkat atas (indentasi 1 spasi) menjumlah total import
+        if len(match.group(3)) == 1:
+            total_us += int(match.group(2))
+    heavy = sorted({name.split(".")[0] for name in imported} & set(HEAVY_MODULES))
+    error = None
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ["unknown error"])[-1]
+    return {"total_ms": round(total_us / 1000, 1), "heavy_modules": heavy, "error": error}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-ms", type=float, default=0, help="Batas waktu import per skrip (0 = tanpa batas)")
+    args = parser.parse_args()
+
+    results = {script: measure(script) for script in SCRIPTS}
+    print(json.dumps(results, indent=2))
+
+    failures = []
+    for script, result in results.items():
+        # Skrip yang gagal di-import tidak membuktikan apa pun soal startup-nya
+        if result["error"]:
+            failures.append(f"{script}: gagal di-import ({result['error']})")
+        if result["heavy_modules"]:
+            failures.append(f"{script}: memuat {', '.join(result['heavy_modules'])} saat startup")
+        if args.max_ms and result["total_ms"] > args.max_ms:
+            failures.append(f"{script}: import {result['total_ms']} ms > {args.max_ms} ms")
+    if failures:
+        print("❌ " + "\n❌ ".join(failures))
+        sys.exit(1)
+    print("✅ Startup bersih dari modul browser/video.")
+
+
+if __name__ == "__main__":
+    main()
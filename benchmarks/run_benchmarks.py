@@ -0,0 +1,281 @@
+"""
+Benchmark offline end-to-end: download -> hash -> notifikasi -> upload, tanpa
+menyentuh layanan asli. Semua endpoint diarahkan ke server lokal di stubs.py.
+
+Pemakaian:
+    python benchmarks/run_benchmarks.py [--size-mb 64] [--rate-mbps 0]
+        [--output bench_results.json] [--baseline old.json --tolerance 0.2]
+
+Hasil (throughput, latensi, peak RSS) ditulis sebagai JSON. Dengan --baseline,
+skrip keluar dengan kode 1 jika throughput turun atau latensi naik melebihi
+toleransi, sehingga bisa dipakai sebagai gerbang regresi sebelum deploy.
+
+Catatan: telegram_upload.py mengunggah lewat MTProto (Pyrogram) yang tidak bisa
+digantikan server HTTP; untuk skrip itu hanya jalur notifikasinya yang diukur.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from stubs import FileServer, TelegramStub, DriveStub, MegaStub
+
+
+def peak_rss_mb():
+    """Peak RSS proses ini dan proses anak (aria2c) dalam MB (ru_maxrss = KB di Linux)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"self": round(own / 1024, 1), "children": round(children / 1024, 1)}
+
+
+def latency_summary(durations):
+    if not durations:
+        return None
+    ordered = sorted(durations)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def make_fixture(directory, name, size_mb):
+    path = os.path.join(directory, name)
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+    return path
+
+# =========================================================
+# SKENARIO
+# =========================================================
+
+def bench_download_aria2c(fixture_dir, work_dir, size_mb, rate_limit):
+    if not shutil.which("aria2c"):
+        return {"skipped": "aria2c tidak ditemukan di PATH"}
+    from utils import DownloaderBot
+
+    with FileServer(fixture_dir, rate_limit=rate_limit) as server:
+        with DownloaderBot(f"{server.base_url}/fixture.bin", work_dir=work_dir) as bot:
+            duration, filename = timed(bot._download_file_with_aria2c, [f"{server.base_url}/fixture.bin"], "fixture.bin")
+        if not filename:
+            return {"error": "aria2c gagal mengunduh fixture"}
+        return {
+            "seconds": round(duration, 3),
+            "throughput_mb_s": round(size_mb / duration, 2),
+            "server_requests": len(server.requests),
+        }
+
+
+def bench_download_mega(fixture_path, work_dir, size_mb, rate_limit):
+    try:
+        stub = MegaStub(fixture_path, rate_limit=rate_limit)
+    except ImportError as e:
+        return {"skipped": f"pycryptodome tidak tersedia: {e}"}
+    from mega_downloader import MegaDownloader
+
+    with stub:
+        downloader = MegaDownloader(stub.public_url, api_url=stub.api_url)
+        duration, path = timed(downloader.download, work_dir)
+        return {
+            "seconds": round(duration, 3),
+            "throughput_mb_s": round(size_mb / duration, 2),
+            "server_requests": len(stub.requests),
+            "output": os.path.basename(path),
+        }
+
+
+def bench_hash(path, size_mb):
+    # Jalur yang sama dengan upload: manifest segmen (MD5 + SHA-256 + MD5 per segmen)
+    from integrity import build_manifest, manifest_for
+
+    cold, manifest = timed(build_manifest, path)
+    warm, _ = timed(manifest_for, path)
+    return {
+        "cold_seconds": round(cold, 3),
+        "cold_throughput_mb_s": round(size_mb / cold, 2),
+        "cached_ms": round(warm * 1000, 3),
+        "md5": manifest.md5,
+    }
+
+
+def bench_notify(telegram, iterations):
+    from upload import send_telegram_message, edit_telegram_message
+
+    durations = []
+    for i in range(iterations):
+        duration, message_id = timed(send_telegram_message, f"bench {i}")
+        durations.append(duration)
+        duration, _ = timed(edit_telegram_message, message_id, f"bench {i} edit")
+        durations.append(duration)
+    return {"latency": latency_summary(durations), "messages": len(telegram.messages)}
+
+
+def bench_drive_upload(drive, path, size_mb):
+    import upload
+
+    auth_seconds, service = timed(upload.authenticate_google_drive)
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(path))
+    try:
+        upload_seconds, ok = timed(upload.upload_file_to_drive, service, os.path.basename(path))
+        # Upload kedua dengan isi sama harus kena dedup (tanpa transfer data)
+        files_before = len(drive.files)
+        dedup_seconds, dedup_ok = timed(upload.upload_file_to_drive, service, os.path.basename(path))
+    finally:
+        os.chdir(cwd)
+    return {
+        "auth_seconds": round(auth_seconds, 3),
+        "upload_seconds": round(upload_seconds, 3),
+        "throughput_mb_s": round(size_mb / upload_seconds, 2),
+        "verified": bool(ok),
+        "dedup_seconds": round(dedup_seconds, 3),
+        "dedup_hit": bool(dedup_ok) and len(drive.files) == files_before,
+        "token_requests": drive.token_requests,
+        "request_latency": latency_summary([r["duration"] for r in drive.requests]),
+    }
+
+def bench_drive_small_files(drive, work_dir, count, size_kb):
+    """Burst file kecil (mis. APK): multipart per file + izin publik dalam satu batch."""
+    import upload
+
+    names = []
+    for index in range(count):
+        name = f"small-{index}.apk"
+        with open(os.path.join(work_dir, name), "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+        names.append(name)
+    service = upload.authenticate_google_drive()
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    requests_before = len(drive.requests)
+    try:
+        publisher = upload.PublishBatch(service)
+        start = time.perf_counter()
+        ok = [upload.upload_file_to_drive(service, name, publisher) for name in names]
+        publisher.flush()
+        duration = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    drive_requests = drive.requests[requests_before:]
+    return {
+        "files": count,
+        "seconds": round(duration, 3),
+        "per_file_ms": round(duration / count * 1000, 2),
+        "verified": all(ok),
+        "drive_requests_per_file": round(len(drive_requests) / count, 2),
+        "batch_requests": sum(1 for r in drive_requests if r["path"].startswith("/batch/")),
+    }
+
+# =========================================================
+# REGRESI
+# =========================================================
+
+def find_regressions(results, baseline, tolerance):
+    """Membandingkan metrik throughput (lebih besar lebih baik) dan *_ms/seconds (lebih kecil lebih baik)."""
+    regressions = []
+
+    def walk(current, previous, prefix=""):
+        for key, value in current.items():
+            old = previous.get(key) if isinstance(previous, dict) else None
+            name = f"{prefix}{key}"
+            if isinstance(value, dict):
+                walk(value, old or {}, name + ".")
+            elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old > 0:
+                if "throughput" in key and value < old * (1 - tolerance):
+                    regressions.append(f"{name}: {old} -> {value}")
+                elif (key.endswith("_ms") or key.endswith("seconds")) and value > old * (1 + tolerance):
+                    regressions.append(f"{name}: {old} -> {value}")
+
+    walk(results, baseline)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--rate-mbps", type=float, default=0, help="Throttle per koneksi (MB/s), 0 = tanpa batas")
+    parser.add_argument("--notify-iterations", type=int, default=20)
+    parser.add_argument("--small-files", type=int, default=20, help="Jumlah file kecil untuk skenario burst upload")
+    parser.add_argument("--small-file-kb", type=int, default=512)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    fixture_dir = os.path.join(scratch, "fixtures")
+    os.makedirs(fixture_dir)
+    fixture = make_fixture(fixture_dir, "fixture.bin", args.size_mb)
+    rate_limit = int(args.rate_mbps * 1024 * 1024)
+
+    telegram = TelegramStub().start()
+    drive = DriveStub().start()
+    # Konfigurasi modul dibaca saat import, jadi env harus di-set sebelum import pertama
+    os.environ.update({
+        "TELEGRAM_API_URL": telegram.base_url,
+        "BOT_TOKEN": "bench-token",
+        "PAYLOAD_SENDER": "1",
+        "OWNER_ID": "1",
+        "GOOGLE_CLIENT_ID": "bench-client",
+        "GOOGLE_CLIENT_SECRET": "bench-secret",
+        "DRIVE_REFRESH_TOKEN": "bench-refresh",
+        "GOOGLE_TOKEN_URI": drive.token_uri,
+        "DRIVE_API_ENDPOINT": drive.api_endpoint,
+        "DRIVE_TOKEN_CACHE": os.path.join(scratch, "drive_token.json"),
+        "DIGEST_CACHE_PATH": os.path.join(scratch, "digests.json"),
+        "DRIVE_INDEX_PATH": os.path.join(scratch, "drive_index.json"),
+    })
+
+    results = {"size_mb": args.size_mb, "rate_mbps": args.rate_mbps}
+    try:
+        for name, func in (
+            ("download_aria2c", lambda: bench_download_aria2c(fixture_dir, os.path.join(scratch, "aria2c"), args.size_mb, rate_limit)),
+            ("download_mega", lambda: bench_download_mega(fixture, os.path.join(scratch, "mega"), args.size_mb, rate_limit)),
+            ("hash", lambda: bench_hash(fixture, args.size_mb)),
+            ("notify", lambda: bench_notify(telegram, args.notify_iterations)),
+            ("drive_upload", lambda: bench_drive_upload(drive, fixture, args.size_mb)),
+            ("drive_small_files", lambda: bench_drive_small_files(drive, os.path.join(scratch, "files"), args.small_files, args.small_file_kb)),
+        ):
+            os.makedirs(os.path.join(scratch, name.split("_")[-1]), exist_ok=True)
+            try:
+                results[name] = func()
+            except ImportError as e:
+                results[name] = {"skipped": f"dependensi tidak tersedia: {e}"}
+        results["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        telegram.stop()
+        drive.stop()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ Regresi terdeteksi:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("✅ Tidak ada regresi dibanding baseline.")
+
+
+if __name__ == "__main__":
+    main()
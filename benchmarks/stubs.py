@@ -0,0 +1,400 @@
+"""
+Server lokal pengganti layanan eksternal untuk benchmark offline:
+
+- FileServer   : file host dengan dukungan Range/HEAD dan throttle per koneksi.
+- TelegramStub : Bot API palsu (sendMessage / editMessageText).
+- DriveStub    : token endpoint + Drive v3 (files, permissions) + upload resumable/multipart + batch.
+- MegaStub     : API MEGA + endpoint download terenkripsi dari fixture lokal.
+
+Semua server berjalan di thread sendiri (ThreadingHTTPServer) pada 127.0.0.1.
+"""
+import os
+import re
+import json
+import time
+import base64
+import struct
+import hashlib
+import threading
+import itertools
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class _StubServer:
+    """Dasar: menjalankan handler di thread background dan mencatat latensi request."""
+
+    def __init__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self):
+                start = time.perf_counter()
+                try:
+                    stub.handle(self)
+                finally:
+                    stub.record(self.command, self.path, time.perf_counter() - start)
+
+            do_GET = do_POST = do_PUT = do_HEAD = _dispatch
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.requests = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def record(self, method, path, duration):
+        with self._lock:
+            self.requests.append({"method": method, "path": path, "duration": duration})
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def read_body(handler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        return handler.rfile.read(length) if length else b""
+
+    @staticmethod
+    def send_json(handler, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=UTF-8")
+        handler.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        if handler.command != "HEAD":
+            handler.wfile.write(body)
+
+    def handle(self, handler):
+        raise NotImplementedError
+
+# =========================================================
+# FILE HOST (RANGE + THROTTLE)
+# =========================================================
+
+class FileServer(_StubServer):
+    """Menyajikan file dari direktori; rate_limit = byte/detik per koneksi (0 = tanpa batas)."""
+
+    def __init__(self, root_dir, rate_limit=0, latency=0.0):
+        super().__init__()
+        self.root_dir = root_dir
+        self.rate_limit = rate_limit
+        self.latency = latency
+
+    def _send_throttled(self, handler, f, length):
+        block = 64 * 1024
+        start = time.perf_counter()
+        sent = 0
+        while sent < length:
+            data = f.read(min(block, length - sent))
+            if not data:
+                break
+            handler.wfile.write(data)
+            sent += len(data)
+            if self.rate_limit:
+                expected = sent / self.rate_limit
+                elapsed = time.perf_counter() - start
+                if expected > elapsed:
+                    time.sleep(expected - elapsed)
+
+    def handle(self, handler):
+        if self.latency:
+            time.sleep(self.latency)
+        name = os.path.basename(urlparse(handler.path).path)
+        path = os.path.join(self.root_dir, name)
+        if not name or not os.path.isfile(path):
+            self.send_json(handler, {"error": "not found"}, status=404)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+        range_header = handler.headers.get("Range")
+        match = re.match(r"bytes=(\d*)-(\d*)", range_header or "")
+        if match:
+            if match.group(1):
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else size - 1
+            else:
+                start = size - int(match.group(2))
+            end = min(end, size - 1)
+            status = 206
+        handler.send_response(status)
+        handler.send_header("Content-Length", str(end - start + 1))
+        handler.send_header("Accept-Ranges", "bytes")
+        handler.send_header("Content-Disposition", f'attachment; filename="{name}"')
+        handler.send_header("Last-Modified", time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(os.path.getmtime(path))))
+        if status == 206:
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        handler.end_headers()
+        if handler.command == "HEAD":
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            self._send_throttled(handler, f, end - start + 1)
+
+# =========================================================
+# TELEGRAM BOT API
+# =========================================================
+
+class TelegramStub(_StubServer):
+    """Bot API palsu: setiap sendMessage mendapat message_id baru, semua pesan dicatat."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self._ids = itertools.count(1)
+
+    def handle(self, handler):
+        body = self.read_body(handler)
+        method = urlparse(handler.path).path.rsplit("/", 1)[-1]
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {}
+        self.messages.append({"method": method, "text": payload.get("text")})
+        if method == "sendMessage":
+            self.send_json(handler, {"ok": True, "result": {"message_id": next(self._ids)}})
+        else:
+            self.send_json(handler, {"ok": True, "result": True})
+
+# =========================================================
+# GOOGLE DRIVE (TOKEN + FILES + RESUMABLE UPLOAD)
+# =========================================================
+
+class DriveStub(_StubServer):
+    """
+    Meniru subset Drive v3 yang dipakai upload.py. Endpoint yang dipakai klien:
+    token_uri = {base_url}/token, api_endpoint = {base_url}/drive/v3/.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.files = {}
+        self.sessions = {}
+        self.token_requests = 0
+        self._ids = itertools.count(1)
+
+    @property
+    def token_uri(self):
+        return f"{self.base_url}/token"
+
+    @property
+    def api_endpoint(self):
+        return f"{self.base_url}/drive/v3/"
+
+    def _new_file(self, metadata, md5=None, size=0):
+        file_id = f"file{next(self._ids)}"
+        self.files[file_id] = {
+            "id": file_id,
+            "name": metadata.get("name"),
+            "mimeType": metadata.get("mimeType", "application/octet-stream"),
+            "parents": metadata.get("parents", []),
+            "md5Checksum": md5,
+            "size": str(size),
+            "webViewLink": f"{self.base_url}/view/{file_id}",
+            "webContentLink": f"{self.base_url}/download/{file_id}",
+        }
+        return self.files[file_id]
+
+    def handle(self, handler):
+        parsed = urlparse(handler.path)
+        path, query = parsed.path, parse_qs(parsed.query)
+        body = self.read_body(handler)
+
+        if path == "/token":
+            self.token_requests += 1
+            self.send_json(handler, {"access_token": f"stub-token-{self.token_requests}", "expires_in": 3600})
+        elif path == "/upload/drive/v3/files" and "upload_id" in query:
+            self._handle_upload_chunk(handler, query["upload_id"][0], body)
+        elif path == "/upload/drive/v3/files" and query.get("uploadType", [""])[0] == "multipart":
+            metadata, media = self._split_multipart(handler.headers.get("Content-Type", ""), body)
+            self.send_json(handler, self._new_file(metadata, md5=hashlib.md5(media).hexdigest(), size=len(media)))
+        elif path == "/upload/drive/v3/files":
+            metadata = json.loads(body or b"{}")
+            if query.get("uploadType", [""])[0] == "resumable":
+                upload_id = f"up{next(self._ids)}"
+                self.sessions[upload_id] = {"metadata": metadata, "md5": hashlib.md5(), "received": 0}
+                location = f"{self.base_url}/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+                self.send_json(handler, {}, headers={"Location": location})
+            else:
+                self.send_json(handler, self._new_file(metadata), status=200)
+        elif path == "/batch/drive/v3":
+            self._handle_batch(handler, body)
+        elif path == "/drive/v3/files" and handler.command == "GET":
+            self.send_json(handler, {"files": self._query_files(query.get("q", [""])[0])})
+        elif path == "/drive/v3/files" and handler.command == "POST":
+            self.send_json(handler, self._new_file(json.loads(body or b"{}")))
+        elif re.match(r"^/drive/v3/files/[^/]+/copy$", path):
+            source = self.files.get(path.split("/")[-2])
+            if not source:
+                self.send_json(handler, {"error": {"code": 404, "message": "File not found"}}, status=404)
+                return
+            metadata = {**source, **json.loads(body or b"{}")}
+            self.send_json(handler, self._new_file(metadata, md5=source["md5Checksum"], size=int(source["size"])))
+        elif re.match(r"^/drive/v3/files/[^/]+/permissions$", path):
+            self.send_json(handler, {"id": "anyoneWithLink"})
+        elif re.match(r"^/drive/v3/files/[^/]+$", path):
+            file_id = path.rsplit("/", 1)[-1]
+            if file_id in self.files:
+                self.send_json(handler, self.files[file_id])
+            else:
+                self.send_json(handler, {"error": {"code": 404, "message": "File not found"}}, status=404)
+        else:
+            self.send_json(handler, {"error": {"code": 404, "message": path}}, status=404)
+
+    @staticmethod
+    def _boundary(content_type):
+        return re.search(r'boundary="?([^";]+)"?', content_type).group(1).encode()
+
+    def _split_multipart(self, content_type, body):
+        """multipart/related upload: bagian pertama metadata JSON, bagian kedua isi file (biner)."""
+        # googleapiclient menulis body dengan generator email (baris baru "\n")
+        sections = []
+        for part in body.split(b"--" + self._boundary(content_type))[1:-1]:
+            _, _, content = part.partition(b"\n\n")
+            # Baris baru sebelum boundary berikutnya milik pembatas, bukan isi
+            sections.append(content[:-1])
+        return json.loads(sections[0] or b"{}"), sections[1] if len(sections) > 1 else b""
+
+    def _batch_response(self, method, path):
+        """Sub-request batch yang dipakai upload.py: izin publik dan files.get."""
+        if method == "POST" and re.match(r"^/drive/v3/files/[^/]+/permissions$", path):
+            return 200, {"id": "anyoneWithLink"}
+        file_id = path.rsplit("/", 1)[-1]
+        if method == "GET" and file_id in self.files:
+            return 200, self.files[file_id]
+        return 404, {"error": {"code": 404, "message": path}}
+
+    def _handle_batch(self, handler, body):
+        """multipart/mixed berisi request HTTP; setiap respons membawa Content-ID 'response-<id>'."""
+        boundary = self._boundary(handler.headers.get("Content-Type", ""))
+        out_boundary = "batch_stub_boundary"
+        chunks = []
+        for part in body.split(b"--" + boundary)[1:-1]:
+            headers, _, http_request = part.strip().replace(b"\r\n", b"\n").partition(b"\n\n")
+            content_id = re.search(rb"Content-ID: <([^>]+)>", headers, re.I).group(1).decode()
+            method, target = http_request.split(b"\n", 1)[0].decode().split(" ")[:2]
+            status, payload = self._batch_response(method, urlparse(target).path)
+            chunks.append(
+                f"--{out_boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        response = ("".join(chunks) + f"--{out_boundary}--\r\n").encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", f"multipart/mixed; boundary={out_boundary}")
+        handler.send_header("Content-Length", str(len(response)))
+        handler.end_headers()
+        handler.wfile.write(response)
+
+    def _query_files(self, q):
+        name = re.search(r"name='([^']*)'", q)
+        parent = re.search(r"'([^']*)' in parents", q)
+        folder_only = "mimeType='application/vnd.google-apps.folder'" in q
+        no_folders = "mimeType!='application/vnd.google-apps.folder'" in q
+        results = []
+        for entry in self.files.values():
+            if name and entry["name"] != name.group(1):
+                continue
+            if parent and parent.group(1) not in entry["parents"]:
+                continue
+            is_folder = entry["mimeType"] == "application/vnd.google-apps.folder"
+            if folder_only and not is_folder or no_folders and is_folder:
+                continue
+            results.append(entry)
+        return results
+
+    def _handle_upload_chunk(self, handler, upload_id, body):
+        session = self.sessions[upload_id]
+        content_range = handler.headers.get("Content-Range", "")
+        match = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", content_range)
+        if body:
+            session["md5"].update(body)
+            session["received"] += len(body)
+        total = match.group(3) if match else str(session["received"])
+        if total != "*" and session["received"] >= int(total):
+            entry = self._new_file(session["metadata"], md5=session["md5"].hexdigest(), size=session["received"])
+            self.send_json(handler, entry)
+        else:
+            handler.send_response(308)
+            handler.send_header("Range", f"bytes=0-{session['received'] - 1}")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+
+# =========================================================
+# MEGA (API + DOWNLOAD TERENKRIPSI)
+# =========================================================
+
+class MegaStub(_StubServer):
+    """
+    Mengenkripsi fixture dengan skema MEGA (AES-CTR + CBC-MAC) dan menyajikan
+    API 'g' serta endpoint download {g}/{start}-{end}. Butuh pycryptodome.
+    """
+
+    def __init__(self, fixture_path, rate_limit=0):
+        super().__init__()
+        from Crypto.Cipher import AES
+        from mega_downloader import get_chunks, chunk_mac, condense_macs
+
+        with open(fixture_path, "rb") as f:
+            plain = f.read()
+        words = struct.unpack(">6I", os.urandom(24))
+        aes_key = struct.pack(">4I", *words[:4])
+        nonce = struct.pack(">2I", words[4], words[5])
+        macs = [chunk_mac(aes_key, nonce, plain[s:s + n]) for s, n in get_chunks(len(plain))]
+        meta = condense_macs(aes_key, macs)
+        key = (words[0] ^ words[4], words[1] ^ words[5], words[2] ^ meta[0], words[3] ^ meta[1],
+               words[4], words[5], meta[0], meta[1])
+        self.key_string = base64.urlsafe_b64encode(struct.pack(">8I", *key)).decode().rstrip("=")
+        self.encrypted = AES.new(aes_key, AES.MODE_CTR, nonce=nonce, initial_value=0).encrypt(plain)
+        attributes = b"MEGA" + json.dumps({"n": os.path.basename(fixture_path)}).encode()
+        attributes += b"\0" * (-len(attributes) % 16)
+        self.attributes = base64.urlsafe_b64encode(
+            AES.new(aes_key, AES.MODE_CBC, iv=bytes(16)).encrypt(attributes)).decode().rstrip("=")
+        self.rate_limit = rate_limit
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/cs"
+
+    @property
+    def public_url(self):
+        return f"https://mega.nz/file/STUBFILE#{self.key_string}"
+
+    def handle(self, handler):
+        if handler.command == "POST":
+            self.read_body(handler)
+            self.send_json(handler, [{"s": len(self.encrypted), "at": self.attributes, "g": f"{self.base_url}/dl"}])
+            return
+        start, end = (int(v) for v in handler.path.rsplit("/", 1)[-1].split("-"))
+        data = self.encrypted[start:end + 1]
+        handler.send_response(200)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        if self.rate_limit:
+            time.sleep(len(data) / self.rate_limit)
+        handler.wfile.write(data)
@@ -1,11 +1,14 @@
 import os
 import re
+import asyncio
 import requests
 import threading
 from pyrogram import Client, filters
 from dotenv import load_dotenv
 from flask import Flask, jsonify, request 
 from pyrogram.enums import ParseMode
+from scheduler import FairScheduler, Job, QueueFullError
+from token_broker import TokenBroker
 # Muat variabel dari file .env
 load_dotenv()
 
@@ -27,6 +30,14 @@ GITHUB_REPO_NAME = os.environ.get("GITHUB_REPO_NAME") or "sonto"
 GITHUB_EVENT_AUTH_INIT = "new_url_received" 
 GITHUB_EVENT_TOKEN_RECEIVED = "refresh_token_received" 
 SCOPE = "https://www.googleapis.com/auth/drive" # Scope OAuth
+# Refresh token owner (sama dengan vars.DRIVE_REFRESH_TOKEN_OWNER di workflow), opsional
+OWNER_ID = os.environ.get("OWNER_ID")
+DRIVE_REFRESH_TOKEN_OWNER = os.environ.get("DRIVE_REFRESH_TOKEN_OWNER")
+# Tujuan unggah per job (mode di payload). Pengguna bisa menulis tujuan di depan
+# link, mis. "telegram https://..."; tanpa itu dipakai DISPATCH_MODE
+UPLOAD_MODES = ("telegram", "gdrive", "both")
+DRIVE_UPLOAD_MODES = ("gdrive", "both")
+DISPATCH_MODE = os.environ.get("DISPATCH_MODE", "gdrive").strip().lower()
 
 # Inisialisasi bot Pyrogram
 pyrogram_app = Client(
@@ -39,6 +50,11 @@ pyrogram_app = Client(
 # Inisialisasi aplikasi Flask
 flask_app = Flask(__name__)
 
+# Access token per pengguna di-cache di bot dan dikirim di payload dispatch
+token_broker = TokenBroker(CLIENT_ID, CLIENT_SECRET)
+if OWNER_ID and DRIVE_REFRESH_TOKEN_OWNER and not token_broker.has_user(OWNER_ID):
+    token_broker.register(OWNER_ID, DRIVE_REFRESH_TOKEN_OWNER)
+
 # --- Fungsi Bantu: Menjalankan Flask ---
 def run_flask():
     flask_app.run(host="0.0.0.0", port=8000)
@@ -74,12 +90,84 @@ async def send_to_github_actions(message, url_or_command_text, extra_payload=Non
 
         if response.status_code == 204:
             await message.reply_text("📥 Memicu alur download.")
-        else:
-            await message.reply_text(
-                f"❌ Gagal mengirim ke GitHub Actions. Status: {response.status_code}\nRespons: {response.text}"
-            )
+            return True
+        await message.reply_text(
+            f"❌ Gagal mengirim ke GitHub Actions. Status: {response.status_code}\nRespons: {response.text}"
+        )
     except Exception as e:
         await message.reply_text(f"Terjadi kesalahan: {e}")
+    return False
+
+
+def split_upload_target(text):
+    """Memisahkan tujuan unggah opsional di depan link: (mode, url)."""
+    head, _, rest = text.strip().partition(" ")
+    if head.lower() in UPLOAD_MODES and rest.strip():
+        return head.lower(), rest.strip()
+    return DISPATCH_MODE, text
+
+
+# --- PENJADWALAN: ANTREAN ADIL PER PENGGUNA + BATAS GLOBAL ---
+# Status run yang masih memakai (atau akan memakai) slot runner
+ACTIVE_RUN_STATUSES = ("queued", "in_progress", "waiting", "pending", "requested")
+
+def count_active_github_runs():
+    """
+    Jumlah run download (event new_url_received) yang sedang antre/berjalan di
+    GitHub Actions. Run penyimpanan token (refresh_token_received) tidak dihitung;
+    keduanya dibedakan lewat run-name workflow (= nama event).
+    """
+    headers = {
+        "Accept": "application/vnd.github.v3+json",
+        "Authorization": f"token {GITHUB_TOKEN}",
+    }
+    total = 0
+    for status in ACTIVE_RUN_STATUSES:
+        response = requests.get(
+            f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/actions/runs",
+            headers=headers,
+            params={"event": "repository_dispatch", "status": status, "per_page": 100},
+            timeout=10
+        )
+        response.raise_for_status()
+        runs = response.json().get("workflow_runs", [])
+        total += sum(1 for run in runs if run.get("display_title") == GITHUB_EVENT_AUTH_INIT)
+    return total
+
+
+scheduler = FairScheduler(count_active_runs=count_active_github_runs)
+
+
+def queue_position_text(position):
+    return f"🕒 Masuk antrean, posisi #{position}. Link akan diproses otomatis saat giliran Anda."
+
+
+async def update_queue_positions():
+    """Memperbarui pesan posisi antrean yang berubah setelah ada job di-dispatch."""
+    for job, position in scheduler.queued_positions():
+        if job.status_message is None or position == job.position:
+            continue
+        job.position = position
+        try:
+            await job.status_message.edit_text(queue_position_text(position))
+        except Exception as e:
+            print(f"Gagal memperbarui posisi antrean: {e}")
+
+
+async def dispatch_job(job):
+    extra_payload = {"mode": job.mode} if job.mode else {}
+    # Access token hanya ikut di payload bila job ini memang mengunggah ke Drive
+    if job.mode in DRIVE_UPLOAD_MODES:
+        loop = asyncio.get_event_loop()
+        extra_payload.update(await loop.run_in_executor(None, token_broker.dispatch_payload, job.user_id))
+    if job.status_message is not None:
+        try:
+            await job.status_message.edit_text("▶️ Giliran Anda tiba, link sedang diproses.")
+        except Exception as e:
+            print(f"Gagal memperbarui posisi antrean: {e}")
+    dispatched = await send_to_github_actions(job.message, job.url, extra_payload)
+    await update_queue_positions()
+    return dispatched
 
 
 # --- ENDPOINT FLASK BARU: OAUTH CALLBACK (Tidak Berubah) ---
@@ -116,6 +204,10 @@ def oauth_callback():
     except Exception as e:
         return f"❌ Kesalahan saat menukar token: {e}", 500
 
+    # Simpan di broker: access token hasil penukaran langsung bisa dipakai job berikutnya
+    if chat_id:
+        token_broker.register(chat_id, refresh_token, token_response.get("access_token"), token_response.get("expires_in"))
+
     # 2. Kirim Refresh Token ke GitHub Actions (Repository Dispatch)
     
     headers = {
@@ -206,9 +298,28 @@ async def handle_url(client, message):
     if message.command: 
         return
     if "http" in text:
-        url = text
+        mode, url = split_upload_target(text)
         await message.reply_text(f"URL terdeteksi: `{url}`\n")
-        await send_to_github_actions(message, url)
+        scheduler.ensure_running(dispatch_job)
+        job = Job(str(message.from_user.id), url, message, mode=mode)
+        try:
+            position = scheduler.submit(job)
+        except QueueFullError as e:
+            await message.reply_text(f"⛔ {e}")
+            return
+        # Dispatcher memeriksa antrean tiap beberapa detik; job yang bisa langsung
+        # jalan tidak perlu pesan posisi
+        if position > 1 or scheduler.active_count() >= scheduler.max_active:
+            job.position = position
+            status_message = await message.reply_text(queue_position_text(position))
+            # Job bisa sudah di-dispatch selagi balasan dikirim
+            if scheduler.position(job) is None:
+                await status_message.edit_text("▶️ Giliran Anda tiba, link sedang diproses.")
+            else:
+                job.status_message = status_message
+            # Refresh access token selagi menunggu, agar dispatch tidak tertahan
+            if job.mode in DRIVE_UPLOAD_MODES:
+                asyncio.get_event_loop().run_in_executor(None, token_broker.access_token_for, str(message.from_user.id))
     else:
         pass 
 
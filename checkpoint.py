@@ -0,0 +1,176 @@
+import os
+import json
+import fcntl
+import time
+import shutil
+import hashlib
+import threading
+
+# =========================================================
+# KONSTANTA & KONFIGURASI CHECKPOINT
+# =========================================================
+
+# Direktori ini di-cache oleh workflow saat job gagal/dibatalkan, lalu di-restore
+# saat link yang sama dikirim ulang. Kosongkan CHECKPOINT_DIR untuk menonaktifkan.
+CHECKPOINT_DIR = os.environ.get(
+    "CHECKPOINT_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "checkpoints"),
+)
+META_FILENAME = "checkpoint.json"
+# Dikunci flock selama DownloaderBot hidup: satu checkpoint hanya dipakai satu job
+LOCK_FILENAME = ".lock"
+
+
+class CheckpointBusyError(Exception):
+    pass
+
+
+def checkpoint_key(source_url):
+    """Kunci job: URL sumber yang sama -> checkpoint yang sama (dipakai juga oleh workflow)."""
+    return hashlib.sha256(source_url.strip().encode()).hexdigest()[:16]
+
+# =========================================================
+# CHECKPOINT PER JOB
+# =========================================================
+
+class DownloadCheckpoint:
+    """
+    Checkpoint satu job download di CHECKPOINT_DIR/<kunci>/:
+      - checkpoint.json: URL sumber + per file: URL langsung, ukuran, validator
+        (ETag/Last-Modified), dan state tambahan (mis. segmen & MAC MEGA)
+      - data parsial + file kontrol .aria2 (range yang sudah selesai)
+    """
+
+    def __init__(self, source_url, root=CHECKPOINT_DIR):
+        self.source_url = source_url
+        self.path = os.path.join(root, checkpoint_key(source_url))
+        os.makedirs(self.path, exist_ok=True)
+        # Job lain untuk URL yang sama (run_downloads paralel) tidak boleh menulis
+        # file parsial yang sama atau menghapusnya saat selesai
+        self._lock_file = open(os.path.join(self.path, LOCK_FILENAME), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise CheckpointBusyError(f"Checkpoint {self.path} sedang dipakai job lain.")
+        self._lock = threading.Lock()
+        self._meta = self._read_meta()
+
+    def _meta_path(self):
+        return os.path.join(self.path, META_FILENAME)
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path(), "r") as f:
+                meta = json.load(f)
+            if meta.get("source_url") == self.source_url:
+                return meta
+        except (OSError, ValueError):
+            pass
+        return {"source_url": self.source_url, "files": {}}
+
+    def _write_meta(self):
+        self._meta["updated"] = int(time.time())
+        tmp_path = f"{self._meta_path()}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._meta, f)
+            os.replace(tmp_path, self._meta_path())
+        except OSError as e:
+            print(f"Peringatan: Gagal menyimpan checkpoint: {e}")
+
+    def path_for(self, filename):
+        return os.path.join(self.path, filename)
+
+    def has_partial(self, filename):
+        path = self.path_for(filename)
+        return os.path.exists(path) or os.path.exists(path + ".part")
+
+    def prepare(self, filename, direct_url, total_size, validators=None):
+        """
+        Dipanggil sebelum unduhan dimulai. Data parsial hanya dipertahankan jika
+        ukuran & validator sumber sama dengan yang tercatat; selain itu dibuang.
+        Mengembalikan True jika unduhan akan dilanjutkan (resume).
+        """
+        validators = {k: v for k, v in (validators or {}).items() if v}
+        with self._lock:
+            entry = self._meta["files"].get(filename)
+            resumable = (
+                entry is not None
+                and self.has_partial(filename)
+                and entry.get("total_size") == total_size
+                and all(entry.get("validators", {}).get(k) == v for k, v in validators.items())
+            )
+            if not resumable:
+                self._discard_locked(filename)
+                entry = {"state": {}}
+            entry.update({"direct_url": direct_url, "total_size": total_size, "validators": validators})
+            self._meta["files"][filename] = entry
+            self._write_meta()
+        if resumable:
+            print(f"♻️ Melanjutkan {filename} dari checkpoint.")
+        return resumable
+
+    def get_state(self, filename):
+        with self._lock:
+            return dict(self._meta["files"].get(filename, {}).get("state", {}))
+
+    def save_state(self, filename, state):
+        with self._lock:
+            entry = self._meta["files"].setdefault(filename, {})
+            entry["state"] = state
+            self._write_meta()
+
+    def _discard_locked(self, filename):
+        for suffix in ("", ".aria2", ".part"):
+            try:
+                os.remove(self.path_for(filename) + suffix)
+            except FileNotFoundError:
+                pass
+        self._meta["files"].pop(filename, None)
+
+    def discard(self, filename):
+        with self._lock:
+            self._discard_locked(filename)
+            self._write_meta()
+
+    def clear(self):
+        """
+        Menghapus seluruh isi checkpoint (dipanggil setelah job sukses). File kunci
+        dibiarkan agar job lain yang menunggu tetap mengunci inode yang sama.
+        """
+        with self._lock:
+            for name in os.listdir(self.path):
+                if name == LOCK_FILENAME:
+                    continue
+                path = os.path.join(self.path, name)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            self._meta = {"source_url": self.source_url, "files": {}}
+
+    def close(self):
+        """Melepas kunci checkpoint. Aman dipanggil berkali-kali."""
+        if self._lock_file:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def open_checkpoint(source_url):
+    """Checkpoint untuk URL, atau None jika fitur dinonaktifkan / direktori tidak bisa dibuat."""
+    if not CHECKPOINT_DIR:
+        return None
+    try:
+        return DownloadCheckpoint(source_url)
+    except CheckpointBusyError as e:
+        print(f"Peringatan: {e} Unduhan berjalan tanpa resume.")
+        return None
+    except OSError as e:
+        print(f"Peringatan: Checkpoint dinonaktifkan: {e}")
+        return None
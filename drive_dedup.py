@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+import threading
+from googleapiclient.errors import HttpError
+
+# =========================================================
+# KONSTANTA & KONFIGURASI DEDUP DRIVE
+# =========================================================
+
+DRIVE_INDEX_PATH = os.environ.get(
+    "DRIVE_INDEX_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "drive_index.json"),
+)
+DRIVE_INDEX_MAX_ENTRIES = 5000
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+FILE_FIELDS = "id,name,size,md5Checksum,trashed,parents,webViewLink,webContentLink"
+
+# =========================================================
+# INDEX LOKAL md5 -> file Drive
+# =========================================================
+
+def account_key(refresh_token):
+    # Index dipisah per akun Drive; refresh token mentah tidak disimpan
+    return hashlib.sha256((refresh_token or "").encode()).hexdigest()[:16]
+
+
+class DriveIndex:
+    """Index JSON digest yang pernah diunggah: {akun: {md5: {id, size, name}}}."""
+
+    def __init__(self, account, path=DRIVE_INDEX_PATH):
+        self.account = account
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data.setdefault(self.account, {})
+
+    def _save(self):
+        entries = self._data[self.account]
+        if len(entries) > DRIVE_INDEX_MAX_ENTRIES:
+            for key in list(entries)[:len(entries) - DRIVE_INDEX_MAX_ENTRIES]:
+                del entries[key]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Peringatan: Gagal menyimpan index Drive: {e}")
+
+    def get(self, md5):
+        with self._lock:
+            return self._load().get(md5.lower())
+
+    def put(self, md5, file_id, size, name):
+        with self._lock:
+            entries = self._load()
+            entries.pop(md5.lower(), None)
+            entries[md5.lower()] = {"id": file_id, "size": int(size), "name": name}
+            self._save()
+
+    def forget(self, md5):
+        with self._lock:
+            if self._load().pop(md5.lower(), None) is not None:
+                self._save()
+
+# =========================================================
+# PENCARIAN FILE DENGAN ISI YANG SAMA
+# =========================================================
+
+def _matches(file_info, md5, size, folder_id):
+    return (
+        file_info.get("md5Checksum", "").lower() == md5.lower()
+        and int(file_info.get("size", -1)) == size
+        and not file_info.get("trashed")
+        and folder_id in file_info.get("parents", [folder_id])
+    )
+
+
+def _lookup_index(service, index, md5, size, folder_id):
+    entry = index.get(md5)
+    if not entry or entry.get("size") != size:
+        return None
+    try:
+        file_info = service.files().get(fileId=entry["id"], fields=FILE_FIELDS).execute()
+    except HttpError:
+        # File sudah dihapus dari Drive: index usang
+        index.forget(md5)
+        return None
+    if _matches(file_info, md5, size, folder_id):
+        return file_info
+    index.forget(md5)
+    return None
+
+
+def _quote(value):
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _find_by_name(service, md5, size, folder_id, name):
+    """
+    Satu files.list berfilter nama di folder tujuan, lalu saring md5 + ukuran.
+    Drive tidak bisa query md5Checksum; isi sama dengan nama berbeda hanya
+    ditemukan lewat index lokal (di-cache workflow), bukan dengan mendaftar folder.
+    """
+    if not name:
+        return None
+    query = (f"name='{_quote(name)}' and '{folder_id}' in parents and trashed=false"
+             f" and mimeType!='{FOLDER_MIME_TYPE}'")
+    response = service.files().list(q=query, pageSize=10, fields=f"files({FILE_FIELDS})").execute()
+    for file_info in response.get("files", []):
+        if _matches(file_info, md5, size, folder_id):
+            return file_info
+    return None
+
+
+def find_existing_file(service, index, md5, size, folder_id, name=None):
+    """
+    Mencari file di folder tujuan dengan md5 + ukuran sama: index lokal dulu
+    (satu files.get), lalu file bernama sama (satu files.list). Mengembalikan
+    metadata file atau None.
+    """
+    try:
+        file_info = (_lookup_index(service, index, md5, size, folder_id)
+                     or _find_by_name(service, md5, size, folder_id, name))
+    except HttpError as e:
+        print(f"Peringatan: Pencarian dedup Drive gagal: {e}")
+        return None
+    if file_info:
+        index.put(md5, file_info["id"], size, file_info.get("name"))
+    return file_info
+
+
+def reuse_or_copy(service, file_info, name, folder_id):
+    """
+    Nama sama: file lama dipakai ulang. Nama beda: salinan server-side (files.copy,
+    tanpa transfer data) dengan nama baru. Mengembalikan metadata file hasil.
+    """
+    if file_info.get("name") == name:
+        return file_info
+    return service.files().copy(
+        fileId=file_info["id"], body={"name": name, "parents": [folder_id]}, fields=FILE_FIELDS,
+    ).execute()
@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import socket
+import hashlib
+import threading
+import requests
+from urllib.parse import urlparse, urlunparse
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from timing import timed
+
+# =========================================================
+# KONSTANTA & KONFIGURASI TRANSPORT DRIVE
+# =========================================================
+
+TOKEN_URI = os.environ.get("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+TOKEN_CACHE_PATH = os.environ.get(
+    "DRIVE_TOKEN_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "drive_token.json"),
+)
+POOL_SIZE = int(os.environ.get("DRIVE_POOL_SIZE", "10"))
+SOCKET_SNDBUF = int(os.environ.get("DRIVE_SOCKET_SNDBUF", str(4 * 1024 * 1024)))
+SOCKET_RCVBUF = int(os.environ.get("DRIVE_SOCKET_RCVBUF", str(1 * 1024 * 1024)))
+REQUEST_TIMEOUT = int(os.environ.get("DRIVE_REQUEST_TIMEOUT", "120"))
+# Token dianggap kadaluarsa sedikit lebih awal agar tidak habis di tengah request
+TOKEN_EXPIRY_MARGIN = 300
+USER_AGENT = "GH-Actions-DriveUploader"
+
+# =========================================================
+# SESSION HTTP/1.1 KEEP-ALIVE (POOLED)
+# =========================================================
+
+class TunedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter dengan ukuran buffer socket yang bisa diatur dan TCP keep-alive."""
+
+    def __init__(self, sndbuf=SOCKET_SNDBUF, rcvbuf=SOCKET_RCVBUF, **kwargs):
+        self.socket_options = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf),
+            (socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf),
+        ]
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def create_session(pool_size=POOL_SIZE, sndbuf=SOCKET_SNDBUF, rcvbuf=SOCKET_RCVBUF):
+    """Membuat requests.Session dengan connection pool keep-alive yang dipakai ulang."""
+    session = requests.Session()
+    adapter = TunedHTTPAdapter(
+        sndbuf=sndbuf, rcvbuf=rcvbuf,
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+# =========================================================
+# CACHE ACCESS TOKEN (DENGAN EXPIRY)
+# =========================================================
+
+class AccessTokenManager:
+    """
+    Menyimpan access token beserta waktu kadaluarsanya. Token hanya di-refresh
+    jika belum ada atau sudah (hampir) kadaluarsa, sehingga upload berikutnya
+    tidak perlu round trip ke token endpoint.
+    """
+
+    def __init__(self, client_id, client_secret, refresh_token, session=None,
+                 token_uri=TOKEN_URI, cache_path=TOKEN_CACHE_PATH, access_token=None, expiry=0):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.session = session or create_session()
+        self.token_uri = token_uri
+        self.cache_path = cache_path
+        self.access_token = None
+        self.expiry = 0
+        self._lock = threading.Lock()
+        self._load_cache()
+        # Token dari broker bot (payload dispatch) dipakai jika lebih baru dari cache
+        if access_token and expiry > self.expiry:
+            self.access_token = access_token
+            self.expiry = expiry
+
+    def _cache_key(self):
+        # Jangan simpan refresh token mentah sebagai kunci
+        return hashlib.sha256((self.refresh_token or "").encode()).hexdigest()[:16]
+
+    def _read_cache_file(self):
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_cache(self):
+        entry = self._read_cache_file().get(self._cache_key())
+        if entry:
+            self.access_token = entry.get("access_token")
+            self.expiry = entry.get("expiry", 0)
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        data = self._read_cache_file()
+        data[self._cache_key()] = {"access_token": self.access_token, "expiry": self.expiry}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Peringatan: Gagal menyimpan cache token: {e}")
+
+    def is_valid(self):
+        return bool(self.access_token) and time.time() < self.expiry - TOKEN_EXPIRY_MARGIN
+
+    @timed("drive.token_refresh")
+    def refresh(self):
+        """Menukar refresh token dengan access token baru dan menyimpannya ke cache."""
+        response = self.session.post(
+            self.token_uri,
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": self.refresh_token,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            },
+            timeout=30,
+        )
+        payload = response.json()
+        if response.status_code != 200 or "access_token" not in payload:
+            raise Exception(payload.get("error_description") or payload.get("error") or response.text[:200])
+        self.access_token = payload["access_token"]
+        self.expiry = time.time() + int(payload.get("expires_in", 3600))
+        self._save_cache()
+        return self.access_token
+
+    def get_token(self, force_refresh=False):
+        with self._lock:
+            if force_refresh or not self.is_valid():
+                self.refresh()
+            return self.access_token
+
+# =========================================================
+# ADAPTER HTTP KOMPATIBEL httplib2 UNTUK googleapiclient
+# =========================================================
+
+class _HttpResponse(dict):
+    """Response minimal yang meniru httplib2.Response (dict header + .status/.reason)."""
+
+    def __init__(self, response):
+        super().__init__((k.lower(), v) for k, v in response.headers.items())
+        self.status = response.status_code
+        self.reason = response.reason
+        self["status"] = str(response.status_code)
+
+
+class PooledHttp:
+    """
+    Pengganti httplib2.Http untuk googleapiclient yang memakai requests.Session
+    (koneksi keep-alive dipakai ulang) dan menyisipkan header Authorization.
+    """
+
+    def __init__(self, session=None, token_manager=None, timeout=REQUEST_TIMEOUT, endpoint=None):
+        self.session = session or create_session()
+        self.token_manager = token_manager
+        self.timeout = timeout
+        # googleapiclient hanya mengganti netloc URL upload saat api_endpoint di-override,
+        # skemanya tetap https. Samakan skema dengan endpoint (mis. server lokal http).
+        self.endpoint = urlparse(endpoint) if endpoint else None
+
+    def _apply_endpoint(self, uri):
+        if not self.endpoint:
+            return uri
+        parsed = urlparse(uri)
+        if parsed.netloc == self.endpoint.netloc and parsed.scheme != self.endpoint.scheme:
+            return urlunparse(parsed._replace(scheme=self.endpoint.scheme))
+        return uri
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5,
+                connection_type=None, **kwargs):
+        uri = self._apply_endpoint(uri)
+        headers = dict(headers or {})
+        for attempt in range(2):
+            if self.token_manager:
+                token = self.token_manager.get_token(force_refresh=attempt > 0)
+                headers["authorization"] = f"Bearer {token}"
+            response = self.session.request(
+                method, uri, data=body, headers=headers, timeout=self.timeout,
+                # 308 milik resumable upload Drive BUKAN redirect
+                allow_redirects=method in ("GET", "HEAD") and redirections > 0,
+            )
+            # Token ditolak (dicabut/kadaluarsa lebih cepat): refresh sekali lalu ulangi
+            if response.status_code != 401 or not self.token_manager:
+                break
+        return _HttpResponse(response), response.content
+
+    def close(self):
+        self.session.close()
+
+# =========================================================
+# SESI RESUMABLE UPLOAD MANUAL (DATA DARI STREAM)
+# =========================================================
+
+DRIVE_UPLOAD_URL = "https://www.googleapis.com/upload/drive/v3/files"
+DRIVE_BATCH_URL = "https://www.googleapis.com/batch/drive/v3"
+
+
+def upload_url_for(endpoint=None):
+    """URL media upload Drive; mengikuti skema+host endpoint jika di-override (server lokal)."""
+    if not endpoint:
+        return DRIVE_UPLOAD_URL
+    parsed = urlparse(endpoint)
+    return f"{parsed.scheme}://{parsed.netloc}/upload/drive/v3/files"
+
+
+def batch_url_for(endpoint=None):
+    """URL batch Drive; googleapiclient membentuknya dari rootUrl discovery, bukan api_endpoint."""
+    if not endpoint:
+        return DRIVE_BATCH_URL
+    parsed = urlparse(endpoint)
+    return f"{parsed.scheme}://{parsed.netloc}/batch/drive/v3"
+
+
+class ResumableUploadSession:
+    """
+    Resumable upload Drive yang dikendalikan sendiri (tanpa MediaFileUpload),
+    sehingga data bisa datang dari stream/antrean, bukan hanya dari path file.
+    Setiap chunk (kecuali terakhir) harus kelipatan 256 KB.
+    """
+
+    def __init__(self, http, metadata, total_size, mime_type="application/octet-stream",
+                 fields="id,md5Checksum", upload_url=DRIVE_UPLOAD_URL):
+        self.http = http
+        self.metadata = metadata
+        self.total_size = total_size
+        self.mime_type = mime_type
+        self.fields = fields
+        self.upload_url = upload_url
+        self.session_url = None
+
+    def start(self):
+        headers = {
+            "content-type": "application/json; charset=UTF-8",
+            "x-upload-content-type": self.mime_type,
+            "x-upload-content-length": str(self.total_size),
+        }
+        response, content = self.http.request(
+            f"{self.upload_url}?uploadType=resumable&fields={self.fields}", "POST",
+            body=json.dumps(self.metadata), headers=headers,
+        )
+        if response.status != 200 or "location" not in response:
+            raise Exception(f"Gagal membuat sesi resumable ({response.status}): {content[:200]!r}")
+        self.session_url = response["location"]
+        return self.session_url
+
+    def _parse(self, response, content):
+        """Mengembalikan (byte yang sudah diterima server, metadata file jika selesai)."""
+        if response.status in (200, 201):
+            return self.total_size, json.loads(content or b"{}")
+        if response.status == 308:
+            received = response.get("range")
+            return (int(received.rsplit("-", 1)[-1]) + 1 if received else 0), None
+        raise Exception(f"Chunk upload gagal ({response.status}): {content[:200]!r}")
+
+    def upload_chunk(self, data, offset):
+        """Mengirim data mulai offset. Mengembalikan (committed, hasil_atau_None)."""
+        end = offset + len(data) - 1
+        headers = {"content-range": f"bytes {offset}-{end}/{self.total_size}"}
+        response, content = self.http.request(self.session_url, "PUT", body=data, headers=headers)
+        return self._parse(response, content)
+
+    def query_status(self):
+        """Menanyakan berapa byte yang sudah diterima (dipakai setelah error jaringan)."""
+        headers = {"content-range": f"bytes */{self.total_size}", "content-length": "0"}
+        response, content = self.http.request(self.session_url, "PUT", body=b"", headers=headers)
+        return self._parse(response, content)
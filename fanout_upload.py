@@ -0,0 +1,372 @@
+import io
+import os
+import sys
+import time
+import queue
+import hashlib
+import mimetypes
+import threading
+
+import timing
+from profiling import run_profiled
+from hashing import get_default_cache
+from notifier import send_telegram_message
+from storage import read_download_marker
+from drive_transport import ResumableUploadSession, upload_url_for
+from drive_dedup import DriveIndex, account_key, find_existing_file, reuse_or_copy
+from integrity import bad_segments, load_manifest, read_verified
+from bandwidth import open_flow
+from upload import (
+    DRIVE_API_ENDPOINT, DRIVE_CHUNK_SIZE, DRIVE_UPLOAD_FOLDER_NAME, REFRESH_TOKEN,
+    create_drive_http, authenticate_google_drive, get_or_create_folder, make_file_public,
+)
+from telegram_upload import API_ID, API_HASH, BOT_TOKEN, OWNER_ID, create_client, upload_large_file_with_pyrogram
+
+# =========================================================
+# KONSTANTA & KONFIGURASI FAN-OUT
+# =========================================================
+
+# Ukuran satu kali baca dari disk (kelipatan 512 KB part Pyrogram dan 256 KB chunk Drive)
+FANOUT_READ_SIZE = int(os.environ.get("FANOUT_READ_SIZE", str(4 * 1024 * 1024)))
+# Jumlah chunk yang boleh mengantre per tujuan (backpressure: memori maks ~ READ_SIZE x QUEUE_CHUNKS x tujuan)
+FANOUT_QUEUE_CHUNKS = int(os.environ.get("FANOUT_QUEUE_CHUNKS", "8"))
+DRIVE_MAX_RETRIES = 5
+
+# Penanda akhir stream di antrean
+_END = object()
+
+
+class FanoutError(Exception):
+    pass
+
+# =========================================================
+# ANTREAN PER TUJUAN & PEMBACA FILE-LIKE
+# =========================================================
+
+class ChunkQueue:
+    """
+    Antrean berbatas untuk satu tujuan. put() menunggu jika penuh (backpressure),
+    kecuali tujuan sudah ditandai gagal, agar pembaca file tidak macet selamanya.
+    """
+
+    def __init__(self, name, maxsize=FANOUT_QUEUE_CHUNKS):
+        self.name = name
+        self.queue = queue.Queue(maxsize)
+        self.failed = False
+
+    def put(self, item):
+        while not self.failed:
+            try:
+                self.queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self):
+        return self.queue.get()
+
+    def fail(self):
+        self.failed = True
+        # Kosongkan agar put() yang sedang menunggu segera lepas
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class QueueReader(io.IOBase):
+    """
+    Objek file-like (read/seek/tell) di atas ChunkQueue untuk Pyrogram.
+    Pyrogram memanggil seek(0, SEEK_END)+tell() untuk ukuran lalu seek(0) dan
+    membaca berurutan; hanya pola itu yang didukung (tidak bisa mundur).
+    """
+
+    def __init__(self, chunk_queue, size, name):
+        self.chunk_queue = chunk_queue
+        self.size = size
+        self.name = name
+        self.position = 0
+        self._buffer = b""
+        self._offset = 0
+        self._eof = False
+        self._probing_end = False
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.size if self._probing_end else self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_END and offset == 0:
+            self._probing_end = True
+            return self.size
+        if whence == os.SEEK_CUR:
+            offset += self.tell()
+        if offset != self.position:
+            raise io.UnsupportedOperation("QueueReader hanya mendukung baca berurutan.")
+        self._probing_end = False
+        return self.position
+
+    def read(self, size=-1):
+        parts = []
+        wanted = size if size is not None and size >= 0 else float("inf")
+        while wanted > 0:
+            if self._offset >= len(self._buffer):
+                if self._eof:
+                    break
+                item = self.chunk_queue.get()
+                if item is _END:
+                    self._eof = True
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                self._buffer, self._offset = item, 0
+            take = int(min(wanted, len(self._buffer) - self._offset))
+            parts.append(self._buffer[self._offset:self._offset + take])
+            self._offset += take
+            wanted -= take
+        data = b"".join(parts)
+        self.position += len(data)
+        return data
+
+# =========================================================
+# PEMBACA (SATU KALI BACA) & KONSUMEN DRIVE
+# =========================================================
+
+def fan_out(path, chunk_queues, read_size=FANOUT_READ_SIZE, manifest=None):
+    """
+    Membaca file SEKALI dan membagikan setiap chunk ke semua antrean aktif.
+    MD5 dihitung dari bacaan yang sama. Mengembalikan hex MD5.
+    Dengan manifest, chunk yang tidak cocok dibaca ulang sebelum dibagikan.
+    """
+    md5 = hashlib.md5()
+    offset = 0
+    try:
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                chunk = f.read(read_size)
+                if not chunk:
+                    break
+                if bad_segments(manifest, offset, chunk):
+                    chunk = read_verified(f, manifest, offset, len(chunk))
+                offset += len(chunk)
+                md5.update(chunk)
+                delivered = [chunk_queue.put(chunk) for chunk_queue in chunk_queues]
+                if not any(delivered):
+                    raise FanoutError("Semua tujuan upload gagal.")
+    except BaseException as e:
+        for chunk_queue in chunk_queues:
+            chunk_queue.put(e)
+        raise
+    for chunk_queue in chunk_queues:
+        chunk_queue.put(_END)
+    return md5.hexdigest()
+
+
+def _send_drive_chunk(session, data, offset):
+    """Mengirim satu chunk dengan retry; setelah error, lanjut dari byte yang sudah diterima server."""
+    for attempt in range(DRIVE_MAX_RETRIES):
+        try:
+            return session.upload_chunk(data, offset)
+        except Exception as e:
+            if attempt == DRIVE_MAX_RETRIES - 1:
+                raise
+            print(f"⚠️ Chunk Drive gagal ({e}). Mencoba lagi dalam 10 detik. Percobaan ke-{attempt + 1}...")
+            time.sleep(10)
+            committed, result = session.query_status()
+            if result is not None:
+                return committed, result
+            data, offset = data[committed - offset:], committed
+    raise FanoutError("Chunk Drive gagal.")
+
+
+def drive_consumer(chunk_queue, session, chunk_size=DRIVE_CHUNK_SIZE, flow=None):
+    """
+    Mengumpulkan chunk dari antrean menjadi chunk resumable Drive. Mengembalikan metadata file.
+    flow (opsional) = aliran bandwidth.open_flow yang membatasi laju antar chunk.
+    """
+    buffer = bytearray()
+    offset = 0
+    result = None
+    try:
+        while True:
+            item = chunk_queue.get()
+            if isinstance(item, BaseException):
+                raise item
+            if item is _END:
+                break
+            buffer += item
+            while len(buffer) >= chunk_size:
+                committed, result = _send_drive_chunk(session, bytes(buffer[:chunk_size]), offset)
+                del buffer[:committed - offset]
+                offset = committed
+                if flow:
+                    flow.pace(offset)
+        # Chunk terakhir (boleh bukan kelipatan 256 KB); file kosong cukup ditanyakan statusnya
+        if buffer:
+            committed, result = _send_drive_chunk(session, bytes(buffer), offset)
+        elif session.total_size == 0:
+            committed, result = session.query_status()
+        if result is None:
+            raise FanoutError("Drive belum mengonfirmasi file selesai.")
+        return result
+    except BaseException:
+        chunk_queue.fail()
+        raise
+
+# =========================================================
+# FAN-OUT SATU FILE
+# =========================================================
+
+def fanout_upload_file(file_path, app, drive_http, drive_service, folder_id, drive_index):
+    """
+    Mengunggah satu file ke Telegram dan Drive sekaligus dari satu kali baca.
+    Pyrogram berjalan di thread utama (event loop-nya terikat ke sana); pembaca
+    dan konsumen Drive berjalan di thread latar. Mengembalikan (ok_telegram, ok_drive).
+    """
+    file_name = os.path.basename(file_path)
+    total_size = os.path.getsize(file_path)
+    mime_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+    telegram_queue = ChunkQueue("telegram")
+    drive_queue = ChunkQueue("drive")
+    chunk_queues = [telegram_queue]
+    results = {}
+
+    # Dedup hanya jika MD5 sudah ada di cache digest (tanpa baca tambahan)
+    cached = get_default_cache().get(file_path, ("md5",))
+    existing = find_existing_file(drive_service, drive_index, cached["md5"], total_size, folder_id, file_name) if cached else None
+    if existing:
+        print(f"♻️ Isi `{file_name}` sudah ada di Drive ({existing['id']}). Drive dilewati.")
+        results["drive"] = reuse_or_copy(drive_service, existing, file_name, folder_id)
+    else:
+        session = ResumableUploadSession(
+            drive_http, {"name": file_name, "parents": [folder_id]}, total_size, mime_type,
+            fields="id,md5Checksum,webViewLink", upload_url=upload_url_for(DRIVE_API_ENDPOINT),
+        )
+        try:
+            session.start()
+            chunk_queues.append(drive_queue)
+        except Exception as e:
+            print(f"❌ Gagal membuat sesi Drive: {e}")
+            send_telegram_message(f"❌ **Drive GAGAL!**\nFile: `{file_name}`\n\n{str(e)[:150]}...")
+
+    def run_reader():
+        try:
+            with timing.span("fanout.read", bytes=total_size):
+                results["md5"] = fan_out(file_path, chunk_queues, manifest=load_manifest(file_path))
+        except BaseException as e:
+            results["read_error"] = e
+
+    def run_drive():
+        try:
+            with timing.span("drive.upload", bytes=total_size), open_flow(file_name, "upload").start_heartbeat() as flow:
+                results["drive"] = drive_consumer(drive_queue, session, flow=flow)
+        except BaseException as e:
+            results["drive_error"] = e
+
+    reader_thread = threading.Thread(target=run_reader, daemon=True)
+    reader_thread.start()
+    drive_thread = None
+    if drive_queue in chunk_queues:
+        drive_thread = threading.Thread(target=run_drive, daemon=True)
+        drive_thread.start()
+
+    document = QueueReader(telegram_queue, total_size, file_name)
+    telegram_ok = upload_large_file_with_pyrogram(file_path, app=app, document=document)
+    if not telegram_ok:
+        telegram_queue.fail()
+
+    reader_thread.join()
+    if drive_thread:
+        drive_thread.join()
+
+    local_md5 = results.get("md5") or (existing and cached["md5"])
+    if results.get("md5"):
+        # MD5 dari bacaan fan-out disimpan, upload berikutnya tidak perlu hash ulang
+        get_default_cache().put(file_path, {"md5": local_md5})
+    drive_ok = _finish_drive(drive_service, file_name, local_md5, results)
+    if drive_ok and not existing:
+        drive_index.put(local_md5, results["drive"]["id"], total_size, file_name)
+    return telegram_ok, drive_ok
+
+
+def _finish_drive(drive_service, file_name, local_md5, results):
+    response = results.get("drive")
+    if not response:
+        error = results.get("drive_error") or results.get("read_error")
+        if error:
+            print(f"❌ Upload Drive gagal: {error}")
+            send_telegram_message(f"❌ **Drive GAGAL!**\nFile: `{file_name}`\n\n{str(error)[:150]}...")
+        return False
+
+    drive_md5 = response.get("md5Checksum")
+    if not (drive_md5 and local_md5 and drive_md5.lower() == local_md5.lower()):
+        send_telegram_message(
+            f"🚨 **UPLOAD GAGAL (VERIFIKASI GAGAL)!**\n\n"
+            f"File: `{file_name}`\nMD5 Lokal: `{local_md5}`\nMD5 Drive: `{drive_md5}`"
+        )
+        return False
+
+    with timing.span("drive.publish"):
+        view_link, content_link = make_file_public(drive_service, response["id"], response)
+    send_telegram_message(
+        f"🎉 **UPLOAD DRIVE SUKSES!** 🎉\n\n"
+        f"File: `{file_name}`\n"
+        f"Folder: `{DRIVE_UPLOAD_FOLDER_NAME}`\n"
+        f"MD5: `{local_md5}`\n"
+        f"Link Drive: [Lihat File]({view_link or response.get('webViewLink')})\n"
+        f"Link Download Langsung: `{content_link or 'N/A (Link Download)'}`"
+    )
+    return True
+
+# =========================================================
+# EKSEKUSI UTAMA
+# =========================================================
+
+def main():
+    """Mengunggah setiap file di penanda ke Telegram DAN Drive dengan satu kali baca per file."""
+    filenames = read_download_marker()
+    missing_files = [name for name in filenames if not os.path.exists(name)]
+    if not filenames or missing_files:
+        error_msg = f"❌ Fan-out upload gagal: File `{', '.join(missing_files)}` tidak ditemukan."
+        print(error_msg)
+        send_telegram_message(error_msg)
+        sys.exit(1)
+
+    if not all([API_ID, API_HASH, BOT_TOKEN, OWNER_ID]):
+        send_telegram_message("❌ Konfigurasi unggah (API_ID/API_HASH/BOT_TOKEN/OWNER_ID) tidak lengkap.")
+        sys.exit(1)
+
+    drive_http = create_drive_http()
+    drive_service = authenticate_google_drive(drive_http)
+    folder_id = get_or_create_folder(drive_service, DRIVE_UPLOAD_FOLDER_NAME)
+    drive_index = DriveIndex(account_key(REFRESH_TOKEN))
+
+    app = create_client()
+    app.start()
+    failed_files = []
+    try:
+        for file_path in filenames:
+            telegram_ok, drive_ok = fanout_upload_file(file_path, app, drive_http, drive_service, folder_id, drive_index)
+            if not (telegram_ok and drive_ok):
+                failed_files.append(file_path)
+    finally:
+        try: app.stop()
+        except Exception: pass
+
+    timing_summary = timing.summarize()
+    if timing_summary:
+        send_telegram_message(timing_summary)
+    if failed_files:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    run_profiled("fanout_upload", main)
@@ -0,0 +1,174 @@
+import os
+import re
+import requests
+
+# =========================================================
+# KONSTANTA & KONFIGURASI FOLDER
+# =========================================================
+
+GOFILE_API_URL = os.environ.get("GOFILE_API_URL", "https://api.gofile.io")
+# Token situs Gofile (parameter wt) kadang diganti; bisa di-override tanpa ubah kode
+GOFILE_WEBSITE_TOKEN = os.environ.get("GOFILE_WEBSITE_TOKEN", "4fd6sg89d7s6")
+MEDIAFIRE_API_URL = os.environ.get("MEDIAFIRE_API_URL", "https://www.mediafire.com/api/1.5")
+# Jumlah file anak yang diunduh bersamaan (masing-masing tetap multi-koneksi aria2c)
+FOLDER_CONCURRENCY = int(os.environ.get("FOLDER_CONCURRENCY", "4"))
+# Batas jumlah file per folder, agar folder raksasa tidak menghabiskan disk runner
+FOLDER_MAX_FILES = int(os.environ.get("FOLDER_MAX_FILES", "200"))
+REQUEST_TIMEOUT = 20
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+MEDIAFIRE_DIRECT_LINK = re.compile(r'href="(https?://download\d*\.mediafire\.com/[^"]+)"')
+
+
+class FolderError(Exception):
+    pass
+
+# =========================================================
+# DETEKSI URL FOLDER
+# =========================================================
+
+def parse_gofile_url(url):
+    """Mengembalikan content id dari link gofile.io/d/<id>, atau None."""
+    match = re.search(r'gofile\.io/d/([A-Za-z0-9]+)', url)
+    return match.group(1) if match else None
+
+
+def parse_mediafire_folder_url(url):
+    """Mengembalikan folder key dari link mediafire.com/folder/<key>, atau None."""
+    match = re.search(r'mediafire\.com/folder/([A-Za-z0-9]+)', url)
+    return match.group(1) if match else None
+
+
+def is_folder_url(url):
+    # Link Gofile /d/ selalu berupa folder (berisi satu file atau lebih)
+    return bool(parse_gofile_url(url) or parse_mediafire_folder_url(url))
+
+# =========================================================
+# GOFILE
+# =========================================================
+
+def _gofile_guest_token(session):
+    response = session.post(f"{GOFILE_API_URL}/accounts", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("status") != "ok":
+        raise FolderError(f"Gofile menolak pembuatan akun tamu: {data.get('status')}")
+    return data["data"]["token"]
+
+
+def list_gofile_folder(content_id, session=None):
+    """
+    Mendaftar semua file di folder Gofile (rekursif) lewat content API.
+    Mengembalikan list dict {name, url, size, headers}; header Cookie wajib
+    dibawa saat mengunduh karena link Gofile terikat token akun.
+    """
+    session = session or requests.Session()
+    token = _gofile_guest_token(session)
+    headers = {"Authorization": f"Bearer {token}", "User-Agent": USER_AGENT}
+    download_headers = {"Cookie": f"accountToken={token}", "User-Agent": USER_AGENT}
+    entries = []
+    pending = [(content_id, "")]
+
+    while pending and len(entries) < FOLDER_MAX_FILES:
+        folder_id, prefix = pending.pop(0)
+        response = session.get(
+            f"{GOFILE_API_URL}/contents/{folder_id}",
+            params={"wt": GOFILE_WEBSITE_TOKEN, "cache": "true"},
+            headers=headers, timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") != "ok":
+            raise FolderError(f"Gofile content API gagal: {data.get('status')}")
+        content = data["data"]
+
+        if content.get("type") == "file":
+            children = {content.get("id", folder_id): content}
+        else:
+            children = content.get("children", {})
+
+        for child in children.values():
+            if child.get("type") == "folder":
+                pending.append((child["id"], os.path.join(prefix, child.get("name", child["id"]))))
+            elif child.get("link"):
+                entries.append({
+                    "name": os.path.join(prefix, child["name"]),
+                    "url": child["link"],
+                    "size": child.get("size"),
+                    "headers": download_headers,
+                })
+    return entries[:FOLDER_MAX_FILES]
+
+# =========================================================
+# MEDIAFIRE
+# =========================================================
+
+def _mediafire_content(session, folder_key, content_type):
+    """Mengambil semua chunk isi folder MediaFire untuk content_type (files/folders)."""
+    items = []
+    chunk = 1
+    while True:
+        response = session.get(
+            f"{MEDIAFIRE_API_URL}/folder/get_content.php",
+            params={"folder_key": folder_key, "content_type": content_type,
+                    "chunk": chunk, "response_format": "json"},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        body = response.json().get("response", {})
+        if body.get("result") != "Success":
+            raise FolderError(f"MediaFire content API gagal: {body.get('message', body.get('result'))}")
+        content = body.get("folder_content", {})
+        items.extend(content.get(content_type, []))
+        if content.get("more_chunks") != "yes":
+            return items
+        chunk += 1
+
+
+def resolve_mediafire_direct_link(page_url, session=None):
+    """Mengambil link download langsung (downloadXXXX.mediafire.com) dari halaman file tanpa browser."""
+    session = session or requests.Session()
+    response = session.get(page_url, headers={"User-Agent": USER_AGENT}, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    match = MEDIAFIRE_DIRECT_LINK.search(response.text)
+    if not match:
+        raise FolderError(f"Link download langsung tidak ditemukan di {page_url}")
+    return match.group(1)
+
+
+def list_mediafire_folder(folder_key, session=None):
+    """
+    Mendaftar semua file di folder MediaFire (rekursif). URL yang dikembalikan
+    adalah halaman file; link langsungnya di-resolve saat file akan diunduh.
+    """
+    session = session or requests.Session()
+    entries = []
+    pending = [(folder_key, "")]
+
+    while pending and len(entries) < FOLDER_MAX_FILES:
+        key, prefix = pending.pop(0)
+        for item in _mediafire_content(session, key, "files"):
+            entries.append({
+                "name": os.path.join(prefix, item["filename"]),
+                "page_url": item.get("links", {}).get("normal_download")
+                            or f"https://www.mediafire.com/file/{item['quickkey']}",
+                "size": int(item["size"]) if item.get("size") else None,
+                "headers": {"User-Agent": USER_AGENT},
+            })
+        for folder in _mediafire_content(session, key, "folders"):
+            pending.append((folder["folderkey"], os.path.join(prefix, folder.get("name", folder["folderkey"]))))
+    return entries[:FOLDER_MAX_FILES]
+
+# =========================================================
+# TITIK MASUK
+# =========================================================
+
+def list_folder(url, session=None):
+    """Mendaftar isi folder Gofile/MediaFire. Mengembalikan None jika URL bukan folder."""
+    content_id = parse_gofile_url(url)
+    if content_id:
+        return list_gofile_folder(content_id, session)
+    folder_key = parse_mediafire_folder_url(url)
+    if folder_key:
+        return list_mediafire_folder(folder_key, session)
+    return None
@@ -0,0 +1,157 @@
+import os
+import json
+import mmap
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# =========================================================
+# KONSTANTA & KONFIGURASI HASHING
+# =========================================================
+
+HASH_BUFFER_SIZE = int(os.environ.get("HASH_BUFFER_SIZE", str(8 * 1024 * 1024)))
+DIGEST_CACHE_PATH = os.environ.get(
+    "DIGEST_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "digests.json"),
+)
+DIGEST_CACHE_MAX_ENTRIES = 2000
+DEFAULT_ALGORITHMS = ("md5", "sha256")
+
+# =========================================================
+# CACHE DIGEST (device, inode, size, mtime)
+# =========================================================
+
+def file_identity(path):
+    """Kunci cache: file yang sama dan belum berubah selalu menghasilkan kunci yang sama."""
+    st = os.stat(path)
+    return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class DigestCache:
+    """Cache persisten (JSON) digest file, dikunci dengan identitas file."""
+
+    def __init__(self, path=DIGEST_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        entries = self._entries
+        if len(entries) > DIGEST_CACHE_MAX_ENTRIES:
+            # Buang entri terlama (dict menjaga urutan penyisipan)
+            for key in list(entries)[:len(entries) - DIGEST_CACHE_MAX_ENTRIES]:
+                del entries[key]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Peringatan: Gagal menyimpan cache digest: {e}")
+
+    def get(self, path, algorithms):
+        """Mengembalikan dict digest jika SEMUA algoritma sudah ada di cache, selain itu None."""
+        key = file_identity(path)
+        with self._lock:
+            entry = self._load().get(key)
+        if entry and all(name in entry for name in algorithms):
+            return {name: entry[name] for name in algorithms}
+        return None
+
+    def put(self, path, digests):
+        key = file_identity(path)
+        with self._lock:
+            entries = self._load()
+            entry = entries.pop(key, {})
+            entry.update(digests)
+            entries[key] = entry
+            self._save()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DigestCache()
+        return _default_cache
+
+# =========================================================
+# HASHING SATU KALI BACA (MMAP / BUFFER BESAR)
+# =========================================================
+
+def _update_from_file(path, hashers, buffer_size):
+    size = os.path.getsize(path)
+    if size == 0:
+        return
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mm)
+            try:
+                for offset in range(0, size, buffer_size):
+                    chunk = view[offset:offset + buffer_size]
+                    for h in hashers:
+                        h.update(chunk)
+                    chunk.release()
+            finally:
+                view.release()
+        return
+    except (ValueError, OSError):
+        # mmap tidak tersedia (mis. filesystem khusus) -> ulang dari awal dengan readinto
+        hashers[:] = [hashlib.new(h.name) for h in hashers]
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            for h in hashers:
+                h.update(view[:n])
+
+
+def hash_file(path, algorithms=DEFAULT_ALGORITHMS, cache=None, use_cache=True,
+              buffer_size=HASH_BUFFER_SIZE):
+    """
+    Menghitung beberapa digest (default MD5 + SHA-256) dalam SATU kali baca file.
+    Hasil disimpan di cache sehingga verifikasi ulang tidak perlu membaca file lagi.
+    """
+    algorithms = tuple(algorithms)
+    if use_cache:
+        cache = cache or get_default_cache()
+        cached = cache.get(path, algorithms)
+        if cached:
+            return cached
+
+    hashers = [hashlib.new(name) for name in algorithms]
+    _update_from_file(path, hashers, buffer_size)
+    digests = {name: h.hexdigest() for name, h in zip(algorithms, hashers)}
+
+    if use_cache:
+        cache.put(path, digests)
+    return digests
+
+
+def hash_files(paths, algorithms=DEFAULT_ALGORITHMS, max_workers=None, use_cache=True):
+    """
+    Hash beberapa file secara paralel. hashlib melepas GIL untuk buffer besar,
+    jadi thread pool cukup untuk memakai semua core.
+    """
+    max_workers = max_workers or min(len(paths), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(lambda p: hash_file(p, algorithms, use_cache=use_cache), paths)
+        return dict(zip(paths, results))
@@ -0,0 +1,167 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+from urllib.parse import urlparse
+
+# =========================================================
+# KONSTANTA & KONFIGURASI STATISTIK HOST
+# =========================================================
+
+HOST_STATS_PATH = os.environ.get(
+    "HOST_STATS_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "host_stats.json"),
+)
+# Pilihan jumlah koneksi per file (aria2c membatasi -x maksimal 16)
+CONNECTION_CHOICES = (1, 2, 4, 8, 16)
+DEFAULT_CONNECTIONS = 16
+# Bobot sampel baru pada rata-rata bergerak (EWMA) throughput
+EWMA_ALPHA = 0.3
+# Sampel yang terlalu kecil (handshake/slow start) tidak representatif
+MIN_SAMPLE_BYTES = 4 * 1024 * 1024
+MIN_SAMPLE_SECONDS = 3
+# Peluang mencoba jumlah koneksi tetangga yang belum pernah diukur
+EXPLORE_RATE = float(os.environ.get("HOST_STATS_EXPLORE_RATE", "0.2"))
+# Beralih koneksi di tengah unduhan hanya jika perkiraan kenaikan cukup besar
+RETUNE_MIN_GAIN = 1.2
+# Lama pengukuran sebelum memutuskan retune di tengah unduhan
+RETUNE_WINDOW_SECONDS = int(os.environ.get("HOST_STATS_RETUNE_WINDOW", "20"))
+# Jarak minimum antar retune dalam satu unduhan (tiap retune memulai ulang koneksi)
+RETUNE_MIN_GAP_SECONDS = int(os.environ.get("HOST_STATS_RETUNE_GAP", "60"))
+HOST_STATS_MAX_HOSTS = 500
+
+# =========================================================
+# KUNCI HOST
+# =========================================================
+
+def host_key(url):
+    """
+    Nama host yang dinormalisasi. Angka diganti '#', sehingga server unduhan
+    bernomor (download1234.mediafire.com) berbagi satu riwayat.
+    """
+    host = (urlparse(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return re.sub(r"\d+", "#", host)
+
+# =========================================================
+# STORE
+# =========================================================
+
+class HostStats:
+    """
+    Store JSON kecil: throughput (EWMA, byte/detik) per host per jumlah koneksi.
+    Format: {host: {"16": {"bps": 1.2e7, "samples": 3, "updated": 1700000000}}}
+    """
+
+    def __init__(self, path=HOST_STATS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._hosts = None
+
+    def _load(self):
+        if self._hosts is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._hosts = json.load(f)
+            except (OSError, ValueError):
+                self._hosts = {}
+        return self._hosts
+
+    def _save(self):
+        hosts = self._hosts
+        if len(hosts) > HOST_STATS_MAX_HOSTS:
+            # Buang host yang paling lama tidak diperbarui
+            by_age = sorted(hosts, key=lambda h: max(s.get("updated", 0) for s in hosts[h].values()) if hosts[h] else 0)
+            for host in by_age[:len(hosts) - HOST_STATS_MAX_HOSTS]:
+                del hosts[host]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(hosts, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Peringatan: Gagal menyimpan statistik host: {e}")
+
+    def record(self, host, connections, bytes_done, seconds):
+        """Mencatat satu sampel throughput. Sampel terlalu kecil diabaikan."""
+        if not host or bytes_done < MIN_SAMPLE_BYTES or seconds < MIN_SAMPLE_SECONDS:
+            return
+        bps = bytes_done / seconds
+        with self._lock:
+            entry = self._load().setdefault(host, {}).setdefault(str(connections), {"bps": bps, "samples": 0})
+            if entry["samples"]:
+                entry["bps"] = EWMA_ALPHA * bps + (1 - EWMA_ALPHA) * entry["bps"]
+            entry["samples"] += 1
+            entry["updated"] = int(time.time())
+            self._save()
+
+    def throughput(self, host, connections):
+        with self._lock:
+            entry = self._load().get(host, {}).get(str(connections))
+        return entry["bps"] if entry else None
+
+    def best_connections(self, host):
+        """Mengembalikan (koneksi, bps) terbaik yang pernah diukur, atau (None, None)."""
+        with self._lock:
+            measured = dict(self._load().get(host, {}))
+        if not measured:
+            return None, None
+        best = max(measured, key=lambda c: measured[c]["bps"])
+        return int(best), measured[best]["bps"]
+
+    def _untried_neighbours(self, host, connections):
+        with self._lock:
+            measured = self._load().get(host, {})
+        index = CONNECTION_CHOICES.index(connections) if connections in CONNECTION_CHOICES else len(CONNECTION_CHOICES) - 1
+        neighbours = CONNECTION_CHOICES[max(0, index - 1):index] + CONNECTION_CHOICES[index + 1:index + 2]
+        return [c for c in neighbours if str(c) not in measured]
+
+    def choose_connections(self, host, explore=True):
+        """
+        Jumlah koneksi untuk unduhan berikutnya: terbaik dari riwayat, sesekali
+        mencoba tetangganya yang belum diukur (hill climbing). Tanpa riwayat: default.
+        """
+        best, _ = self.best_connections(host)
+        if best is None:
+            return DEFAULT_CONNECTIONS
+        if explore and random.random() < EXPLORE_RATE:
+            untried = self._untried_neighbours(host, best)
+            if untried:
+                return random.choice(untried)
+        return best
+
+    def suggest_retune(self, host, connections, current_bps):
+        """
+        Dipanggil di tengah unduhan setelah throughput terukur. Mengembalikan jumlah
+        koneksi baru jika riwayat menjanjikan kenaikan >= RETUNE_MIN_GAIN. Tetangga
+        yang belum diukur hanya dicoba jika masuk akal menaikkan throughput: lebih
+        banyak koneksi selalu layak dicoba, lebih sedikit koneksi hanya jika
+        throughput sekarang jauh di bawah riwayat jumlah koneksi ini (host membatasi
+        atau menghukum banyak koneksi). None = pertahankan.
+        """
+        best, best_bps = self.best_connections(host)
+        if best is not None and best != connections and best_bps >= current_bps * RETUNE_MIN_GAIN:
+            return best
+        untried = self._untried_neighbours(host, connections)
+        higher = [c for c in untried if c > connections]
+        if higher:
+            return min(higher)
+        lower = [c for c in untried if c < connections]
+        usual_bps = self.throughput(host, connections)
+        if lower and usual_bps and current_bps * RETUNE_MIN_GAIN <= usual_bps:
+            return max(lower)
+        return None
+
+_default_stats = None
+_default_stats_lock = threading.Lock()
+
+def get_default_stats():
+    global _default_stats
+    with _default_stats_lock:
+        if _default_stats is None:
+            _default_stats = HostStats()
+        return _default_stats
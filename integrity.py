@@ -0,0 +1,342 @@
+import io
+import os
+import json
+import base64
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from urllib.parse import urlparse
+from hashing import file_identity, get_default_cache
+from timing import timed
+
+# =========================================================
+# KONSTANTA & KONFIGURASI INTEGRITAS
+# =========================================================
+
+# Ukuran segmen manifest. Harus membagi FANOUT_READ_SIZE dan DRIVE_CHUNK_SIZE agar
+# chunk upload bisa dicek per segmen tanpa hash ulang
+INTEGRITY_SEGMENT_SIZE = int(os.environ.get("INTEGRITY_SEGMENT_SIZE", str(4 * 1024 * 1024)))
+# Tanpa digest dari sumber: jumlah segmen acak (selain segmen pertama & terakhir)
+# yang dibaca ulang dari sumber sebagai uji sampel
+INTEGRITY_SAMPLE_SEGMENTS = int(os.environ.get("INTEGRITY_SAMPLE_SEGMENTS", "2"))
+# Uji sampel menambah trafik & latensi ke sumber, jadi opt-in per host: daftar host
+# dipisah koma (cocok dengan akhiran nama host), "*" = semua host, kosong = mati
+INTEGRITY_SPOT_CHECK_HOSTS = [h.strip().lower() for h in os.environ.get("INTEGRITY_SPOT_CHECK_HOSTS", "").split(",") if h.strip()]
+INTEGRITY_WORKERS = int(os.environ.get("INTEGRITY_WORKERS", "4"))
+MANIFEST_DIR = os.environ.get(
+    "MANIFEST_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "manifests"),
+)
+RANGE_TIMEOUT = 60
+
+
+class IntegrityError(Exception):
+    pass
+
+# =========================================================
+# DIGEST DARI HEADER SUMBER
+# =========================================================
+
+def _b64_to_hex(value):
+    try:
+        return base64.b64decode(value.strip().strip(":")).hex()
+    except (ValueError, TypeError):
+        return None
+
+
+def expected_digests(headers):
+    """
+    Digest isi file yang diumumkan server: Content-MD5, x-goog-hash, Digest
+    atau Repr-Digest. Mengembalikan dict {"md5"/"sha256": hex} (kosong jika tidak ada).
+
+    ETag tidak dipakai walau berbentuk MD5: nilainya buram (multipart S3, CDN,
+    hash versi) sehingga hanya diperlakukan sebagai validator; tanpa digest di
+    atas, verify_download memakai jalur uji sampel (jika diaktifkan untuk host itu).
+    """
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+    digests = {}
+    if headers.get("content-md5"):
+        digests["md5"] = _b64_to_hex(headers["content-md5"])
+    for field in ("x-goog-hash", "digest", "repr-digest"):
+        for part in (headers.get(field) or "").split(","):
+            name, _, value = part.strip().partition("=")
+            name = name.lower()
+            if name == "md5":
+                digests.setdefault("md5", _b64_to_hex(value))
+            elif name in ("sha-256", "sha256"):
+                digests.setdefault("sha256", _b64_to_hex(value))
+    return {name: value for name, value in digests.items() if value}
+
+# =========================================================
+# MANIFEST SEGMEN
+# =========================================================
+
+class SegmentManifest:
+    """MD5 per segmen + MD5/SHA-256 seluruh file, dikunci identitas file (hashing.file_identity)."""
+
+    def __init__(self, size, segment_size, segments, md5, sha256):
+        self.size = size
+        self.segment_size = segment_size
+        self.segments = segments
+        self.md5 = md5
+        self.sha256 = sha256
+
+    def segment_range(self, index):
+        start = index * self.segment_size
+        return start, min(start + self.segment_size, self.size)
+
+    def matches(self, digests):
+        """True/False terhadap digest sumber; None jika tidak ada yang bisa dibandingkan."""
+        results = [getattr(self, name) == value.lower() for name, value in (digests or {}).items()
+                   if name in ("md5", "sha256")]
+        return all(results) if results else None
+
+    def to_dict(self):
+        return {"size": self.size, "segment_size": self.segment_size, "segments": self.segments,
+                "md5": self.md5, "sha256": self.sha256}
+
+
+def _manifest_path(path):
+    key = hashlib.sha256(file_identity(path).encode()).hexdigest()[:24]
+    return os.path.join(MANIFEST_DIR, f"{key}.json")
+
+
+def save_manifest(path, manifest):
+    try:
+        os.makedirs(MANIFEST_DIR, exist_ok=True)
+        target = _manifest_path(path)
+        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest.to_dict(), f)
+        os.replace(tmp_path, target)
+    except OSError as e:
+        print(f"Peringatan: Gagal menyimpan manifest: {e}")
+    # Uploader memakai digest ini tanpa membaca file lagi
+    get_default_cache().put(path, {"md5": manifest.md5, "sha256": manifest.sha256})
+
+
+def load_manifest(path):
+    """Manifest file yang belum berubah sejak dibuat, atau None."""
+    try:
+        with open(_manifest_path(path), "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("size") != os.path.getsize(path):
+        return None
+    return SegmentManifest(data["size"], data["segment_size"], data["segments"], data["md5"], data["sha256"])
+
+
+@timed("hash.manifest")
+def build_manifest(path, segment_size=INTEGRITY_SEGMENT_SIZE):
+    """Satu kali baca: MD5 per segmen + MD5 & SHA-256 file. Disimpan (manifest + cache digest)."""
+    size = os.path.getsize(path)
+    file_md5, file_sha256 = hashlib.md5(), hashlib.sha256()
+    segments = []
+    buf = bytearray(segment_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            chunk = view[:n]
+            segments.append(hashlib.md5(chunk).hexdigest())
+            file_md5.update(chunk)
+            file_sha256.update(chunk)
+    manifest = SegmentManifest(size, segment_size, segments, file_md5.hexdigest(), file_sha256.hexdigest())
+    save_manifest(path, manifest)
+    return manifest
+
+
+def manifest_for(path):
+    return load_manifest(path) or build_manifest(path)
+
+def spot_check_enabled(url):
+    host = (urlparse(url).hostname or "").lower()
+    return any(entry == "*" or host == entry or host.endswith("." + entry) for entry in INTEGRITY_SPOT_CHECK_HOSTS)
+
+# =========================================================
+# BACA ULANG RANGE DARI SUMBER & PERBAIKAN SEGMEN
+# =========================================================
+
+def fetch_range(url, headers, start, end):
+    """Mengambil byte [start, end) dari sumber. Melempar IntegrityError jika Range tidak didukung."""
+    range_headers = dict(headers or {}, Range=f"bytes={start}-{end - 1}")
+    response = requests.get(url, headers=range_headers, timeout=RANGE_TIMEOUT)
+    if response.status_code != 206 or len(response.content) != end - start:
+        raise IntegrityError(f"Sumber tidak melayani Range (status {response.status_code}).")
+    return response.content
+
+
+def repair_segments(path, manifest, url, headers, indexes):
+    """
+    Membaca ulang segmen dari sumber dan menimpa segmen lokal yang berbeda.
+    Mengembalikan list indeks segmen yang diperbaiki.
+    """
+    repaired = []
+    lock = threading.Lock()
+    fd = os.open(path, os.O_RDWR)
+    try:
+        def check(index):
+            start, end = manifest.segment_range(index)
+            data = fetch_range(url, headers, start, end)
+            if hashlib.md5(data).hexdigest() != manifest.segments[index]:
+                os.pwrite(fd, data, start)
+                with lock:
+                    repaired.append(index)
+
+        with ThreadPoolExecutor(max_workers=INTEGRITY_WORKERS) as pool:
+            list(pool.map(check, indexes))
+        if repaired:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    return sorted(repaired)
+
+
+def verify_download(path, url, headers=None, expected=None):
+    """
+    Verifikasi hasil unduhan sebelum di-commit:
+      - ada digest sumber: cocokkan; jika beda, semua segmen dibaca ulang dan
+        hanya segmen yang berbeda ditimpa,
+      - tanpa digest (hanya host di INTEGRITY_SPOT_CHECK_HOSTS, file lebih besar
+        dari sampel): segmen pertama, terakhir dan beberapa segmen acak dibaca
+        ulang; satu saja berbeda -> seluruh segmen diperiksa.
+    Mengembalikan manifest akhir. Melempar IntegrityError jika tetap tidak cocok.
+    """
+    manifest = build_manifest(path)
+    count = len(manifest.segments)
+    if manifest.matches(expected) or count == 0:
+        return manifest
+
+    sample_repaired = []
+    if expected:
+        print(f"⚠️ Digest {os.path.basename(path)} tidak cocok dengan sumber. Memeriksa {count} segmen...")
+        suspects = range(count)
+    else:
+        # Tanpa digest: uji sampel hanya untuk host yang diaktifkan, dan hanya jika
+        # sampelnya lebih kecil dari file (file kecil = mengunduh ulang semuanya)
+        if not spot_check_enabled(url) or count <= INTEGRITY_SAMPLE_SEGMENTS + 2:
+            return manifest
+        sample = {0, count - 1} | set(random.sample(range(count), min(INTEGRITY_SAMPLE_SEGMENTS, count)))
+        try:
+            sample_repaired = repair_segments(path, manifest, url, headers, sorted(sample))
+            if not sample_repaired:
+                return manifest
+        except (IntegrityError, requests.exceptions.RequestException) as e:
+            print(f"Peringatan: Uji sampel integritas dilewati: {e}")
+            return manifest
+        print(f"⚠️ Segmen sampel {os.path.basename(path)} berbeda dari sumber. Memeriksa {count} segmen...")
+        suspects = [i for i in range(count) if i not in sample]
+
+    try:
+        repaired = sample_repaired + repair_segments(path, manifest, url, headers, suspects)
+    except (IntegrityError, requests.exceptions.RequestException) as e:
+        raise IntegrityError(f"Perbaikan segmen gagal: {e}")
+    manifest = build_manifest(path)
+    if manifest.matches(expected) is False:
+        if not repaired:
+            # Isi identik dengan sumber: "digest" dari header ternyata bukan digest isi
+            print("Peringatan: Semua segmen identik dengan sumber; digest header diabaikan.")
+            return manifest
+        raise IntegrityError("Digest tetap tidak cocok setelah perbaikan segmen.")
+    print(f"🩹 {len(repaired)} segmen diperbaiki dari sumber ({os.path.basename(path)}).")
+    return manifest
+
+# =========================================================
+# PEMERIKSAAN PER CHUNK SAAT UPLOAD
+# =========================================================
+
+def bad_segments(manifest, offset, data):
+    """Indeks segmen manifest yang tercakup penuh oleh data@offset dan digest-nya berbeda."""
+    if manifest is None:
+        return []
+    bad = []
+    view = memoryview(data)
+    first = -(-offset // manifest.segment_size)
+    for index in range(first, len(manifest.segments)):
+        start, end = manifest.segment_range(index)
+        if end > offset + len(data):
+            break
+        if hashlib.md5(view[start - offset:end - offset]).hexdigest() != manifest.segments[index]:
+            bad.append(index)
+    return bad
+
+
+def read_verified(f, manifest, offset, length):
+    """
+    Membaca length byte dari offset lalu mencocokkan dengan manifest. Bacaan yang
+    salah diulang sekali (gangguan baca sesaat); jika tetap salah, file di disk
+    sudah berubah/korup -> IntegrityError sebelum ada byte yang terkirim.
+    """
+    for attempt in range(2):
+        data = os.pread(f.fileno(), length, offset)
+        bad = bad_segments(manifest, offset, data)
+        if not bad:
+            return data
+        print(f"⚠️ Segmen {bad} tidak cocok dengan manifest saat upload (percobaan {attempt + 1}).")
+    raise IntegrityError(f"Segmen {bad} korup di disk.")
+
+
+class VerifiedFileReader(io.RawIOBase):
+    """
+    File-like untuk uploader yang membaca file sendiri (Pyrogram): setiap segmen
+    dicek terhadap manifest sebelum byte-nya diberikan.
+    """
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.name = path
+        self.manifest = manifest
+        self.size = manifest.size
+        self._file = open(path, "rb", buffering=0)
+        self._position = 0
+        self._segment_index = None
+        self._segment_data = b""
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self._position = max(0, offset)
+        return self._position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._position
+        parts = []
+        while size > 0 and self._position < self.size:
+            index = self._position // self.manifest.segment_size
+            if index != self._segment_index:
+                start, end = self.manifest.segment_range(index)
+                self._segment_data = read_verified(self._file, self.manifest, start, end - start)
+                self._segment_index = index
+            start, _ = self.manifest.segment_range(index)
+            inner = self._position - start
+            piece = self._segment_data[inner:inner + size]
+            parts.append(piece)
+            self._position += len(piece)
+            size -= len(piece)
+        return b"".join(parts)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
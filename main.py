@@ -3,27 +3,31 @@ import sys
 
 # ✅ Import hanya Class DownloaderBot dari file utils
 from utils import DownloaderBot
+import timing
+from storage import write_download_marker
+from profiling import run_profiled
 
 # Dapatkan URL dari environment variable
 url_to_download = os.environ.get("MEDIAFIRE_PAGE_URL")
 
-if __name__ == "__main__":
+def main():
+    """Mengunduh URL dari MEDIAFIRE_PAGE_URL dan mencatat nama file hasilnya."""
     if url_to_download:
         print(f"Memulai proses download untuk URL: {url_to_download}")
-        downloaded_filename = None
-        
+        downloaded_files = None
+        # Log timing baru untuk job ini (upload.py / telegram_upload.py menambahkan span-nya sendiri)
+        timing.reset()
+
         try:
-            # 1. Inisialisasi Class
-            downloader = DownloaderBot(url_to_download)
-            
-            # 2. Jalankan Proses Utama dan tangkap nama file yang diunduh
-            downloaded_filename = downloader.run()
-            
-            # 3. Buat downloaded_filename.txt jika berhasil
-            if downloaded_filename:
-                with open("downloaded_filename.txt", "w") as f: 
-                    f.write(downloaded_filename)
-                print(f"✅ Selesai. Nama file: {downloaded_filename} telah dicatat dalam downloaded_filename.txt")
+            # 1. Inisialisasi Class (driver & folder temp dibersihkan saat keluar dari blok with)
+            with DownloaderBot(url_to_download, work_dir=os.getcwd()) as downloader:
+                # 2. Jalankan Proses Utama dan tangkap nama file yang diunduh (list; folder bisa banyak)
+                downloaded_files = downloader.run()
+
+            # 3. Buat downloaded_filename.txt (satu nama per baris) jika berhasil
+            if downloaded_files:
+                write_download_marker(downloaded_files)
+                print(f"✅ Selesai. {len(downloaded_files)} file telah dicatat dalam downloaded_filename.txt: {', '.join(downloaded_files)}")
             else:
                 print("❌ Proses download selesai tanpa menghasilkan file yang valid.")
                 sys.exit(1)
@@ -35,3 +39,7 @@ if __name__ == "__main__":
     else:
         print("Error: MEDIAFIRE_PAGE_URL environment variable not set.")
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_profiled("main", main)
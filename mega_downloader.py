@@ -0,0 +1,325 @@
+import os
+import re
+import json
+import time
+import base64
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from Crypto.Cipher import AES
+from storage import ensure_free_space, preallocate
+
+# =========================================================
+# KONSTANTA & KONFIGURASI MEGA
+# =========================================================
+
+MEGA_API_URL = os.environ.get("MEGA_API_URL", "https://g.api.mega.co.nz/cs")
+MEGA_CONNECTIONS = int(os.environ.get("MEGA_CONNECTIONS", "8"))
+MEGA_CRYPTO_WORKERS = int(os.environ.get("MEGA_CRYPTO_WORKERS", str(os.cpu_count() or 1)))
+# Satu request HTTP mengambil beberapa chunk MAC MEGA sekaligus
+MEGA_SEGMENT_SIZE = int(os.environ.get("MEGA_SEGMENT_SIZE", str(8 * 1024 * 1024)))
+MEGA_MAX_RETRIES = 5
+# Jeda minimum antar penyimpanan state checkpoint (segmen selesai + MAC chunk)
+MEGA_STATE_INTERVAL = float(os.environ.get("MEGA_STATE_INTERVAL", "5"))
+
+
+class MegaError(Exception):
+    pass
+
+# =========================================================
+# FUNGSI BANTUAN KRIPTO MEGA
+# =========================================================
+
+def base64_url_decode(data):
+    data = data.replace(",", "")
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def parse_mega_url(url):
+    """Mengembalikan (file_id, key_string) dari link publik MEGA (format baru maupun lama)."""
+    if "/folder/" in url or "#F!" in url:
+        raise MegaError("Link folder MEGA belum didukung.")
+    match = re.search(r"/file/([\w-]+)#([\w,-]+)", url) or re.search(r"#!([\w-]+)!([\w,-]+)", url)
+    if not match:
+        raise MegaError("URL MEGA tidak valid.")
+    return match.group(1), match.group(2)
+
+
+def unpack_file_key(key_string):
+    """Memecah kunci file 256-bit menjadi (aes_key, nonce CTR 8 byte, meta MAC)."""
+    raw = base64_url_decode(key_string)
+    if len(raw) != 32:
+        raise MegaError("Kunci file MEGA tidak valid.")
+    k = struct.unpack(">8I", raw)
+    aes_key = struct.pack(">4I", k[0] ^ k[4], k[1] ^ k[5], k[2] ^ k[6], k[3] ^ k[7])
+    nonce = struct.pack(">2I", k[4], k[5])
+    meta_mac = (k[6], k[7])
+    return aes_key, nonce, meta_mac
+
+
+def decrypt_attributes(encoded_attributes, aes_key):
+    data = base64_url_decode(encoded_attributes)
+    plain = AES.new(aes_key, AES.MODE_CBC, iv=b"\0" * 16).decrypt(data).rstrip(b"\0")
+    if not plain.startswith(b"MEGA{"):
+        raise MegaError("Gagal mendekripsi atribut file (kunci salah?).")
+    return json.loads(plain[4:].decode("utf-8", errors="replace"))
+
+
+def get_chunks(size):
+    """Batas chunk MAC MEGA: 128 KB, 256 KB, ... 1 MB, lalu 1 MB seterusnya."""
+    chunks = []
+    start, chunk_size = 0, 0x20000
+    while start < size:
+        length = min(chunk_size, size - start)
+        chunks.append((start, length))
+        start += length
+        if chunk_size < 0x100000:
+            chunk_size += 0x20000
+    return chunks
+
+
+def group_segments(chunks, segment_size=MEGA_SEGMENT_SIZE):
+    """Mengelompokkan chunk berurutan menjadi segmen HTTP (list index chunk)."""
+    segments, current, current_size = [], [], 0
+    for index, (_, length) in enumerate(chunks):
+        current.append(index)
+        current_size += length
+        if current_size >= segment_size:
+            segments.append(current)
+            current, current_size = [], 0
+    if current:
+        segments.append(current)
+    return segments
+
+
+def chunk_mac(aes_key, nonce, data):
+    """CBC-MAC satu chunk (IV = nonce || nonce), sama dengan perhitungan klien MEGA."""
+    if len(data) % 16:
+        data = data + b"\0" * (16 - len(data) % 16)
+    return AES.new(aes_key, AES.MODE_CBC, iv=nonce + nonce).encrypt(data)[-16:]
+
+
+def condense_macs(aes_key, chunk_macs):
+    """Menggabungkan MAC per chunk menjadi meta MAC file (2 word)."""
+    ecb = AES.new(aes_key, AES.MODE_ECB)
+    file_mac = bytes(16)
+    for mac in chunk_macs:
+        file_mac = ecb.encrypt(bytes(a ^ b for a, b in zip(file_mac, mac)))
+    w = struct.unpack(">4I", file_mac)
+    return (w[0] ^ w[1], w[2] ^ w[3])
+
+
+def safe_filename(name, fallback):
+    """
+    Nama file dari atribut MEGA dikendalikan pengunggah: buang komponen path
+    agar tidak bisa menulis di luar folder tujuan.
+    """
+    name = os.path.basename(str(name or "").replace("\\", "/"))
+    name = name.replace(os.sep, "_").replace("\0", "").strip()
+    if name in ("", ".", ".."):
+        return fallback
+    return name
+
+# =========================================================
+# CLASS UTAMA: MegaDownloader
+# =========================================================
+
+class MegaDownloader:
+    """
+    Downloader MEGA in-process: resolve link publik lewat API, mengambil segmen
+    terenkripsi lewat beberapa koneksi sekaligus, lalu dekripsi AES-CTR dan
+    verifikasi MAC dijalankan di worker pool.
+    """
+
+    def __init__(self, url, api_url=MEGA_API_URL, connections=MEGA_CONNECTIONS,
+                 crypto_workers=MEGA_CRYPTO_WORKERS, segment_size=MEGA_SEGMENT_SIZE,
+                 progress_callback=None):
+        self.url = url
+        self.api_url = api_url
+        self.connections = max(1, connections)
+        self.crypto_workers = max(1, crypto_workers)
+        self.segment_size = segment_size
+        self.progress_callback = progress_callback
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.connections, pool_maxsize=self.connections)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.file_id, key_string = parse_mega_url(url)
+        self.aes_key, self.nonce, self.meta_mac = unpack_file_key(key_string)
+        self.filename = None
+        self.size = None
+        self.download_url = None
+
+    def _api_request(self, payload):
+        for attempt in range(MEGA_MAX_RETRIES):
+            response = self.session.post(self.api_url, params={"id": int(time.time() * 1000)},
+                                         json=[payload], timeout=30)
+            response.raise_for_status()
+            result = response.json()
+            if isinstance(result, int):
+                result = [result]
+            result = result[0]
+            # -3 = EAGAIN: server sibuk, coba lagi
+            if result == -3:
+                time.sleep(2 ** attempt)
+                continue
+            if isinstance(result, int):
+                raise MegaError(f"MEGA API error {result}")
+            return result
+        raise MegaError("MEGA API sibuk (EAGAIN) setelah beberapa kali percobaan.")
+
+    def resolve(self):
+        """Mengambil nama, ukuran dan URL download (terenkripsi) dari link publik."""
+        info = self._api_request({"a": "g", "g": 1, "ssl": 0, "p": self.file_id})
+        if "g" not in info:
+            raise MegaError("File MEGA tidak tersedia (mungkin melebihi kuota transfer).")
+        attributes = decrypt_attributes(info["at"], self.aes_key)
+        self.filename = safe_filename(attributes.get("n"), f"mega_{self.file_id}")
+        self.size = int(info["s"])
+        self.download_url = info["g"]
+        return self.filename, self.size
+
+    def _fetch(self, start, length):
+        url = f"{self.download_url}/{start}-{start + length - 1}"
+        last_error = None
+        for attempt in range(MEGA_MAX_RETRIES):
+            try:
+                response = self.session.get(url, timeout=60)
+                response.raise_for_status()
+                if len(response.content) != length:
+                    raise MegaError(f"Segmen {start} terpotong ({len(response.content)}/{length} byte).")
+                return response.content
+            except (requests.exceptions.RequestException, MegaError) as e:
+                last_error = e
+                time.sleep(min(2 ** attempt, 10))
+        raise MegaError(f"Gagal mengambil segmen {start}: {last_error}")
+
+    def download(self, dest_dir, checkpoint=None):
+        """
+        Mengunduh dan mendekripsi file ke dest_dir. Mengembalikan path file final.
+        Dengan checkpoint (dest_dir = direktori checkpoint), segmen yang sudah
+        selesai beserta MAC chunk-nya disimpan berkala sehingga job ulang hanya
+        mengambil segmen yang belum ada.
+        """
+        if self.download_url is None:
+            self.resolve()
+
+        final_path = os.path.join(dest_dir, self.filename)
+        part_path = final_path + ".part"
+        chunks = get_chunks(self.size)
+        segments = group_segments(chunks, self.segment_size)
+        chunk_macs = [None] * len(chunks)
+        completed_segments = set()
+
+        resumed = False
+        if checkpoint:
+            validators = {"meta_mac": "%08x%08x" % self.meta_mac}
+            resumed = checkpoint.prepare(self.filename, self.download_url, self.size, validators)
+            resumed = resumed and os.path.exists(part_path) and os.path.getsize(part_path) == self.size
+            if resumed:
+                state = checkpoint.get_state(self.filename)
+                for index, mac in state.get("chunk_macs", {}).items():
+                    chunk_macs[int(index)] = bytes.fromhex(mac)
+                completed_segments = {i for i in state.get("segments", [])
+                                      if all(chunk_macs[index] is not None for index in segments[i])}
+
+        progress_lock = threading.Lock()
+        report_lock = threading.Lock()
+        done_bytes = [sum(chunks[index][1] for i in completed_segments for index in segments[i])]
+        errors = []
+        # Batasi segmen yang sedang di memori (fetch + antre dekripsi)
+        in_flight = threading.BoundedSemaphore(self.connections * 2)
+        last_state_save = [time.time()]
+
+        if not resumed:
+            ensure_free_space(dest_dir, self.size)
+            # Blok disk dipesan di awal; pwrite segmen paralel tidak memecah file
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            preallocate(part_path, self.size)
+        fd = os.open(part_path, os.O_RDWR)
+
+        def save_state(force=False):
+            # Dipanggil dengan progress_lock; data harus sudah di disk sebelum dicatat selesai
+            if not checkpoint or not (force or time.time() - last_state_save[0] >= MEGA_STATE_INTERVAL):
+                return
+            os.fdatasync(fd)
+            checkpoint.save_state(self.filename, {
+                "segments": sorted(completed_segments),
+                "chunk_macs": {str(i): mac.hex() for i, mac in enumerate(chunk_macs) if mac is not None},
+            })
+            last_state_save[0] = time.time()
+
+        try:
+
+            def decrypt_segment(segment_index, indexes, data):
+                try:
+                    seg_start = chunks[indexes[0]][0]
+                    cipher = AES.new(self.aes_key, AES.MODE_CTR, nonce=self.nonce,
+                                     initial_value=seg_start // 16)
+                    plain = cipher.decrypt(data)
+                    view = memoryview(plain)
+                    for index in indexes:
+                        start, length = chunks[index]
+                        offset = start - seg_start
+                        chunk_macs[index] = chunk_mac(self.aes_key, self.nonce, bytes(view[offset:offset + length]))
+                    os.pwrite(fd, plain, seg_start)
+                    with progress_lock:
+                        completed_segments.add(segment_index)
+                        save_state()
+                        done_bytes[0] += len(plain)
+                    # Callback (mis. pacing bandwidth) boleh tidur: jalankan di luar
+                    # progress_lock, tetapi berurutan agar nilai yang dilaporkan naik terus
+                    if self.progress_callback:
+                        with report_lock:
+                            self.progress_callback(done_bytes[0], self.size)
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    in_flight.release()
+
+            with ThreadPoolExecutor(max_workers=self.crypto_workers) as crypto_pool, \
+                 ThreadPoolExecutor(max_workers=self.connections) as fetch_pool:
+
+                def fetch_segment(segment_index, indexes):
+                    try:
+                        if errors:
+                            in_flight.release()
+                            return
+                        seg_start = chunks[indexes[0]][0]
+                        last_start, last_length = chunks[indexes[-1]]
+                        data = self._fetch(seg_start, last_start + last_length - seg_start)
+                        crypto_pool.submit(decrypt_segment, segment_index, indexes, data)
+                    except Exception as e:
+                        errors.append(e)
+                        in_flight.release()
+
+                fetch_futures = []
+                for segment_index, indexes in enumerate(segments):
+                    if segment_index in completed_segments:
+                        continue
+                    in_flight.acquire()
+                    if errors:
+                        in_flight.release()
+                        break
+                    fetch_futures.append(fetch_pool.submit(fetch_segment, segment_index, indexes))
+                for future in fetch_futures:
+                    future.result()
+        finally:
+            with progress_lock:
+                save_state(force=True)
+            os.close(fd)
+
+        if errors:
+            raise MegaError(f"Unduhan MEGA gagal: {errors[0]}")
+        if condense_macs(self.aes_key, chunk_macs) != self.meta_mac:
+            if checkpoint:
+                checkpoint.discard(self.filename)
+            else:
+                os.remove(part_path)
+            raise MegaError("Verifikasi MAC gagal: file MEGA korup.")
+
+        os.replace(part_path, final_path)
+        return final_path
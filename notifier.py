@@ -0,0 +1,63 @@
+import os
+import math
+import requests
+
+# =========================================================
+# KONSTANTA & KONFIGURASI NOTIFIKASI
+# =========================================================
+
+# Modul ini sengaja hanya bergantung pada requests, agar uploader tidak ikut
+# memuat Selenium/yt-dlp saat hanya butuh kirim pesan.
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+
+
+def _default_bot_token():
+    return os.environ.get("BOT_TOKEN")
+
+
+def _default_chat_id():
+    return os.environ.get("PAYLOAD_SENDER") or os.environ.get("OWNER_ID")
+
+# =========================================================
+# FUNGSI BANTUAN TELEGRAM & UMUM
+# =========================================================
+
+def send_telegram_message(message_text, bot_token=None, chat_id=None):
+    """Fungsi untuk mengirim pesan ke Telegram dan mengembalikan message_id."""
+    bot_token = bot_token or _default_bot_token()
+    chat_id = chat_id or _default_chat_id()
+    if not bot_token or not chat_id:
+        print("Peringatan: BOT_TOKEN atau OWNER_ID tidak diatur. Notifikasi Telegram dinonaktifkan.")
+        return None
+    url = f"{TELEGRAM_API_URL}/bot{bot_token}/sendMessage"
+    payload = {"chat_id": chat_id, "text": message_text, "parse_mode": "Markdown"}
+    try:
+        response = requests.post(url, json=payload, timeout=10)
+        return response.json().get('result', {}).get('message_id')
+    except Exception as e:
+        print(f"Gagal mengirim pesan Telegram: {e}")
+        return None
+
+
+def edit_telegram_message(message_id, message_text, bot_token=None, chat_id=None):
+    """Fungsi untuk mengedit pesan yang sudah ada di Telegram."""
+    bot_token = bot_token or _default_bot_token()
+    chat_id = chat_id or _default_chat_id()
+    if not bot_token or not chat_id or not message_id:
+        # Menghilangkan pesan error agar tidak terlalu berisik
+        return
+    url = f"{TELEGRAM_API_URL}/bot{bot_token}/editMessageText"
+    payload = {"chat_id": chat_id, "message_id": message_id, "text": message_text, "parse_mode": "Markdown"}
+    try:
+        requests.post(url, json=payload, timeout=10)
+    except Exception as e:
+        print(f"Gagal mengedit pesan Telegram: {e}")
+
+
+def human_readable_size(size_bytes):
+    if size_bytes is None or size_bytes == 0: return "0B"
+    size_name = ("B", "KB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB")
+    i = int(math.floor(math.log(size_bytes, 1024))) if size_bytes > 0 else 0
+    p = math.pow(1024, i)
+    s = round(size_bytes / p, 2) if p > 0 else 0
+    return f"{s} {size_name[i]}"
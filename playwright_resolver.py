@@ -0,0 +1,239 @@
+import os
+import re
+import asyncio
+from urllib.parse import urlparse, urlunparse, urlencode, parse_qs
+from timing import start_span
+
+# =========================================================
+# KONSTANTA & KONFIGURASI PLAYWRIGHT
+# =========================================================
+
+# Jumlah halaman (masing-masing di context terisolasi) yang di-resolve bersamaan
+PLAYWRIGHT_CONCURRENCY = int(os.environ.get("PLAYWRIGHT_CONCURRENCY", "4"))
+# Batas waktu per langkah halaman (ms, satuan Playwright)
+PLAYWRIGHT_STEP_TIMEOUT = int(os.environ.get("PLAYWRIGHT_STEP_TIMEOUT", "20000"))
+# Batas waktu satu URL (navigasi + klik + menunggu download)
+PLAYWRIGHT_URL_TIMEOUT = int(os.environ.get("PLAYWRIGHT_URL_TIMEOUT", "90"))
+# Header request browser yang ikut diteruskan ke aria2c
+FORWARDED_REQUEST_HEADERS = ("user-agent", "referer", "accept", "accept-language", "authorization")
+APK_FILE_REGEX = re.compile(r'\.(apk|zip)$', re.I)
+
+AGGRESSIVE_SELECTORS = [
+    "xpath=//a[contains(translate(text(), 'DOWNLOAD', 'download'), 'download') or contains(translate(text(), 'GET', 'get'), 'get')]",
+    "button:has-text('Download')",
+    "a[href*='download']",
+    "button[id*='download']",
+    "button[type='submit']",
+    "form input[type='submit']",
+]
+
+
+class ResolveError(Exception):
+    pass
+
+# =========================================================
+# FUNGSI BANTUAN URL SOURCEFORGE
+# =========================================================
+
+def sourceforge_mirror_choices_url(download_url):
+    """URL halaman daftar mirror (/settings/mirror_choices) untuk file SourceForge."""
+    parsed_url = urlparse(download_url)
+    path_parts = parsed_url.path.split('/')
+    project_name = path_parts[2]
+    file_path = '/'.join(path_parts[4:-1])
+    query_params = {'projectname': project_name, 'filename': file_path}
+    return urlunparse((parsed_url.scheme, parsed_url.netloc, "/settings/mirror_choices", '', urlencode(query_params), ''))
+
+
+def set_query_param(url, param_name, param_value):
+    parsed_url = urlparse(url)
+    query_params = parse_qs(parsed_url.query)
+    query_params[param_name] = [param_value]
+    new_query = urlencode(query_params, doseq=True)
+    return urlunparse((parsed_url.scheme, parsed_url.netloc, parsed_url.path, parsed_url.params, new_query, parsed_url.fragment))
+
+# =========================================================
+# RESOLVER ASYNC (SATU CHROMIUM, BANYAK CONTEXT)
+# =========================================================
+
+class PlaywrightResolver:
+    """
+    Satu proses Chromium headless; setiap URL mendapat browser context sendiri
+    (cookie terpisah) dan berjalan bersamaan, dibatasi semaphore. Hasil resolve:
+    dict {name, urls, headers} yang langsung bisa diunduh aria2c (urls > 1 =
+    mirror). Download browser tidak pernah dijalankan sampai selesai.
+    """
+
+    def __init__(self, concurrency=PLAYWRIGHT_CONCURRENCY):
+        self.concurrency = concurrency
+        self._playwright = None
+        self._browser = None
+        self._semaphore = None
+
+    async def start(self):
+        # Import di sini: Playwright hanya dimuat jika engine ini dipakai
+        from playwright.async_api import async_playwright
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=True,
+            args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-blink-features=AutomationControlled'],
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def close(self):
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+    async def _new_page(self, context):
+        page = await context.new_page()
+        page.set_default_timeout(PLAYWRIGHT_STEP_TIMEOUT)
+        try:
+            from playwright_stealth import stealth_async
+            await stealth_async(page)
+        except ImportError:
+            try:
+                from playwright_stealth import Stealth
+                await Stealth().apply_stealth_async(page)
+            except ImportError:
+                pass
+        return page
+
+    async def _session_headers(self, context, page, url, request_headers=None):
+        """Header untuk aria2c: header request browser + Cookie dari context untuk URL file."""
+        headers = {name.title(): value for name, value in (request_headers or {}).items()
+                   if name.lower() in FORWARDED_REQUEST_HEADERS}
+        headers.setdefault("User-Agent", await page.evaluate("navigator.userAgent"))
+        headers.setdefault("Referer", page.url)
+        cookies = await context.cookies([url])
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+        return headers
+
+    async def _capture_download(self, context, page, click):
+        """Menjalankan click() dan menangkap download yang dipicunya (lalu dibatalkan)."""
+        async with page.expect_download() as download_info:
+            await click()
+        download = await download_info.value
+        url, name = download.url, download.suggested_filename
+        await download.cancel()
+        return {"name": name, "urls": [url], "headers": await self._session_headers(context, page, url)}
+
+    # --- Alur per host ---
+
+    async def _resolve_mediafire(self, context, page, url):
+        await page.goto(url)
+        if not await page.query_selector("#downloadButton"):
+            async with page.expect_navigation():
+                await page.eval_on_selector("form.dl-btn-form", "form => form.submit()")
+        href = await page.get_attribute("#downloadButton", "href")
+        if not href:
+            raise ResolveError("Atribut 'href' pada tombol download MediaFire kosong.")
+        name = urlparse(href).path.rstrip('/').split('/')[-1]
+        return {"name": name, "urls": [href], "headers": await self._session_headers(context, page, href)}
+
+    async def _resolve_gofile(self, context, page, url):
+        await page.goto(url)
+        button = await page.wait_for_selector("#download-btn", state="visible")
+        return await self._capture_download(context, page, button.click)
+
+    async def _resolve_sourceforge(self, context, page, url):
+        await page.goto(url)
+        button = await page.wait_for_selector("#remaining-buttons > div.large-12 > a.button.green", state="visible")
+        href = await button.get_attribute("href")
+        name = (await page.inner_text("#downloading > div.content > div.file-info > div")).strip()
+        await page.goto(sourceforge_mirror_choices_url(url))
+        await page.wait_for_selector("ul#mirrorList > li", state="attached")
+        mirror_ids = await page.eval_on_selector_all("ul#mirrorList > li", "items => items.map(li => li.id)")
+        urls = [set_query_param(href, 'use_mirror', mirror_id) for mirror_id in mirror_ids if mirror_id]
+        return {"name": name, "urls": urls or [href], "headers": await self._session_headers(context, page, href)}
+
+    async def _resolve_apkadmin(self, context, page, url):
+        candidates = []
+
+        def on_response(response):
+            # Respons file .apk/.zip dari host lain = link download langsung
+            if response.status == 200 and "apkadmin" not in response.url and APK_FILE_REGEX.search(urlparse(response.url).path):
+                size = int(response.headers.get("content-length") or 0)
+                candidates.append((size, response.url, response.request.headers))
+
+        page.on("response", on_response)
+        await page.goto(url)
+        await page.wait_for_selector("form[name='F1']", state="attached")
+        try:
+            async with page.expect_download(timeout=PLAYWRIGHT_STEP_TIMEOUT) as download_info:
+                await page.eval_on_selector("form[name='F1']", "form => form.submit()")
+            download = await download_info.value
+            candidates.append((0, download.url, {}))
+            await download.cancel()
+        except Exception:
+            # Tidak ada download otomatis: cukup dari log respons
+            await page.wait_for_timeout(2000)
+        if not candidates:
+            raise ResolveError("Tidak ada URL download (.apk/.zip) yang terdeteksi di respons jaringan.")
+        _, file_url, request_headers = max(candidates, key=lambda c: c[0])
+        name = urlparse(file_url).path.rstrip('/').split('/')[-1]
+        return {"name": name, "urls": [file_url], "headers": await self._session_headers(context, page, file_url, request_headers)}
+
+    async def _resolve_aggressive(self, context, page, url):
+        await page.goto(url)
+        for selector in AGGRESSIVE_SELECTORS:
+            element = await page.query_selector(selector)
+            if not element or not await element.is_visible():
+                continue
+            try:
+                return await self._capture_download(context, page, element.click)
+            except Exception:
+                continue
+        raise ResolveError("Tidak ada tombol yang memicu download.")
+
+    def _flow_for(self, url):
+        if "mediafire" in url:
+            return self._resolve_mediafire
+        if "gofile" in url:
+            return self._resolve_gofile
+        if "sourceforge" in url:
+            return self._resolve_sourceforge
+        if "apkadmin" in url:
+            return self._resolve_apkadmin
+        return self._resolve_aggressive
+
+    async def resolve(self, url):
+        """Me-resolve satu URL menjadi {name, urls, headers}. Melempar exception jika gagal."""
+        flow = self._flow_for(url)
+        async with self._semaphore:
+            resolve_span = start_span("page.resolve", handler="playwright", host=flow.__name__[len("_resolve_"):])
+            context = await self._browser.new_context(accept_downloads=True)
+            try:
+                page = await self._new_page(context)
+                result = await asyncio.wait_for(flow(context, page, url), PLAYWRIGHT_URL_TIMEOUT)
+            except Exception as e:
+                resolve_span.end(status="error")
+                raise ResolveError(f"{url}: {e}") from e
+            finally:
+                await context.close()
+            resolve_span.end()
+            return result
+
+    async def resolve_many(self, urls):
+        """Me-resolve banyak URL bersamaan. Hasil sesuai urutan input; gagal = exception."""
+        return await asyncio.gather(*(self.resolve(url) for url in urls), return_exceptions=True)
+
+
+def resolve_urls(urls, concurrency=PLAYWRIGHT_CONCURRENCY):
+    """Pembungkus sinkron: satu Chromium untuk seluruh batch."""
+    async def run():
+        async with PlaywrightResolver(concurrency) as resolver:
+            return await resolver.resolve_many(urls)
+    return asyncio.run(run())
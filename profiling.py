@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+# =========================================================
+# KONSTANTA & KONFIGURASI PROFILING
+# =========================================================
+
+# Profiling hanya aktif jika BOT_PROFILE diisi (1/true/yes). Default: mati, tanpa overhead.
+PROFILE_ENABLED = os.environ.get("BOT_PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.path.abspath(os.environ.get("PROFILE_DIR", "profiles"))
+# Jumlah frame traceback yang disimpan tracemalloc per alokasi
+TRACEMALLOC_FRAMES = int(os.environ.get("PROFILE_TRACEMALLOC_FRAMES", "10"))
+TOP_ALLOCATIONS = 30
+
+# =========================================================
+# FUNGSI PROFILING
+# =========================================================
+
+def _write_reports(name, profiler, snapshot, started_at, peak_bytes):
+    import io
+    import pstats
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    prefix = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(started_at))}-{os.getpid()}")
+
+    # 1. Dump cProfile (bisa dibuka dengan snakeviz / pstats)
+    profiler.dump_stats(f"{prefix}.prof")
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+    with open(f"{prefix}.cpu.txt", "w") as f:
+        f.write(text.getvalue())
+
+    # 2. Laporan alokasi memori teratas
+    with open(f"{prefix}.mem.txt", "w") as f:
+        f.write(f"Peak traced memory: {peak_bytes / 1024 / 1024:.1f} MB\n\n")
+        for stat in snapshot.statistics("traceback")[:TOP_ALLOCATIONS]:
+            f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for line in stat.traceback.format():
+                f.write(f"    {line}\n")
+            f.write("\n")
+    print(f"📊 Laporan profiling disimpan: {prefix}.*")
+
+
+def run_profiled(name, func, *args, **kwargs):
+    """
+    Menjalankan func di bawah cProfile + tracemalloc jika BOT_PROFILE aktif.
+    Jika mati, func dipanggil langsung (modul profiler bahkan tidak di-import).
+    Laporan tetap ditulis walau func keluar lewat sys.exit() atau exception.
+    """
+    if not PROFILE_ENABLED:
+        return func(*args, **kwargs)
+
+    import cProfile
+    import tracemalloc
+
+    started_at = time.time()
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        try:
+            _write_reports(name, profiler, snapshot, started_at, peak_bytes)
+        except Exception as e:
+            print(f"Peringatan: Gagal menyimpan laporan profiling: {e}", file=sys.stderr)
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import threading
+import requests
+from host_stats import host_key
+
+# =========================================================
+# KONSTANTA & KONFIGURASI CACHE RESOLUSI
+# =========================================================
+
+# Berisi cookie sesi host file: file dibuat dengan izin 0600
+RESOLUTION_CACHE_PATH = os.environ.get(
+    "RESOLUTION_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "resolutions.json"),
+)
+# Umur link langsung per host halaman (detik); 0 = tidak di-cache
+RESOLUTION_TTLS = {
+    "mediafire.com": 3600,
+    "sourceforge.net": 1800,
+    "apkadmin.com": 600,
+    "gofile.io": 300,
+}
+RESOLUTION_DEFAULT_TTL = int(os.environ.get("RESOLUTION_CACHE_TTL", "600"))
+RESOLUTION_CACHE_MAX_ENTRIES = 1000
+VALIDATE_TIMEOUT = 10
+
+# =========================================================
+# CACHE URL HALAMAN -> LINK LANGSUNG
+# =========================================================
+
+def ttl_for(page_url):
+    host = host_key(page_url)
+    for domain, ttl in RESOLUTION_TTLS.items():
+        if host == domain or host.endswith("." + domain):
+            return ttl
+    return RESOLUTION_DEFAULT_TTL
+
+
+def validate_link(url, headers=None):
+    """
+    Cek ringan sebelum link lama dipakai ulang: harus merespons 200/206 dan bukan
+    halaman HTML (link MediaFire kadaluarsa dialihkan kembali ke halaman file).
+    """
+    try:
+        response = requests.head(url, headers=headers, allow_redirects=True, timeout=VALIDATE_TIMEOUT)
+        if response.status_code in (403, 405, 501):
+            # Server yang menolak HEAD: minta 1 byte saja
+            range_headers = dict(headers or {}, Range="bytes=0-0")
+            with requests.get(url, headers=range_headers, stream=True, timeout=VALIDATE_TIMEOUT) as response:
+                pass
+    except requests.exceptions.RequestException:
+        return False
+    content_type = response.headers.get("Content-Type", "")
+    return response.status_code in (200, 206) and not content_type.startswith("text/html")
+
+
+class ResolutionCache:
+    """
+    Store JSON: {url_halaman: {name, urls, headers, expires}}. Hasil resolve
+    handler browser disimpan di sini; retry dan link yang dikirim ulang
+    langsung memakai link langsung (setelah divalidasi) tanpa membuka browser.
+    """
+
+    def __init__(self, path=RESOLUTION_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        now = time.time()
+        entries = {url: e for url, e in self._entries.items() if e.get("expires", 0) > now}
+        if len(entries) > RESOLUTION_CACHE_MAX_ENTRIES:
+            for url in sorted(entries, key=lambda u: entries[u]["expires"])[:len(entries) - RESOLUTION_CACHE_MAX_ENTRIES]:
+                del entries[url]
+        self._entries = entries
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Peringatan: Gagal menyimpan cache resolusi: {e}")
+
+    def get(self, page_url, validate=True):
+        """Hasil resolve {name, urls, headers} yang belum kadaluarsa (dan masih valid), atau None."""
+        with self._lock:
+            entry = self._load().get(page_url)
+        if not entry or entry.get("expires", 0) <= time.time():
+            return None
+        resolved = {"name": entry["name"], "urls": entry["urls"], "headers": entry.get("headers") or {}}
+        if validate and not validate_link(resolved["urls"][0], resolved["headers"]):
+            self.forget(page_url)
+            return None
+        return resolved
+
+    def put(self, page_url, name, urls, headers=None):
+        ttl = ttl_for(page_url)
+        if ttl <= 0 or not urls:
+            return
+        with self._lock:
+            self._load()[page_url] = {
+                "name": name, "urls": list(urls), "headers": headers or {}, "expires": time.time() + ttl,
+            }
+            self._save()
+
+    def forget(self, page_url):
+        with self._lock:
+            if self._load().pop(page_url, None) is not None:
+                self._save()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResolutionCache()
+        return _default_cache
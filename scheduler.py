@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque, OrderedDict
+
+# =========================================================
+# KONSTANTA & KONFIGURASI PENJADWALAN
+# =========================================================
+
+# Token bucket per pengguna: SCHED_USER_BURST job sekaligus, lalu diisi ulang
+# satu token tiap SCHED_USER_REFILL_SECONDS
+SCHED_USER_BURST = int(os.environ.get("SCHED_USER_BURST", "3"))
+SCHED_USER_REFILL_SECONDS = float(os.environ.get("SCHED_USER_REFILL_SECONDS", "300"))
+# Job yang boleh menunggu per pengguna; lebih dari ini ditolak
+SCHED_USER_QUEUE_MAX = int(os.environ.get("SCHED_USER_QUEUE_MAX", "10"))
+# Batas global workflow yang berjalan bersamaan (semua pengguna)
+SCHED_MAX_ACTIVE = int(os.environ.get("SCHED_MAX_ACTIVE", "4"))
+# Bot tidak tahu kapan workflow selesai; lease kedaluwarsa setelah ini jika
+# jumlah run aktif di GitHub tidak bisa dibaca
+SCHED_LEASE_SECONDS = float(os.environ.get("SCHED_LEASE_SECONDS", "1800"))
+# Run baru butuh waktu sebelum muncul di API GitHub; selama itu lease tetap dihitung
+SCHED_DISPATCH_GRACE_SECONDS = 90
+SCHED_GITHUB_POLL_SECONDS = 30
+SCHED_TICK_SECONDS = 2
+
+
+class QueueFullError(Exception):
+    pass
+
+# =========================================================
+# TOKEN BUCKET PER PENGGUNA
+# =========================================================
+
+class TokenBucket:
+    def __init__(self, capacity=SCHED_USER_BURST, refill_seconds=SCHED_USER_REFILL_SECONDS):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self.tokens = float(capacity)
+        self.updated = time.time()
+
+    def _refill(self, now):
+        if self.refill_seconds > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.refill_seconds)
+        else:
+            self.tokens = float(self.capacity)
+        self.updated = now
+
+    def available(self, now=None):
+        self._refill(now or time.time())
+        return self.tokens >= 1
+
+    def take(self, now=None):
+        if not self.available(now):
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait_seconds(self, now=None):
+        """Perkiraan detik sampai satu token tersedia."""
+        if self.available(now):
+            return 0
+        return (1 - self.tokens) * self.refill_seconds
+
+# =========================================================
+# ANTREAN ADIL (ROUND-ROBIN ANTAR PENGGUNA)
+# =========================================================
+
+class Job:
+    def __init__(self, user_id, url, message=None, mode=None):
+        self.user_id = user_id
+        self.url = url
+        self.message = message
+        # Tujuan unggah (telegram/gdrive/both), diteruskan sebagai mode di payload
+        self.mode = mode
+        self.enqueued = time.time()
+        # Pesan "posisi #N" yang diperbarui selama job menunggu (opsional)
+        self.status_message = None
+        self.position = None
+
+
+class FairScheduler:
+    """
+    Admission control untuk dispatch workflow:
+      - token bucket per pengguna (membatasi laju satu pengguna),
+      - antrean per pengguna yang dilayani round-robin (satu pengguna dengan
+        banyak link tidak menghabiskan kapasitas pengguna lain),
+      - batas global run aktif: lease lokal + jumlah run aktif di GitHub.
+    """
+
+    def __init__(self, max_active=SCHED_MAX_ACTIVE, user_queue_max=SCHED_USER_QUEUE_MAX,
+                 burst=SCHED_USER_BURST, refill_seconds=SCHED_USER_REFILL_SECONDS,
+                 lease_seconds=SCHED_LEASE_SECONDS, count_active_runs=None):
+        self.max_active = max_active
+        self.user_queue_max = user_queue_max
+        self.burst = burst
+        self.refill_seconds = refill_seconds
+        self.lease_seconds = lease_seconds
+        # Callable sinkron -> jumlah run aktif di GitHub (atau None jika gagal)
+        self.count_active_runs = count_active_runs
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()  # user_id -> deque[Job], urutan = giliran round-robin
+        self._buckets = {}
+        self._leases = []  # waktu dispatch
+        self._github_active = None
+        self._github_checked = 0
+        self._task = None
+
+    def _bucket(self, user_id):
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.burst, self.refill_seconds)
+        return bucket
+
+    def submit(self, job):
+        """Memasukkan job ke antrean pengguna. Mengembalikan posisi antrean (1 = berikutnya)."""
+        with self._lock:
+            queue = self._queues.setdefault(job.user_id, deque())
+            if len(queue) >= self.user_queue_max:
+                raise QueueFullError(f"Antrean penuh: maksimal {self.user_queue_max} link menunggu per pengguna.")
+            queue.append(job)
+            return self._position_locked(job)
+
+    def _position_locked(self, job):
+        # Round-robin: sebelum job ke-k milik pengguna ini, setiap pengguna lain
+        # mendapat paling banyak k giliran (+1 jika gilirannya lebih dulu)
+        queue = self._queues[job.user_id]
+        k = queue.index(job)
+        position = k + 1
+        before = True
+        for user_id, other in self._queues.items():
+            if user_id == job.user_id:
+                before = False
+                continue
+            position += min(len(other), k + 1 if before else k)
+        return position
+
+    def position(self, job):
+        with self._lock:
+            if job not in self._queues.get(job.user_id, ()):
+                return None
+            return self._position_locked(job)
+
+    def queued_positions(self):
+        """Daftar (job, posisi) semua job yang masih menunggu."""
+        with self._lock:
+            return [(job, self._position_locked(job)) for queue in self._queues.values() for job in queue]
+
+    def pending(self):
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+    def active_count(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            self._leases = [t for t in self._leases if now - t < self.lease_seconds]
+            if self._github_active is None:
+                return len(self._leases)
+            # Run yang baru di-dispatch belum tentu sudah terlihat di API GitHub
+            recent = sum(1 for t in self._leases if now - t < SCHED_DISPATCH_GRACE_SECONDS)
+            return max(self._github_active, recent)
+
+    def refresh_github_active(self, now=None):
+        """Membaca ulang jumlah run aktif di GitHub (paling sering tiap SCHED_GITHUB_POLL_SECONDS)."""
+        now = now or time.time()
+        if not self.count_active_runs or now - self._github_checked < SCHED_GITHUB_POLL_SECONDS:
+            return
+        self._github_checked = now
+        try:
+            active = self.count_active_runs()
+        except Exception as e:
+            print(f"Peringatan: Gagal membaca run aktif GitHub: {e}")
+            active = None
+        with self._lock:
+            self._github_active = active
+
+    def next_job(self, now=None):
+        """
+        Mengambil job berikutnya yang boleh di-dispatch (kapasitas global tersedia
+        dan token pengguna cukup), sekaligus mencatat lease-nya. None jika tidak ada.
+        """
+        now = now or time.time()
+        if self.active_count(now) >= self.max_active:
+            return None
+        with self._lock:
+            for user_id in list(self._queues):
+                queue = self._queues[user_id]
+                if not queue:
+                    del self._queues[user_id]
+                    continue
+                if not self._bucket(user_id).take(now):
+                    continue
+                job = queue.popleft()
+                # Pengguna yang baru dilayani pindah ke belakang giliran
+                self._queues.move_to_end(user_id)
+                if not queue:
+                    del self._queues[user_id]
+                self._leases.append(now)
+                return job
+        return None
+
+    def release(self, job):
+        """Dispatch gagal: lease terbaru dilepas dan token pengguna dikembalikan."""
+        with self._lock:
+            if self._leases:
+                self._leases.pop()
+            bucket = self._bucket(job.user_id)
+            bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+
+    # --- Loop dispatcher (asyncio, berjalan di loop bot) ---
+
+    async def _run(self, dispatch):
+        loop = asyncio.get_event_loop()
+        while True:
+            if self.pending():
+                await loop.run_in_executor(None, self.refresh_github_active)
+                job = self.next_job()
+                while job is not None:
+                    try:
+                        dispatched = await dispatch(job)
+                    except Exception as e:
+                        print(f"❌ Dispatch gagal untuk {job.url}: {e}")
+                        dispatched = False
+                    if not dispatched:
+                        self.release(job)
+                    job = self.next_job()
+            await asyncio.sleep(SCHED_TICK_SECONDS)
+
+    def ensure_running(self, dispatch):
+        """Menjalankan loop dispatcher sekali di event loop yang aktif."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run(dispatch))
+        return self._task
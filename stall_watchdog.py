@@ -0,0 +1,109 @@
+import os
+import time
+from collections import deque
+
+# =========================================================
+# KONSTANTA & KONFIGURASI WATCHDOG
+# =========================================================
+
+# Transfer dianggap macet jika rata-rata kecepatan di bawah batas ini...
+STALL_MIN_BPS = int(os.environ.get("STALL_MIN_BPS", str(32 * 1024)))
+# ...selama jendela waktu ini (detik)
+STALL_WINDOW_SECONDS = int(os.environ.get("STALL_WINDOW_SECONDS", "60"))
+# Waktu awal (resolve DNS, handshake, redirect) yang tidak dihitung sebagai macet
+STALL_GRACE_SECONDS = int(os.environ.get("STALL_GRACE_SECONDS", "30"))
+# Jendela rata-rata untuk kecepatan yang dilaporkan
+SPEED_WINDOW_SECONDS = 10
+
+# =========================================================
+# WATCHDOG THROUGHPUT
+# =========================================================
+
+class ThroughputWatchdog:
+    """
+    Pengganti timeout wall-clock: unduhan boleh berjalan selama apa pun asalkan
+    terus maju. update() dipanggil berkala dengan jumlah byte selesai; stalled
+    menjadi True hanya jika kecepatan < min_bps sepanjang window detik.
+    """
+
+    def __init__(self, total_size=None, min_bps=STALL_MIN_BPS, window=STALL_WINDOW_SECONDS, grace=STALL_GRACE_SECONDS):
+        self.total_size = total_size
+        self.min_bps = min_bps
+        self.window = window
+        self.grace = grace
+        self.started_at = time.monotonic()
+        self.done_bytes = 0
+        self._samples = deque()
+
+    def update(self, done_bytes):
+        now = time.monotonic()
+        self.done_bytes = done_bytes
+        self._samples.append((now, done_bytes))
+        # Simpan sampel secukupnya untuk jendela terpanjang
+        horizon = max(self.window, SPEED_WINDOW_SECONDS)
+        while len(self._samples) > 2 and now - self._samples[1][0] >= horizon:
+            self._samples.popleft()
+        return self
+
+    def reset(self):
+        """Mulai pengamatan baru (mis. unduhan baru aktif lagi setelah antre)."""
+        self.started_at = time.monotonic()
+        self._samples.clear()
+        return self
+
+    def _rate_over(self, seconds):
+        if len(self._samples) < 2:
+            return 0.0
+        now, latest = self._samples[-1]
+        start, start_bytes = self._samples[0]
+        for sample_time, sample_bytes in self._samples:
+            if now - sample_time <= seconds:
+                start, start_bytes = sample_time, sample_bytes
+                break
+        elapsed = now - start
+        return (latest - start_bytes) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def speed(self):
+        """Kecepatan terkini (byte/detik), rata-rata SPEED_WINDOW_SECONDS terakhir."""
+        return self._rate_over(SPEED_WINDOW_SECONDS)
+
+    @property
+    def eta(self):
+        """Perkiraan sisa waktu (detik), atau None jika ukuran/kecepatan tidak diketahui."""
+        speed = self.speed
+        if not self.total_size or speed <= 0:
+            return None
+        return max(0.0, (self.total_size - self.done_bytes) / speed)
+
+    @property
+    def stalled(self):
+        now = time.monotonic()
+        if now - self.started_at < self.grace + self.window or not self._samples:
+            return False
+        # Jendela penuh harus sudah teramati sebelum memutuskan macet
+        if now - self._samples[0][0] < self.window:
+            return False
+        return self._rate_over(self.window) < self.min_bps
+
+    def describe(self):
+        """Teks singkat kecepatan & ETA untuk pesan Telegram."""
+        speed_text = f"{format_rate(self.speed)}"
+        eta = self.eta
+        return f"{speed_text}, ETA {format_duration(eta)}" if eta is not None else speed_text
+
+
+def format_rate(bps):
+    for unit in ("B/s", "KB/s", "MB/s", "GB/s"):
+        if bps < 1024 or unit == "GB/s":
+            return f"{bps:.1f} {unit}"
+        bps /= 1024
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600} jam {seconds % 3600 // 60} mnt"
+    if seconds >= 60:
+        return f"{seconds // 60} mnt {seconds % 60} dtk"
+    return f"{seconds} dtk"
@@ -0,0 +1,145 @@
+import os
+import errno
+import shutil
+import tempfile
+
+# =========================================================
+# KONSTANTA & KONFIGURASI STORAGE
+# =========================================================
+
+# Sisakan ruang ekstra di disk di luar ukuran file (log, cache, file sementara lain)
+FREE_SPACE_MARGIN = int(os.environ.get("FREE_SPACE_MARGIN", str(256 * 1024 * 1024)))
+STAGING_PREFIX = ".staging-"
+
+
+class InsufficientSpaceError(Exception):
+    pass
+
+# =========================================================
+# FUNGSI BANTUAN DISK
+# =========================================================
+
+def free_space(path):
+    return shutil.disk_usage(path).free
+
+
+def ensure_free_space(path, required_bytes, margin=FREE_SPACE_MARGIN):
+    """Gagal lebih awal jika disk tujuan tidak cukup, sebelum satu byte pun diunduh."""
+    available = free_space(path)
+    if required_bytes + margin > available:
+        raise InsufficientSpaceError(
+            f"Ruang disk tidak cukup di {path}: butuh {required_bytes + margin} byte, tersedia {available} byte."
+        )
+
+
+def preallocate(path, size):
+    """
+    Memesan blok disk untuk file (posix_fallocate) agar tidak terfragmentasi dan
+    'disk penuh' terdeteksi di awal. Fallback ke ftruncate (sparse) jika filesystem
+    tidak mendukung. Mengembalikan True jika fallocate berhasil.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if size > 0 and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return True
+            except OSError:
+                pass
+        os.ftruncate(fd, size)
+        return False
+    finally:
+        os.close(fd)
+
+
+def supports_fallocate(directory):
+    """Cek cepat apakah filesystem di directory mendukung fallocate (untuk aria2c --file-allocation)."""
+    if not hasattr(os, "posix_fallocate"):
+        return False
+    fd, probe_path = tempfile.mkstemp(prefix=".falloc-", dir=directory)
+    try:
+        os.posix_fallocate(fd, 0, 4096)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+        os.remove(probe_path)
+
+# =========================================================
+# STAGING DI FILESYSTEM TUJUAN
+# =========================================================
+
+class StagingArea:
+    """
+    Direktori staging yang dibuat DI DALAM direktori tujuan, sehingga berada di
+    filesystem yang sama. Memindahkan hasil unduhan ke tujuan cukup dengan
+    os.replace (rename atomik), tanpa salinan penuh seperti shutil.move lintas
+    filesystem (mis. /tmp tmpfs -> workspace).
+    """
+
+    def __init__(self, dest_dir, path=None):
+        self.dest_dir = os.path.abspath(dest_dir)
+        os.makedirs(self.dest_dir, exist_ok=True)
+        # path diberikan = direktori persisten (mis. checkpoint) yang tidak dihapus cleanup()
+        self.persistent = path is not None
+        self.path = path or tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self.dest_dir)
+
+    def path_for(self, filename):
+        return os.path.join(self.path, filename)
+
+    def same_filesystem(self):
+        return os.stat(self.path).st_dev == os.stat(self.dest_dir).st_dev
+
+    def ensure_free_space(self, required_bytes):
+        """
+        Cek ruang di tempat byte benar-benar ditulis (staging). Direktori persisten
+        di filesystem lain juga butuh ruang di tujuan, karena commit harus menyalin.
+        """
+        ensure_free_space(self.path, required_bytes)
+        if not self.same_filesystem():
+            ensure_free_space(self.dest_dir, required_bytes)
+
+    def commit(self, staged_path, final_name=None):
+        """Memindahkan file staging ke direktori tujuan secara atomik. Mengembalikan path final."""
+        final_path = os.path.join(self.dest_dir, final_name or os.path.basename(staged_path))
+        try:
+            os.replace(staged_path, final_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Direktori persisten di filesystem lain: terpaksa salin
+            shutil.move(staged_path, final_path)
+        return final_path
+
+    def cleanup(self):
+        if not self.persistent:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        return False
+
+# =========================================================
+# FILE PENANDA HASIL UNDUHAN
+# =========================================================
+
+# Satu nama file per baris; dibaca oleh telegram_upload.py dan upload.py
+DOWNLOAD_MARKER = "downloaded_filename.txt"
+
+
+def write_download_marker(filenames, path=DOWNLOAD_MARKER):
+    with open(path, "w") as f:
+        f.write("\n".join(filenames) + "\n")
+
+
+def read_download_marker(path=DOWNLOAD_MARKER):
+    """Mengembalikan list nama file dari file penanda (kosong jika tidak ada)."""
+    try:
+        with open(path, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
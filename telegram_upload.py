@@ -2,20 +2,14 @@ import os
 import sys
 from pyrogram import Client
 from pyrogram.errors import FilePartInvalid, FloodWait
-import time
-
-# --- PENTING: IMPORT FUNGSI DARI UTILS.PY ---
-# Asumsi Anda punya file utils.py di direktori yang sama
-try:
-    # Asumsi Anda menyimpan fungsi notifikasi di utils.py
-    # Pastikan utils.py memiliki fungsi send_telegram_message dan edit_telegram_message
-    from utils import send_telegram_message, edit_telegram_message 
-except ImportError:
-    # Fallback jika utils.py tidak ditemukan (hanya untuk debugging)
-    print("❌ GAGAL IMPORT: Pastikan file utils.py ada dan berisi fungsi notifikasi.")
-    # Mendefinisikan fungsi dummy agar skrip bisa berjalan
-    def send_telegram_message(text): print(f"SEND_DUMMY: {text}"); return 123456
-    def edit_telegram_message(id, text): print(f"EDIT_DUMMY: {text}")
+import timing
+from profiling import run_profiled
+
+# Notifikasi dari modul ringan (tanpa Selenium/yt-dlp)
+from notifier import send_telegram_message, edit_telegram_message
+from storage import DOWNLOAD_MARKER, read_download_marker
+from integrity import VerifiedFileReader, load_manifest
+from bandwidth import open_flow
 
 
 # =========================================================
@@ -27,14 +21,28 @@ BOT_TOKEN = os.environ.get("BOT_TOKEN")
 API_ID = os.environ.get("API_ID")
 API_HASH = os.environ.get("API_HASH")
 OWNER_ID = os.environ.get("OWNER_ID") # Chat ID untuk notifikasi
-FILENAME_MARKER = "downloaded_filename.txt"
+FILENAME_MARKER = DOWNLOAD_MARKER
 
 # =========================================================
 # FUNGSI UTAMA UPLOADER PYROGRAM
 # =========================================================
 
-def upload_large_file_with_pyrogram(file_path):
-    """Mengunggah file hingga 4 GB menggunakan Pyrogram."""
+def create_client():
+    # Inisialisasi Klien Bot (menggunakan nama sesi statis)
+    return Client(
+        "gh_pyrogram_session", 
+        api_id=int(API_ID), 
+        api_hash=API_HASH, 
+        bot_token=BOT_TOKEN,
+    )
+
+
+def upload_large_file_with_pyrogram(file_path, app=None, document=None):
+    """
+    Mengunggah file hingga 4 GB menggunakan Pyrogram.
+    Jika app diberikan (sudah di-start), klien dipakai ulang dan tidak dihentikan di sini.
+    document (opsional) adalah objek file-like pengganti path, mis. pembaca antrean fan-out.
+    """
     
     if not all([API_ID, API_HASH, BOT_TOKEN, OWNER_ID]):
         error_msg = "❌ Konfigurasi unggah (API_ID/API_HASH/BOT_TOKEN/OWNER_ID) tidak lengkap."
@@ -46,13 +54,11 @@ def upload_large_file_with_pyrogram(file_path):
     file_name = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
     
-    # Inisialisasi Klien Bot (menggunakan nama sesi statis)
-    app = Client(
-        "gh_pyrogram_session", 
-        api_id=int(API_ID), 
-        api_hash=API_HASH, 
-        bot_token=BOT_TOKEN,
-    )
+    owns_app = app is None
+    if owns_app:
+        app = create_client()
+    # Jatah bandwidth bersama download/upload lain di worker ini
+    flow = open_flow(file_name, "upload")
 
     def progress_callback(current, total):
         """Fungsi untuk menampilkan progress unggah ke Telegram."""
@@ -69,11 +75,12 @@ def upload_large_file_with_pyrogram(file_path):
             edit_telegram_message(getattr(progress_callback, 'message_id', None), status_text)
             progress_callback.last_percent = percent
         
-        # Jaga agar Pyrogram tidak spam log
-        time.sleep(1)
+        # Ditahan hanya sebatas jatah bandwidth (bukan sleep tetap per part)
+        flow.pace(current)
 
     try:
-        app.start()
+        if owns_app:
+            app.start()
         
         # Kirim pesan inisiasi
         initial_message = f"⬆️ **Memulai Unggah Pyrogram...**\nFile: `{file_name}`\nUkuran: {file_size/1024/1024/1024:.2f} GB"
@@ -85,70 +92,100 @@ def upload_large_file_with_pyrogram(file_path):
         print(f"Mulai unggah {file_name} ke chat ID: {owner_id}")
         
         # Mulai unggah file
-        app.send_document(
-            chat_id=owner_id,
-            document=file_path,
-            caption=f"✅ **{file_name}** (Unggahan 4GB) selesai!",
-            progress=progress_callback
-        )
+        with timing.span("telegram.upload", bytes=file_size):
+            app.send_document(
+                chat_id=owner_id,
+                document=document or file_path,
+                file_name=file_name,
+                caption=f"✅ **{file_name}** (Unggahan 4GB) selesai!",
+                progress=progress_callback
+            )
         
         # Update final 100%
-        edit_telegram_message(message_id, f"🎉 **Unggahan Selesai!**\nFile: `{file_name}`\n")
-        app.stop()
+        final_text = f"🎉 **Unggahan Selesai!**\nFile: `{file_name}`\n"
+        timing_summary = timing.summarize()
+        if timing_summary:
+            final_text += f"\n{timing_summary}"
+        edit_telegram_message(message_id, final_text)
+        if owns_app:
+            app.stop()
         return True
         
     except FloodWait as e:
         error_msg = f"❌ **Unggahan GAGAL (FloodWait):** Tunggu {e.value} detik."
         print(error_msg)
         send_telegram_message(error_msg)
-        app.stop()
+        if owns_app:
+            app.stop()
         return False
     except FilePartInvalid as e:
         error_msg = f"❌ **Unggahan GAGAL (FilePartInvalid).** File > 4GB atau koneksi terputus. Detail: {e}"
         print(error_msg)
         send_telegram_message(error_msg)
-        app.stop()
+        if owns_app:
+            app.stop()
         return False
     except Exception as e:
         error_msg = f"❌ **Unggahan GAGAL (Pyrogram).** Error: {e}"
         print(error_msg)
         send_telegram_message(error_msg)
-        try: app.stop() 
-        except: pass
+        if owns_app:
+            try: app.stop() 
+            except: pass
         return False
+    finally:
+        flow.close()
 
 # =========================================================
 # EKSEKUSI UTAMA
 # =========================================================
 
-if __name__ == '__main__':
-    
+def main():
+    """Membaca file penanda lalu mengunggah file ke Telegram."""
     print("Memulai proses unggah Telegram...")
     
-    # 1. Baca nama file dari file penanda
-    actual_filename = None
-    if os.path.exists(FILENAME_MARKER):
-        with open(FILENAME_MARKER, 'r') as f:
-            actual_filename = f.read().strip()
+    # 1. Baca nama file dari file penanda (satu nama per baris)
+    filenames = read_download_marker(FILENAME_MARKER)
+    missing_files = [name for name in filenames if not os.path.exists(name)]
             
-    if not actual_filename or not os.path.exists(actual_filename):
-        error_msg = f"❌ Eksekusi uploader gagal: File `{actual_filename}` tidak ditemukan. Pastikan downloader.py berjalan duluan."
+    if not filenames or missing_files:
+        error_msg = f"❌ Eksekusi uploader gagal: File `{', '.join(missing_files)}` tidak ditemukan. Pastikan downloader.py berjalan duluan."
         print(error_msg)
         send_telegram_message(error_msg)
         sys.exit(1)
 
-    print(f"File yang akan diunggah: {actual_filename}")
-    
-    # 2. Mulai unggah
-    upload_success = upload_large_file_with_pyrogram(actual_filename)
+    print(f"File yang akan diunggah: {', '.join(filenames)}")
     
-    # 3. Bersihkan file
-    if upload_success:
-        try:
-            os.remove(actual_filename)
-            print(f"File lokal {actual_filename} telah dihapus.")
-        except Exception as e:
-            print(f"Gagal menghapus file lokal: {e}")
+    # 2. Mulai unggah (satu klien Pyrogram dipakai ulang untuk semua file folder)
+    app = None
+    if len(filenames) > 1 and all([API_ID, API_HASH, BOT_TOKEN, OWNER_ID]):
+        app = create_client()
+        app.start()
+    upload_success = True
+    try:
+        for actual_filename in filenames:
+            # Manifest dari downloader: setiap segmen dicek sebelum dikirim ke Telegram
+            manifest = load_manifest(actual_filename)
+            document = VerifiedFileReader(actual_filename, manifest) if manifest else None
+            try:
+                uploaded = upload_large_file_with_pyrogram(actual_filename, app=app, document=document)
+            finally:
+                if document:
+                    document.close()
+            if not uploaded:
+                upload_success = False
+                continue
+            
+            # 3. Bersihkan file
+            try:
+                os.remove(actual_filename)
+                print(f"File lokal {actual_filename} telah dihapus.")
+            except Exception as e:
+                print(f"Gagal menghapus file lokal: {e}")
+    finally:
+        if app:
+            try: app.stop()
+            except Exception: pass
     
     # 4. Hapus file penanda (selalu)
     try:
@@ -158,3 +195,7 @@ if __name__ == '__main__':
         
     if not upload_success:
         sys.exit(1) # Keluar dengan kode error jika unggahan gagal
+
+
+if __name__ == '__main__':
+    run_profiled("telegram_upload", main)
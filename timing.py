@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+# =========================================================
+# KONSTANTA & KONFIGURASI TIMING
+# =========================================================
+
+# Satu file JSON-lines dipakai bersama oleh main.py, upload.py dan telegram_upload.py
+TIMING_LOG_PATH = os.path.abspath(os.environ.get("TIMING_LOG", "timings.jsonl"))
+JOB_ID = os.environ.get("GITHUB_RUN_ID", "local")
+
+_write_lock = threading.Lock()
+
+# =========================================================
+# SPAN
+# =========================================================
+
+def record_span(name, start, duration, status="ok", **attrs):
+    """Menambahkan satu span ke file JSON-lines (append, aman antar thread/proses)."""
+    entry = {
+        "job": JOB_ID,
+        "name": name,
+        "start": round(start, 3),
+        "duration": round(duration, 4),
+        "status": status,
+        "pid": os.getpid(),
+    }
+    if attrs:
+        entry["attrs"] = attrs
+    line = json.dumps(entry) + "\n"
+    try:
+        with _write_lock, open(TIMING_LOG_PATH, "a") as f:
+            f.write(line)
+    except OSError as e:
+        print(f"Peringatan: Gagal menulis timing span: {e}")
+
+
+class Span:
+    """Span manual untuk fase yang tidak membentuk satu blok kode (start_span ... end)."""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self._perf_start = time.perf_counter()
+        self.ended = False
+
+    def end(self, status="ok", **attrs):
+        if self.ended:
+            return
+        self.ended = True
+        self.attrs.update(attrs)
+        record_span(self.name, self.start, time.perf_counter() - self._perf_start, status, **self.attrs)
+
+
+def start_span(name, **attrs):
+    return Span(name, **attrs)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Context manager untuk mengukur satu fase. Error tetap dilempar, status dicatat."""
+    current = Span(name, **attrs)
+    try:
+        yield current
+    except BaseException:
+        current.end(status="error")
+        raise
+    finally:
+        current.end()
+
+
+def timed(name):
+    """Dekorator: membungkus seluruh pemanggilan fungsi dalam span(name)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# =========================================================
+# MEMBACA & MERINGKAS
+# =========================================================
+
+def reset():
+    """Mengosongkan log (dipanggil di awal job)."""
+    try:
+        os.remove(TIMING_LOG_PATH)
+    except FileNotFoundError:
+        pass
+
+
+def load_spans(path=None):
+    spans = []
+    try:
+        with open(path or TIMING_LOG_PATH, "r") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return spans
+
+
+def summarize(spans=None, max_lines=12):
+    """Ringkasan Markdown untuk pesan Telegram: total durasi per fase (urutan kemunculan)."""
+    spans = load_spans() if spans is None else spans
+    totals = {}
+    for entry in spans:
+        total = totals.setdefault(entry["name"], {"duration": 0.0, "count": 0, "error": False})
+        total["duration"] += entry["duration"]
+        total["count"] += 1
+        total["error"] = total["error"] or entry.get("status") == "error"
+    if not totals:
+        return ""
+    lines = ["⏱️ **Waktu per fase:**"]
+    for name, total in list(totals.items())[:max_lines]:
+        count = f" ×{total['count']}" if total["count"] > 1 else ""
+        flag = " ❌" if total["error"] else ""
+        lines.append(f"`{name}`: {total['duration']:.2f}s{count}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import threading
+import requests
+
+# =========================================================
+# KONSTANTA & KONFIGURASI TOKEN BROKER
+# =========================================================
+
+TOKEN_URI = os.environ.get("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+# Berisi refresh token pengguna: file dibuat dengan izin 0600
+TOKEN_BROKER_PATH = os.environ.get(
+    "TOKEN_BROKER_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "bot", "token_broker.json"),
+)
+# Token yang dikirim ke job harus masih berlaku minimal selama ini; jika tidak,
+# di-refresh dulu oleh bot (job tetap bisa refresh sendiri saat dapat 401)
+BROKER_MIN_TTL = int(os.environ.get("TOKEN_BROKER_MIN_TTL", "1800"))
+
+# =========================================================
+# BROKER ACCESS TOKEN PER PENGGUNA
+# =========================================================
+
+class TokenBroker:
+    """
+    Menyimpan refresh token per pengguna (diterima di /oauth_callback) beserta
+    access token terakhir dan waktu kadaluarsanya. Saat dispatch, job menerima
+    access token yang masih berlaku sehingga upload tidak perlu round trip ke
+    token endpoint Google.
+    Format file: {user_id: {"refresh_token", "access_token", "expiry"}}.
+    """
+
+    def __init__(self, client_id, client_secret, path=TOKEN_BROKER_PATH, token_uri=TOKEN_URI):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.path = path
+        self.token_uri = token_uri
+        self._lock = threading.Lock()
+        self._users = None
+        self._session = requests.Session()
+
+    def _load(self):
+        if self._users is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._users = json.load(f)
+            except (OSError, ValueError):
+                self._users = {}
+        return self._users
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._users, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Peringatan: Gagal menyimpan token broker: {e}")
+
+    def register(self, user_id, refresh_token, access_token=None, expires_in=None):
+        """Mencatat refresh token baru (dan access token dari penukaran kode, jika ada)."""
+        with self._lock:
+            entry = {"refresh_token": refresh_token, "access_token": None, "expiry": 0}
+            if access_token and expires_in:
+                entry.update({"access_token": access_token, "expiry": time.time() + int(expires_in)})
+            self._load()[str(user_id)] = entry
+            self._save()
+
+    def has_user(self, user_id):
+        with self._lock:
+            return str(user_id) in self._load()
+
+    def _refresh_locked(self, user_id, entry):
+        response = self._session.post(
+            self.token_uri,
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": entry["refresh_token"],
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            },
+            timeout=30,
+        )
+        payload = response.json()
+        if response.status_code != 200 or "access_token" not in payload:
+            raise Exception(payload.get("error_description") or payload.get("error") or response.text[:200])
+        entry["access_token"] = payload["access_token"]
+        entry["expiry"] = time.time() + int(payload.get("expires_in", 3600))
+        self._save()
+
+    def access_token_for(self, user_id, min_ttl=BROKER_MIN_TTL):
+        """
+        Mengembalikan (access_token, expiry) yang masih berlaku minimal min_ttl detik,
+        refresh lebih awal jika perlu. (None, None) jika pengguna belum terdaftar
+        atau refresh gagal (job lalu refresh sendiri dari refresh token di workflow).
+        """
+        with self._lock:
+            entry = self._load().get(str(user_id))
+            if not entry:
+                return None, None
+            if not entry.get("access_token") or entry.get("expiry", 0) - time.time() < min_ttl:
+                try:
+                    self._refresh_locked(user_id, entry)
+                except Exception as e:
+                    print(f"Peringatan: Refresh token untuk {user_id} gagal: {e}")
+                    return None, None
+            return entry["access_token"], entry["expiry"]
+
+    def dispatch_payload(self, user_id):
+        """Field tambahan client_payload untuk dispatch (kosong jika tidak ada token)."""
+        access_token, expiry = self.access_token_for(user_id)
+        if not access_token:
+            return {}
+        return {"access_token": access_token, "access_token_expiry": str(int(expiry))}
@@ -2,15 +2,18 @@ import os
 import sys
 import time
 import mimetypes
-import hashlib
-import requests
-import math
-from oauth2client.client import OAuth2Credentials
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from httplib2 import Http
+from googleapiclient.http import MediaIoBaseUpload, BatchHttpRequest
 from googleapiclient.errors import HttpError
 from googleapiclient.errors import ResumableUploadError
+from drive_transport import create_session, AccessTokenManager, PooledHttp, batch_url_for
+from notifier import send_telegram_message, edit_telegram_message, human_readable_size
+import timing
+from profiling import run_profiled
+from storage import read_download_marker
+from drive_dedup import DriveIndex, account_key, find_existing_file, reuse_or_copy
+from integrity import IntegrityError, VerifiedFileReader, manifest_for
+from bandwidth import open_flow
 
 # =========================================================
 # KONSTANTA & KONFIGURASI
@@ -19,207 +22,321 @@ from googleapiclient.errors import ResumableUploadError
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
 OWNER_ID = os.environ.get("PAYLOAD_SENDER")
 REFRESH_TOKEN = os.environ.get('DRIVE_REFRESH_TOKEN')
+# Access token dari broker bot (boleh kosong): upload mulai tanpa refresh
+ACCESS_TOKEN = os.environ.get('DRIVE_ACCESS_TOKEN')
+ACCESS_TOKEN_EXPIRY = float(os.environ.get('DRIVE_ACCESS_TOKEN_EXPIRY') or 0)
 CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
 CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
 DRIVE_UPLOAD_FOLDER_NAME = "my-drive-upload"
+# Override endpoint Drive (server lokal untuk benchmark); kosong = endpoint Google
+DRIVE_API_ENDPOINT = os.environ.get("DRIVE_API_ENDPOINT")
+# Ukuran chunk resumable upload (harus kelipatan 256 KB)
+DRIVE_CHUNK_SIZE = int(os.environ.get('DRIVE_CHUNK_SIZE', str(64 * 1024 * 1024)))
+# File sampai ukuran ini diunggah dengan satu request multipart (metadata + isi),
+# tanpa round trip pembuatan sesi resumable
+DRIVE_MULTIPART_THRESHOLD = int(os.environ.get('DRIVE_MULTIPART_THRESHOLD', str(5 * 1024 * 1024)))
+# Maksimum sub-request per batch request Drive (batas Google: 100)
+DRIVE_BATCH_SIZE = int(os.environ.get('DRIVE_BATCH_SIZE', '100'))
+PUBLIC_PERMISSION = {'type': 'anyone', 'role': 'reader'}
 
 # =========================================================
 # FUNGSI BANTUAN TELEGRAM & UMUM
 # =========================================================
 
-def send_telegram_message(message_text):
-    """Fungsi untuk mengirim pesan ke Telegram dan mengembalikan message_id."""
-    if not BOT_TOKEN or not OWNER_ID:
-        print("Peringatan: BOT_TOKEN atau OWNER_ID tidak diatur. Notifikasi Telegram dinonaktifkan.")
-        return None
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": OWNER_ID, "text": message_text, "parse_mode": "Markdown"}
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        return response.json().get('result', {}).get('message_id')
-    except Exception as e:
-        print(f"Gagal mengirim pesan Telegram: {e}")
-        return None
-
-def edit_telegram_message(message_id, message_text):
-    """Fungsi untuk mengedit pesan yang sudah ada di Telegram."""
-    if not BOT_TOKEN or not OWNER_ID or not message_id:
-        # Menghilangkan pesan error agar tidak terlalu berisik
-        return
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/editMessageText"
-    payload = {"chat_id": OWNER_ID, "message_id": message_id, "text": message_text, "parse_mode": "Markdown"}
-    try:
-        requests.post(url, json=payload, timeout=10)
-    except Exception as e:
-        print(f"Gagal mengedit pesan Telegram: {e}")
-
-def human_readable_size(size_bytes):
-    if size_bytes is None or size_bytes == 0: return "0B"
-    size_name = ("B", "KB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB")
-    i = int(math.floor(math.log(size_bytes, 1024))) if size_bytes > 0 else 0
-    p = math.pow(1024, i)
-    s = round(size_bytes / p, 2) if p > 0 else 0
-    return f"{s} {size_name[i]}"
-
 def send_upload_progress(message_id, filename, uploaded_size, total_size):
     """Fungsi untuk mengirim progress upload ke Telegram (2x Update Logic)."""
     percent = int((uploaded_size/total_size)*100) if total_size else 0
     text = f"⏫ Uploading `{filename}` — {percent}% ({human_readable_size(uploaded_size)}/{human_readable_size(total_size)})"
     edit_telegram_message(message_id, text)
 
-def calculate_md5(file_path):
-    """Menghitung MD5 checksum dari file lokal."""
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception as e:
-        print(f"❌ Gagal menghitung MD5 checksum: {e}")
-        return None
-
 # =========================================================
 # FUNGSI DRIVE OTENTIKASI & BANTUAN
 # =========================================================
 
-def authenticate_google_drive():
-    """Mengurus otentikasi Google Drive, me-refresh token, dan mengembalikan service objek."""
-    credentials = OAuth2Credentials(
-        access_token=None, client_id=CLIENT_ID, client_secret=CLIENT_SECRET,
-        refresh_token=REFRESH_TOKEN, token_expiry=None,
-        token_uri='https://oauth2.googleapis.com/token',
-        user_agent='GH-Actions-DriveUploader'
-    )
-    print("⚡ Memperbarui Access Token menggunakan Refresh Token...")
-    http_pool = Http()
+@timing.timed("drive.auth")
+def create_drive_http():
+    """Mengurus otentikasi Google Drive (token di-cache sampai kadaluarsa) dan mengembalikan PooledHttp."""
+    session = create_session()
+    token_manager = AccessTokenManager(CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN, session=session,
+                                       access_token=ACCESS_TOKEN, expiry=ACCESS_TOKEN_EXPIRY)
+    if token_manager.is_valid():
+        print("⚡ Memakai Access Token dari cache/broker (belum kadaluarsa)...")
+    else:
+        print("⚡ Memperbarui Access Token menggunakan Refresh Token...")
     try:
-        credentials.refresh(http=http_pool)
+        token_manager.get_token()
     except Exception as e:
         error_msg = f"❌ Gagal memperbarui token. Token tidak valid: {e}"
         print(error_msg)
         send_telegram_message(f"❌ **Upload GAGAL!**\n\n{error_msg[:150]}...")
         sys.exit(1)
     
-    http_auth = credentials.authorize(http_pool)
-    drive_service = build('drive', 'v3', http=http_auth)
+    return PooledHttp(session=session, token_manager=token_manager, endpoint=DRIVE_API_ENDPOINT)
+
+def authenticate_google_drive(http_auth=None):
+    """Mengembalikan service objek Drive di atas PooledHttp (dibuat jika tidak diberikan)."""
+    http_auth = http_auth or create_drive_http()
+    client_options = {'api_endpoint': DRIVE_API_ENDPOINT} if DRIVE_API_ENDPOINT else None
+    drive_service = build('drive', 'v3', http=http_auth, cache_discovery=False, client_options=client_options)
     print("✅ Autentikasi Drive berhasil. Siap upload!")
     return drive_service
 
+# (folder_name, parent_id) -> ID folder; banyak file satu job tidak mencari folder berulang kali
+_folder_ids = {}
+
 def get_or_create_folder(service, folder_name, parent_id=None):
     """Mencari ID folder di Drive, jika tidak ada, membuatnya."""
+    if (folder_name, parent_id) in _folder_ids:
+        return _folder_ids[(folder_name, parent_id)]
     query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
     if parent_id:
         query += f" and '{parent_id}' in parents"
     try:
         response = service.files().list(q=query, fields='files(id)').execute()
         files = response.get('files', [])
-        if files: return files[0].get('id')
-        
-        file_metadata = {'name': folder_name, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [parent_id] if parent_id else []}
-        file = service.files().create(body=file_metadata, fields='id').execute()
-        return file.get('id')
+        if files:
+            folder_id = files[0].get('id')
+        else:
+            file_metadata = {'name': folder_name, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [parent_id] if parent_id else []}
+            folder_id = service.files().create(body=file_metadata, fields='id').execute().get('id')
+        _folder_ids[(folder_name, parent_id)] = folder_id
+        return folder_id
     except HttpError as e:
         print(f"❌ Gagal mengakses/membuat folder: {e}")
         sys.exit(1)
 
-def make_file_public(service, file_id):
-    """Menetapkan izin agar file dapat diakses publik."""
+def make_file_public(service, file_id, file_info=None):
+    """
+    Menetapkan izin agar file dapat diakses publik. Jika file_info sudah memuat
+    link (mis. hasil files.copy), files.get tambahan dilewati.
+    """
     print("🌍 Menetapkan izin file menjadi publik...")
-    permission_body = {'type': 'anyone', 'role': 'reader'}
     try:
-        service.permissions().create(fileId=file_id, body=permission_body, fields='id').execute()
-        file_info = service.files().get(fileId=file_id, fields='webViewLink,webContentLink').execute()
+        service.permissions().create(fileId=file_id, body=PUBLIC_PERMISSION, fields='id').execute()
+        if not (file_info and file_info.get("webViewLink")):
+            file_info = service.files().get(fileId=file_id, fields='webViewLink,webContentLink').execute()
         print("✅ File berhasil dijadikan publik!")
         return file_info.get("webViewLink"), file_info.get("webContentLink")
     except HttpError as e:
         print(f"❌ Gagal mengatur izin file menjadi publik: {e}")
         return None, None
 
+class PublishBatch:
+    """
+    Mengumpulkan izin publik (dan files.get jika link belum ada) beberapa file lalu
+    mengirimnya sebagai satu batch request Drive. Upload media tidak bisa di-batch;
+    yang dihemat adalah round trip per file setelah upload. done(view, content)
+    dipanggil per file saat flush().
+    """
+
+    def __init__(self, service, max_size=DRIVE_BATCH_SIZE):
+        self.service = service
+        self.max_size = max_size
+        self.pending = []
+
+    def add(self, file_id, file_info, done):
+        self.pending.append((file_id, dict(file_info or {}), done))
+        # Satu file bisa memakai dua sub-request (izin + files.get)
+        if 2 * len(self.pending) >= self.max_size:
+            self.flush()
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        if len(pending) == 1:
+            file_id, file_info, done = pending[0]
+            with timing.span("drive.publish"):
+                links = make_file_public(self.service, file_id, file_info)
+            done(*links)
+            return
+        if not pending:
+            return
+
+        print(f"🌍 Menetapkan izin publik {len(pending)} file dalam satu batch request...")
+        results = {}
+
+        def callback(request_id, response, exception):
+            results[request_id] = (response, exception)
+
+        batch = BatchHttpRequest(callback=callback, batch_uri=batch_url_for(DRIVE_API_ENDPOINT))
+        for index, (file_id, file_info, _) in enumerate(pending):
+            batch.add(self.service.permissions().create(fileId=file_id, body=PUBLIC_PERMISSION, fields='id'),
+                      request_id=f"permission-{index}")
+            if not file_info.get("webViewLink"):
+                batch.add(self.service.files().get(fileId=file_id, fields='webViewLink,webContentLink'),
+                          request_id=f"get-{index}")
+        try:
+            with timing.span("drive.publish", files=len(pending)):
+                batch.execute()
+        except Exception as e:
+            print(f"❌ Batch request izin publik gagal: {e}")
+
+        for index, (file_id, file_info, done) in enumerate(pending):
+            _, error = results.get(f"permission-{index}", (None, "tidak ada respons"))
+            file_info.update(results.get(f"get-{index}", ({}, None))[0] or {})
+            if error:
+                print(f"❌ Gagal mengatur izin file {file_id} menjadi publik: {error}")
+                done(None, None)
+            else:
+                done(file_info.get("webViewLink"), file_info.get("webContentLink"))
+
+
+def publish_file(service, file_id, file_info, done, publisher=None):
+    """Menjadikan file publik lalu memanggil done(view, content); ditunda ke batch jika publisher diberikan."""
+    if publisher:
+        publisher.add(file_id, file_info, done)
+        return
+    with timing.span("drive.publish"):
+        links = make_file_public(service, file_id, file_info)
+    done(*links)
+
+def send_upload_success(downloaded_file, local_md5, link_view, link_content, note=None):
+    """Pesan sukses (upload baru maupun hasil dedup) beserta ringkasan waktu."""
+    success_message = (
+        f"🎉 **UPLOAD SUKSES!** 🎉\n\n"
+        f"File: `{downloaded_file}`\n"
+        f"Folder: `{DRIVE_UPLOAD_FOLDER_NAME}`\n"
+        f"MD5 Lokal: `{local_md5}`\n"
+        f"**Status:** **PUBLIK (Dapat Diakses Siapa Saja)!**\n"
+        f"Link Drive: [Lihat File]({link_view})\n"
+        f"Link Download Langsung: `{link_content or 'N/A (Link Download)'}`" 
+    )
+    if note:
+        success_message += f"\n\n{note}"
+    timing_summary = timing.summarize()
+    if timing_summary:
+        success_message += f"\n\n{timing_summary}"
+    send_telegram_message(success_message)
+
 # =========================================================
 # FUNGSI UTAMA UPLOAD (LOGIKA PROGRES 2X UPDATE)
 # =========================================================
 
-def upload_file_to_drive(drive_service, downloaded_file):
-    """Mengurus Resumable Upload dan Verifikasi MD5."""
+def upload_file_to_drive(drive_service, downloaded_file, publisher=None):
+    """
+    Mengurus upload (multipart untuk file kecil, resumable untuk file besar) dan
+    verifikasi MD5. Dengan publisher (PublishBatch), izin publik dan pesan sukses
+    ditunda sampai publisher.flush().
+    """
     target_folder_id = get_or_create_folder(drive_service, DRIVE_UPLOAD_FOLDER_NAME)
     
     MIME_TYPE, _ = mimetypes.guess_type(downloaded_file)
     if not MIME_TYPE: MIME_TYPE = 'application/octet-stream'
 
-    LOCAL_MD5 = calculate_md5(downloaded_file)
-    if not LOCAL_MD5:
-        raise Exception(f"Gagal menghitung MD5 lokal untuk {downloaded_file}.")
+    # Manifest segmen (dibuat downloader, atau di sini dengan satu kali baca) memberi
+    # MD5 file sekaligus digest per segmen untuk mengecek setiap chunk sebelum dikirim
+    try:
+        manifest = manifest_for(downloaded_file)
+    except OSError as e:
+        raise Exception(f"Gagal menghitung MD5 lokal untuk {downloaded_file}: {e}")
+    LOCAL_MD5 = manifest.md5
+
+    # Dedup: isi yang sama sudah ada di folder tujuan -> tidak perlu upload ulang
+    total_size = os.path.getsize(downloaded_file)
+    drive_index = DriveIndex(account_key(REFRESH_TOKEN))
+    with timing.span("drive.dedup"):
+        existing = find_existing_file(drive_service, drive_index, LOCAL_MD5, total_size, target_folder_id, downloaded_file)
+    if existing:
+        print(f"♻️ File dengan MD5 {LOCAL_MD5} sudah ada di Drive ({existing['id']}). Upload dilewati.")
+        with timing.span("drive.publish"):
+            reused = reuse_or_copy(drive_service, existing, downloaded_file, target_folder_id)
+        publish_file(drive_service, reused["id"], reused,
+                     lambda view, content: send_upload_success(
+                         downloaded_file, LOCAL_MD5, view or reused.get("webViewLink"), content,
+                         note="♻️ **Dedup:** isi identik sudah ada di Drive, upload dilewati."),
+                     publisher)
+        return True
+
+    # File kecil: satu request multipart. Pesan mulai/progres Telegram juga dilewati,
+    # agar waktunya ditentukan ukuran file, bukan jumlah round trip
+    resumable = total_size > DRIVE_MULTIPART_THRESHOLD
+    if resumable and publisher:
+        # Izin file-file kecil sebelumnya tidak perlu menunggu upload besar ini selesai
+        publisher.flush()
         
     file_metadata = {'name': downloaded_file, 'parents': [target_folder_id]}
-    media = MediaFileUpload(downloaded_file, mimetype=MIME_TYPE, resumable=True)
+    reader = VerifiedFileReader(downloaded_file, manifest)
+    media = MediaIoBaseUpload(reader, mimetype=MIME_TYPE, chunksize=DRIVE_CHUNK_SIZE, resumable=resumable)
     request = drive_service.files().create(body=file_metadata, media_body=media, fields='id,webViewLink,webContentLink,md5Checksum')
 
-    message_id = send_telegram_message(f"🚀 Mulai upload file `{downloaded_file}` ke Google Drive...")
+    message_id = send_telegram_message(f"🚀 Mulai upload file `{downloaded_file}` ke Google Drive...") if resumable else None
+    upload_span = timing.start_span("drive.upload")
+    # Jatah bandwidth bersama download yang mungkin masih berjalan; ditegakkan per chunk,
+    # heartbeat menjaga aliran tetap terdaftar selama satu chunk besar terkirim
+    flow = open_flow(downloaded_file, "upload").start_heartbeat()
     last_notified_percent = 0 # 0 -> 50 -> 100
     response = None
-    total_size = os.path.getsize(downloaded_file)
     max_retries = 5
     retry_count = 0
     
-    print(f'🚀 Memulai upload Resumable untuk: {downloaded_file}...')
+    print(f'🚀 Memulai upload {"Resumable" if resumable else "Multipart"} untuk: {downloaded_file}...')
     
-    while response is None:
-        try:
-            status, response = request.next_chunk()
-            retry_count = 0 # Reset hitungan retry jika chunk berhasil
+    # Span, reader dan jatah bandwidth ditutup di semua jalur keluar (termasuk raise)
+    try:
+        while response is None:
+            try:
+                if resumable:
+                    status, response = request.next_chunk()
+                else:
+                    # Multipart tidak bisa ditanya statusnya: timeout bisa terjadi setelah
+                    # Drive membuat file. Sebelum mengulang, cari file bernama sama dengan
+                    # md5 + ukuran sama agar tidak membuat duplikat
+                    existing = find_existing_file(drive_service, drive_index, LOCAL_MD5, total_size,
+                                                  target_folder_id, downloaded_file) if retry_count else None
+                    status, response = None, existing or request.execute()
+                retry_count = 0 # Reset hitungan retry jika chunk berhasil
             
-            if status:
-                percent_uploaded = int(status.progress() * 100)
-                uploaded_size = int(status.progress() * total_size)
+                if status:
+                    flow.pace(status.resumable_progress)
+                    percent_uploaded = int(status.progress() * 100)
+                    uploaded_size = int(status.progress() * total_size)
 
-                # LOGIKA 2X UPDATE: Hanya update pada 50% dan 100%
-                should_update_50 = (percent_uploaded >= 50 and last_notified_percent < 50)
-                should_update_100 = (percent_uploaded == 100)
+                    # LOGIKA 2X UPDATE: Hanya update pada 50% dan 100%
+                    should_update_50 = (percent_uploaded >= 50 and last_notified_percent < 50)
+                    should_update_100 = (percent_uploaded == 100)
                 
-                if should_update_50 or should_update_100:
-                    send_upload_progress(message_id, downloaded_file, uploaded_size, total_size)
-                    last_notified_percent = percent_uploaded
-                    print(f'      Uploaded {percent_uploaded}%')
+                    if should_update_50 or should_update_100:
+                        send_upload_progress(message_id, downloaded_file, uploaded_size, total_size)
+                        last_notified_percent = percent_uploaded
+                        print(f'      Uploaded {percent_uploaded}%')
                     
-        except ResumableUploadError as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                raise Exception("Upload gagal setelah beberapa kali percobaan ulang.")
-            print(f"⚠️ Error Resumable Upload. Mencoba lagi dalam 10 detik. Percobaan ke-{retry_count}...")
-            time.sleep(10)
-        except Exception as e:
-            retry_count += 1
-            if retry_count >= max_retries:
-                raise Exception("Error tak terduga, gagal setelah beberapa kali percobaan ulang.")
-            print(f"❌ Error tak terduga saat upload. Mencoba lagi dalam 10 detik. Percobaan ke-{retry_count}...")
-            time.sleep(10)
+            except IntegrityError:
+                # File di disk tidak cocok dengan manifest: retry tidak akan membantu
+                raise
+            except ResumableUploadError as e:
+                retry_count += 1
+                if retry_count >= max_retries:
+                    raise Exception("Upload gagal setelah beberapa kali percobaan ulang.")
+                print(f"⚠️ Error Resumable Upload. Mencoba lagi dalam 10 detik. Percobaan ke-{retry_count}...")
+                time.sleep(10)
+            except Exception as e:
+                retry_count += 1
+                if retry_count >= max_retries:
+                    raise Exception("Error tak terduga, gagal setelah beberapa kali percobaan ulang.")
+                print(f"❌ Error tak terduga saat upload. Mencoba lagi dalam 10 detik. Percobaan ke-{retry_count}...")
+                time.sleep(10)
+    except BaseException:
+        upload_span.end(status="error")
+        raise
+    finally:
+        reader.close()
+        flow.close()
 
     # Pastikan notifikasi 100% terkirim
-    if last_notified_percent < 100:
+    if resumable and last_notified_percent < 100:
         send_upload_progress(message_id, downloaded_file, total_size, total_size)
 
+    upload_span.end(bytes=total_size)
     DRIVE_MD5 = response.get('md5Checksum')
     FILE_ID = response.get('id')
     WEB_VIEW_LINK = response.get("webViewLink")
     
     if DRIVE_MD5 and LOCAL_MD5 and DRIVE_MD5.lower() == LOCAL_MD5.lower():
         print("👍 VERIFIKASI BERHASIL. File UTUH.")
-        PUBLIC_VIEW_LINK, PUBLIC_CONTENT_LINK = make_file_public(drive_service, FILE_ID)
-        
-        final_link_view = PUBLIC_VIEW_LINK if PUBLIC_VIEW_LINK else WEB_VIEW_LINK
-        final_link_content = PUBLIC_CONTENT_LINK if PUBLIC_CONTENT_LINK else "N/A (Link Download)"
-        
-        success_message = (
-            f"🎉 **UPLOAD SUKSES!** 🎉\n\n"
-            f"File: `{downloaded_file}`\n"
-            f"Folder: `{DRIVE_UPLOAD_FOLDER_NAME}`\n"
-            f"MD5 Lokal: `{LOCAL_MD5}`\n"
-            f"**Status:** **PUBLIK (Dapat Diakses Siapa Saja)!**\n"
-            f"Link Drive: [Lihat File]({final_link_view})\n"
-            f"Link Download Langsung: `{final_link_content}`" 
-        )
-        send_telegram_message(success_message)
+        drive_index.put(LOCAL_MD5, FILE_ID, total_size, downloaded_file)
+        # Respons create sudah memuat link, jadi files.get tambahan dilewati
+        publish_file(drive_service, FILE_ID, response,
+                     lambda view, content: send_upload_success(downloaded_file, LOCAL_MD5, view or WEB_VIEW_LINK, content),
+                     publisher)
         return True
     else:
         error_message = (
@@ -241,17 +358,16 @@ def main():
     """Fungsi utama untuk menjalankan seluruh proses upload."""
     
     # --- Pengecekan Awal ---
-    try:
-        with open("downloaded_filename.txt", "r") as f:
-            DOWNLOADED_FILE = f.read().strip()
-    except FileNotFoundError:
-        error_msg = "❌ ERROR: File 'downloaded_filename.txt' tidak ditemukan. Upload dibatalkan."
+    DOWNLOADED_FILES = read_download_marker()
+    if not DOWNLOADED_FILES:
+        error_msg = "❌ ERROR: File 'downloaded_filename.txt' tidak ditemukan atau kosong. Upload dibatalkan."
         print(error_msg)
         send_telegram_message(f"❌ **Upload GAGAL!**\n\n{error_msg}")
         sys.exit(1)
 
-    if not os.path.exists(DOWNLOADED_FILE):
-        error_msg = f"❌ ERROR: File '{DOWNLOADED_FILE}' tidak ditemukan di sistem file. Upload dibatalkan."
+    missing_files = [name for name in DOWNLOADED_FILES if not os.path.exists(name)]
+    if missing_files:
+        error_msg = f"❌ ERROR: File '{', '.join(missing_files)}' tidak ditemukan di sistem file. Upload dibatalkan."
         print(error_msg)
         send_telegram_message(f"❌ **Upload GAGAL!**\n\n{error_msg}")
         sys.exit(1)
@@ -268,10 +384,14 @@ def main():
         # 1. Otentikasi
         drive_service = authenticate_google_drive()
         
-        # 2. Upload (termasuk verifikasi MD5 dan setel publik)
-        success = upload_file_to_drive(drive_service, DOWNLOADED_FILE)
+        # 2. Upload tiap file (termasuk verifikasi MD5); izin publik file-file kecil dikirim per batch
+        publisher = PublishBatch(drive_service)
+        try:
+            failed_files = [name for name in DOWNLOADED_FILES if not upload_file_to_drive(drive_service, name, publisher)]
+        finally:
+            publisher.flush()
         
-        if not success:
+        if failed_files:
             sys.exit(1)
 
     except Exception as e:
@@ -281,4 +401,4 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
+    run_profiled("upload", main)
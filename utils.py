@@ -1,24 +1,132 @@
 import os
 import subprocess
 import requests
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-#import undetected_chromedriver as uc # PENTING!
-from webdriver_manager.chrome import ChromeDriverManager # <-- Diperlukan lagi
-from selenium_stealth import stealth
 import time
 import json
 import re
-import tempfile
-import shutil
 import glob
-import math
 import sys
-from urllib.parse import urlparse, urlunparse, urlencode, parse_qs
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from timing import span, start_span, timed
+from notifier import send_telegram_message, edit_telegram_message, human_readable_size
+from folder_resolver import is_folder_url
+from stall_watchdog import ThroughputWatchdog, format_rate
+from aria2_rpc import ARIA2_MODE
+from host_stats import RETUNE_MIN_GAP_SECONDS, RETUNE_WINDOW_SECONDS, get_default_stats, host_key
+from storage import StagingArea, InsufficientSpaceError, ensure_free_space, supports_fallocate
+from checkpoint import open_checkpoint
+from playwright_resolver import sourceforge_mirror_choices_url, set_query_param
+from resolution_cache import get_default_cache
+from integrity import IntegrityError, expected_digests, verify_download
+from bandwidth import BANDWIDTH_RESTART_SECONDS, open_flow, restart_worthwhile
+
+# =========================================================
+# LAZY IMPORT BACKEND BERAT
+# =========================================================
+# Selenium, selenium_stealth, webdriver_manager, yt-dlp dan pycryptodome hanya
+# dimuat saat strategi yang membutuhkannya dipakai, sehingga job MEGA/Pixeldrain
+# dan skrip uploader tidak membayar biaya import browser.
+
+webdriver = By = WebDriverWait = EC = Service = None
+TimeoutException = NoSuchElementException = None
+ChromeDriverManager = stealth = None
+
+def _load_selenium():
+    """Mengisi nama-nama Selenium di level modul (sekali saja)."""
+    global webdriver, By, WebDriverWait, EC, Service
+    global TimeoutException, NoSuchElementException, ChromeDriverManager, stealth
+    if webdriver is not None:
+        return
+    from selenium import webdriver as _webdriver
+    from selenium.webdriver.common.by import By as _By
+    from selenium.webdriver.support.ui import WebDriverWait as _WebDriverWait
+    from selenium.webdriver.support import expected_conditions as _EC
+    from selenium.webdriver.chrome.service import Service as _Service
+    from selenium.common.exceptions import TimeoutException as _TimeoutException, NoSuchElementException as _NoSuchElementException
+    #import undetected_chromedriver as uc # PENTING!
+    from webdriver_manager.chrome import ChromeDriverManager as _ChromeDriverManager # <-- Diperlukan lagi
+    from selenium_stealth import stealth as _stealth
+    By, WebDriverWait, EC, Service = _By, _WebDriverWait, _EC, _Service
+    TimeoutException, NoSuchElementException = _TimeoutException, _NoSuchElementException
+    ChromeDriverManager, stealth = _ChromeDriverManager, _stealth
+    # webdriver diisi terakhir: penanda bahwa semua nama sudah siap
+    webdriver = _webdriver
+
+# =========================================================
+# PARSING RINGKASAN ARIA2C
+# =========================================================
+
+# Baris ringkasan dengan --human-readable=false: "[#2089b0 419,430,400B/1,073,741,824B(39%) CN:16 ...]".
+# Format singkat ("400MiB/1.0GiB") tetap dikenali, tetapi dibulatkan hingga 0.1 GiB
+# sehingga watchdog & statistik host tidak bisa memakainya untuk file besar
+ARIA2C_PROGRESS_LINE = re.compile(r"\[#\w+\s+([\d.,]+)(B|KiB|MiB|GiB|TiB)/")
+ARIA2C_UNITS = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4}
+
+def parse_aria2c_progress(line):
+    """Mengembalikan jumlah byte selesai dari baris ringkasan aria2c, atau None."""
+    match = ARIA2C_PROGRESS_LINE.search(line)
+    if not match:
+        return None
+    return int(float(match.group(1).replace(",", "")) * ARIA2C_UNITS[match.group(2)])
+
+# =========================================================
+# ENGINE BROWSER
+# =========================================================
+
+# "selenium" (default) = satu driver sinkron per job; "playwright" = resolver
+# async, banyak halaman bersamaan dalam satu Chromium (lihat playwright_resolver.py)
+BROWSER_ENGINE = os.environ.get("BROWSER_ENGINE", "selenium").lower()
+BROWSER_HOSTS = ("sourceforge", "gofile", "mediafire", "apkadmin")
+
+def uses_browser(url):
+    """True jika run() akan menangani URL ini lewat browser (urutan sama dengan run())."""
+    if "mega.nz" in url or "pixeldrain" in url or is_folder_url(url):
+        return False
+    if any(host in url for host in BROWSER_HOSTS):
+        return True
+    try:
+        import ytdlp_backend
+        if ytdlp_backend.is_supported(url):
+            return False
+    except ImportError:
+        pass
+    return "http" in url
+
+# =========================================================
+# INTERSEPSI DOWNLOAD BROWSER (LOG CDP)
+# =========================================================
+
+# Batas tunggu event download setelah tombol diklik; lewat dari ini browser mengunduh sendiri
+BROWSER_INTERCEPT_TIMEOUT = int(os.environ.get("BROWSER_INTERCEPT_TIMEOUT", "20"))
+# Header request browser yang diteruskan ke aria2c (cookie diambil terpisah via CDP)
+FORWARDED_REQUEST_HEADERS = ("User-Agent", "Referer", "Accept", "Accept-Language", "Authorization")
+
+def _cdp_messages(entries):
+    for entry in entries:
+        try:
+            message = json.loads(entry['message']).get('message') or {}
+        except (KeyError, ValueError):
+            continue
+        yield message.get('method'), message.get('params') or {}
+
+def find_download_event(entries):
+    """Event downloadWillBegin pertama dari log performance: dict (guid, url, suggestedFilename) atau None."""
+    for method, params in _cdp_messages(entries):
+        if method in ('Page.downloadWillBegin', 'Browser.downloadWillBegin') and params.get('url'):
+            return params
+    return None
+
+def request_headers_for(entries, url):
+    """Header request browser (subset FORWARDED_REQUEST_HEADERS) untuk URL tersebut."""
+    headers = {}
+    for method, params in _cdp_messages(entries):
+        if method == 'Network.requestWillBeSent' and params.get('request', {}).get('url') == url:
+            headers = params['request'].get('headers') or {}
+    wanted = {name.lower(): name for name in FORWARDED_REQUEST_HEADERS}
+    return {wanted[name.lower()]: value for name, value in headers.items() if name.lower() in wanted}
+
 # =========================================================
 # CLASS UTAMA: DownloaderBot
 # =========================================================
@@ -26,76 +134,97 @@ from urllib.parse import urlparse, urlunparse, urlencode, parse_qs
 class DownloaderBot:
     """
     Mengelola seluruh proses download dari berbagai sumber, termasuk
-    interaksi Selenium/Headless Browser dan integrasi Aria2c/Megatools.
+    interaksi Selenium/Headless Browser dan integrasi Aria2c/MEGA native.
     """
     
-    def __init__(self, url):
+    def __init__(self, url, work_dir=None, resolved=None):
         # --- KONFIGURASI DAN STATE ---
         self.url = url
+        # Hasil resolve Playwright yang sudah ada (batch): {name, urls, headers}
+        self.resolved = resolved
         self.bot_token = os.environ.get("BOT_TOKEN")
         self.owner_id = os.environ.get("PAYLOAD_SENDER")
-        # Tentukan directory untuk download sementara
-        self.temp_download_dir = tempfile.mkdtemp()
+        # Direktori hasil unduhan per job (TIDAK bergantung pada os.getcwd() setelah ini)
+        self.work_dir = os.path.abspath(work_dir or os.getcwd())
+        os.makedirs(self.work_dir, exist_ok=True)
+        # Staging di filesystem yang sama dengan work_dir: finalisasi cukup rename atomik
+        self.staging = StagingArea(self.work_dir)
+        self.temp_download_dir = self.staging.path
+        # aria2c & MEGA menulis ke direktori checkpoint (persisten, di-cache workflow)
+        # agar job yang dikirim ulang melanjutkan dari byte terakhir
+        self.checkpoint = open_checkpoint(url)
+        self.resume_area = StagingArea(self.work_dir, path=self.checkpoint.path) if self.checkpoint else self.staging
         self.initial_message_id = None
         self.driver = None
-        
-    def __del__(self):
-        # Pastikan driver dihentikan dan folder temp dihapus saat objek dihancurkan
+        self.downloaded_files = []
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """Menghentikan driver dan menghapus folder temp. Aman dipanggil berkali-kali."""
+        if self._closed:
+            return
+        self._closed = True
         if self.driver:
-            self.driver.quit()
-        shutil.rmtree(self.temp_download_dir, ignore_errors=True)
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Peringatan: Gagal menghentikan driver: {e}")
+            self.driver = None
+        self.staging.cleanup()
+        if self.checkpoint:
+            self.checkpoint.close()
+
+    def _directory_size(self, filenames):
+        """Total ukuran file di folder download browser (termasuk .crdownload yang sedang tumbuh)."""
+        total = 0
+        for fname in filenames:
+            try:
+                total += os.path.getsize(os.path.join(self.temp_download_dir, fname))
+            except OSError:
+                pass
+        return total
+
+    def _output_path(self, filename):
+        return os.path.join(self.work_dir, filename)
         
     # =========================================================
     # --- 1. METODE BANTUAN TELEGRAM & UMUM ---
     # =========================================================
 
     def _human_readable_size(self, size_bytes):
-        if size_bytes is None or size_bytes == 0: return "0B"
-        size_name = ("B", "KB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB")
-        i = int(math.floor(math.log(size_bytes, 1024))) if size_bytes > 0 else 0
-        p = math.pow(1024, i)
-        s = round(size_bytes / p, 2) if p > 0 else 0
-        return f"{s} {size_name[i]}"
+        return human_readable_size(size_bytes)
 
     def _send_telegram_message(self, message_text):
         """Mengirim pesan dan menyimpan message_id ke self.initial_message_id."""
         if not self.bot_token or not self.owner_id:
             print("Peringatan: Notifikasi Telegram dinonaktifkan.")
             return None
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-        payload = {"chat_id": self.owner_id, "text": message_text, "parse_mode": "Markdown"}
-        try:
-            response = requests.post(url, json=payload, timeout=10)
-            response_json = response.json()
-            self.initial_message_id = response_json.get('result', {}).get('message_id')
-            return self.initial_message_id
-        except Exception as e:
-            print(f"Gagal mengirim pesan Telegram: {e}")
-            return None
+        self.initial_message_id = send_telegram_message(message_text, bot_token=self.bot_token, chat_id=self.owner_id)
+        return self.initial_message_id
             
     def _edit_telegram_message(self, message_text):
         """Mengedit pesan yang sudah ada (menggunakan self.initial_message_id)."""
-        if not self.bot_token or not self.owner_id or not self.initial_message_id:
-            return
-        url = f"https://api.telegram.org/bot{self.bot_token}/editMessageText"
-        payload = {"chat_id": self.owner_id, "message_id": self.initial_message_id, 
-                   "text": message_text, "parse_mode": "Markdown"}
-        try:
-            requests.post(url, json=payload, timeout=10)
-        except Exception as e:
-            pass 
+        edit_telegram_message(self.initial_message_id, message_text, bot_token=self.bot_token, chat_id=self.owner_id)
 
-    def _get_total_file_size_safe(self, url):
+    @timed("download.probe")
+    def _get_total_file_size_safe(self, url, headers=None):
         """Mendapatkan ukuran file total dari URL dengan aman."""
         try:
-            response = requests.head(url, allow_redirects=True, timeout=10)
+            response = requests.head(url, headers=headers, allow_redirects=True, timeout=10)
             response.raise_for_status()
             content_length = response.headers.get('Content-Length')
             if content_length: return int(content_length)
         except requests.exceptions.RequestException:
             pass 
         try:
-            with requests.get(url, stream=True, timeout=30) as r:
+            with requests.get(url, headers=headers, stream=True, timeout=30) as r:
                 r.raise_for_status()
                 if 'Content-Length' in r.headers:
                     return int(r.headers['Content-Length'])
@@ -103,6 +232,29 @@ class DownloaderBot:
             pass
         return None
 
+    def _probe_headers(self, url, headers=None):
+        """
+        Header respons sumber: ETag/Last-Modified (validator checkpoint) dan digest
+        isi (Content-MD5, x-goog-hash, Digest) untuk verifikasi hasil unduhan.
+        """
+        try:
+            response = requests.head(url, headers=headers, allow_redirects=True, timeout=10)
+            return dict(response.headers)
+        except requests.exceptions.RequestException:
+            return {}
+
+    def _verify_staged(self, staged_path, download_url, headers, expected):
+        """Verifikasi per segmen sebelum commit; segmen rusak diambil ulang lewat Range."""
+        try:
+            with span("download.verify"):
+                verify_download(staged_path, download_url, headers, expected)
+            return True
+        except IntegrityError as e:
+            print(f"❌ Verifikasi integritas gagal: {e}")
+            if self.checkpoint:
+                self.checkpoint.discard(os.path.basename(staged_path))
+            return False
+
     def _extract_filename_from_url_or_header(self, download_url):
         """Mendapatkan nama file dari header Content-Disposition atau fallback ke path URL."""
         file_name = None
@@ -130,140 +282,405 @@ class DownloaderBot:
 
 
     # =========================================================
-    # --- 2. METODE DOWNLOAD INTI (ARIA2C & MEGATOOLS) ---
+    # --- 2. METODE DOWNLOAD INTI (ARIA2C & MEGA) ---
     # =========================================================
 
-    def _download_file_with_aria2c(self, urls, output_filename):
-        """Mengunduh file menggunakan aria2c dengan progress update."""
+    @timed("download.aria2c")
+    def _download_file_with_aria2c(self, urls, output_filename, headers=None, notify=True, expected=None):
+        """
+        Mengunduh file menggunakan aria2c dengan progress update.
+        headers dikirim ke probe dan aria2c (mis. cookie token Gofile); notify=False
+        mematikan pesan per file (dipakai saat mengunduh isi folder secara paralel).
+        expected = digest isi yang diketahui dari API host (mis. SHA-256 Pixeldrain).
+        """
         print(f"Memulai unduhan {output_filename} dengan aria2c.")
-        total_size = None
-        command = ['aria2c', '--allow-overwrite', '--file-allocation=none', '--console-log-level=warn', 
-                   '--summary-interval=0', '-x', '16', '-s', '16', '-c', '--async-dns=false', 
-                   '--log-level=warn', '--continue', '--input-file', '-', '-o', output_filename]
+        download_url, total_size = None, None
+        for url in urls:
+            total_size = self._get_total_file_size_safe(url, headers=headers)
+            if total_size is not None:
+                download_url = url
+                break
+        if download_url is None:
+            return None
+
+        # Gagal lebih awal jika disk tidak cukup; preallocate hanya jika ukuran diketahui
+        try:
+            self.resume_area.ensure_free_space(total_size)
+        except InsufficientSpaceError as e:
+            if notify:
+                self._send_telegram_message(f"❌ {e}")
+            return None
+        staged_path = self.resume_area.path_for(output_filename)
+        source_headers = self._probe_headers(download_url, headers)
+        expected = dict(expected_digests(source_headers), **{k: v for k, v in (expected or {}).items() if v})
+        if self.checkpoint:
+            validators = {"etag": source_headers.get('ETag'), "last_modified": source_headers.get('Last-Modified')}
+            resumed = self.checkpoint.prepare(output_filename, download_url, total_size, validators)
+            # Tanpa file kontrol .aria2, file pra-alokasi tidak bisa dibedakan dari file lengkap
+            if resumed and not os.path.exists(staged_path + '.aria2'):
+                self.checkpoint.discard(output_filename)
+                self.checkpoint.prepare(output_filename, download_url, total_size, validators)
+        allocation = 'falloc' if total_size and supports_fallocate(self.resume_area.path) else 'none'
+        # Jumlah koneksi dipilih dari riwayat throughput host (bukan selalu 16)
+        host = host_key(download_url)
+        stats = get_default_stats()
+        connections = stats.choose_connections(host)
+        if ARIA2_MODE == "rpc":
+            return self._download_file_with_aria2_rpc(download_url, output_filename, total_size, allocation,
+                                                      connections, headers, notify, host, stats, expected)
         
         process = None
+        progress = {"completed": 0}
+        # Jatah bandwidth dari alokator bersama; aria2c mode process perlu restart untuk
+        # menggantinya, jadi batas awal langsung dipasang dan restart dibatasi
+        flow = open_flow(output_filename, "download")
+        applied_rate = flow.update(0)
         try:
-            self._send_telegram_message(f"⬇️ Download dimulai: `{output_filename}`")
-            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            if notify:
+                self._send_telegram_message(f"⬇️ Download dimulai: `{output_filename}`")
+            process, reader = self._start_aria2c(download_url, output_filename, connections, allocation, headers, progress, applied_rate)
+            restarted_at = time.time()
             
-            for url in urls:
-                total_size = self._get_total_file_size_safe(url)
-                if total_size is not None:
-                    process.stdin.write(url + '\n')
-                    break
-            process.stdin.close()
-            
-            start_time = time.time()
-            timeout = 300
+            # Dihentikan hanya jika macet (kecepatan di bawah batas selama satu jendela)
+            watchdog = ThroughputWatchdog(total_size)
             last_notified_percent = 0
+            # Sampel throughput untuk jumlah koneksi yang sedang dipakai
+            sample_start, sample_bytes = time.time(), 0
+            retuned_at = 0
             
-            while time.time() - start_time < timeout:
-                if os.path.exists(output_filename):
-                    current_size = os.path.getsize(output_filename)
-                    if total_size is not None and total_size > 0:
-                        percent_now = int(current_size * 100 // total_size)
-                        
-                        should_update_50 = (percent_now >= 50 and last_notified_percent < 50)
-                        should_update_100 = (percent_now >= 100)
-
-                        if should_update_50 or should_update_100:
-                            self._edit_telegram_message(f"⬇️ Download `{output_filename}` — {percent_now}% ({self._human_readable_size(current_size)}/{self._human_readable_size(total_size)})")
-                            last_notified_percent = percent_now
-                            
-                    if (total_size is not None and current_size >= total_size):
-                        if process.poll() is None:
-                            process.terminate()
-                            time.sleep(2)
-                            if process.poll() is None: process.kill()
-                        return output_filename
+            while not watchdog.stalled:
+                if allocation == 'none' and os.path.exists(staged_path):
+                    current_size = os.path.getsize(staged_path)
+                else:
+                    current_size = progress["completed"]
+                watchdog.update(current_size)
+                rate = flow.update(current_size)
+                # Restart (termasuk restart retune di bawah) paling sering sekali per
+                # BANDWIDTH_RESTART_SECONDS, dan hanya untuk perubahan batas yang besar
+                if restart_worthwhile(applied_rate, rate) and process.poll() is None and time.time() - restarted_at >= BANDWIDTH_RESTART_SECONDS:
+                    print(f"📶 {output_filename}: batas kecepatan {format_rate(rate) if rate else 'dilepas'}")
+                    self._stop_process(process)
+                    reader.join(timeout=5)
+                    applied_rate, restarted_at = rate, time.time()
+                    process, reader = self._start_aria2c(download_url, output_filename, connections, allocation, headers, progress, applied_rate)
+                    sample_start, sample_bytes = restarted_at, current_size
+                if notify and total_size:
+                    percent_now = int(current_size * 100 // total_size)
+                    if percent_now >= 50 and last_notified_percent < 50:
+                        self._edit_telegram_message(f"⬇️ Download `{output_filename}` — {percent_now}% ({self._human_readable_size(current_size)}/{self._human_readable_size(total_size)}) — {watchdog.describe()}")
+                        last_notified_percent = percent_now
+
+                # Tiap jendela pengukuran: simpan sampel, lalu ganti jumlah koneksi jika
+                # riwayat (atau percobaan tetangga) menjanjikan hasil lebih baik.
+                # Retune berikutnya paling cepat RETUNE_MIN_GAP_SECONDS kemudian.
+                sample_seconds = time.time() - sample_start
+                if total_size and process.poll() is None and sample_seconds >= RETUNE_WINDOW_SECONDS:
+                    current_bps = (current_size - sample_bytes) / sample_seconds
+                    remaining_seconds = (total_size - current_size) / current_bps if current_bps > 0 else 0
+                    new_connections = None
+                    if remaining_seconds > 2 * RETUNE_WINDOW_SECONDS and time.time() - retuned_at >= RETUNE_MIN_GAP_SECONDS:
+                        new_connections = stats.suggest_retune(host, connections, current_bps)
+                    stats.record(host, connections, current_size - sample_bytes, sample_seconds)
+                    sample_start, sample_bytes = time.time(), current_size
+                    if new_connections:
+                        print(f"🔧 {host}: {connections} -> {new_connections} koneksi ({self._human_readable_size(current_bps)}/s)")
+                        self._stop_process(process)
+                        reader.join(timeout=5)
+                        connections = new_connections
+                        # Restart ini sekalian memasang batas bandwidth terbaru
+                        applied_rate = rate
+                        # -c + file .aria2 membuat aria2c melanjutkan, bukan mengulang
+                        process, reader = self._start_aria2c(download_url, output_filename, connections, allocation, headers, progress, applied_rate)
+                        retuned_at = restarted_at = time.time()
+                        sample_start, sample_bytes = retuned_at, current_size
                         
                 if process.poll() is not None:
-                    if os.path.exists(output_filename) and os.path.getsize(output_filename) > 0:
-                        if total_size is None or os.path.getsize(output_filename) > total_size:
-                            total_size = os.path.getsize(output_filename)
-                        self._edit_telegram_message(f"✅ Download Selesai. `{output_filename}` ({self._human_readable_size(total_size)})")
-                        return output_filename
-                    
+                    reader.join(timeout=5)
+                    # File .aria2 tersisa berarti unduhan belum lengkap
+                    if process.returncode == 0 and os.path.exists(staged_path) and not os.path.exists(staged_path + '.aria2'):
+                        final_size = os.path.getsize(staged_path)
+                        if final_size > 0:
+                            stats.record(host, connections, final_size - sample_bytes, time.time() - sample_start)
+                            if not self._verify_staged(staged_path, download_url, headers, expected):
+                                return None
+                            self.resume_area.commit(staged_path)
+                            if notify:
+                                self._edit_telegram_message(f"✅ Download Selesai. `{output_filename}` ({self._human_readable_size(final_size)})")
+                            return output_filename
                     return None
                     
                 time.sleep(3)
             
+            print(f"❌ aria2c macet: kecepatan < {format_rate(watchdog.min_bps)} selama {watchdog.window} detik.")
             if process and process.poll() is None:
-                process.terminate()
-                time.sleep(1)
-                process.kill()
+                self._stop_process(process)
                 
         except Exception as e:
             if process and process.poll() is None:
-                process.terminate()
-                time.sleep(1)
-                process.kill()
+                self._stop_process(process)
+        finally:
+            flow.close()
                 
         return None
 
-    def _download_file_with_megatools(self, url):
-        """Mengunduh file dari MEGA dengan megatools."""
-        print(f"Mengunduh file dari MEGA dengan megatools: {url}")
-        original_cwd = os.getcwd()
-        temp_dir = tempfile.mkdtemp()
-        filename = None
-        self._send_telegram_message("⬇️ **Mulai mengunduh...**\n`megatools` sedang mengunduh file.")
-        
+    def _download_file_with_aria2_rpc(self, download_url, output_filename, total_size, allocation,
+                                      connections, headers, notify, host, stats, expected=None):
+        """
+        Varian ARIA2_MODE=rpc: unduhan dikirim ke daemon aria2c bersama lewat
+        JSON-RPC. Byte selesai, kecepatan dan error dibaca persis dari tellStatus.
+        Retune koneksi memakai changeOption: daemon tetap hidup, tetapi aria2
+        memulai ulang unduhan itu (lanjut dari file .aria2) dan membuka koneksi baru.
+        """
+        from aria2_rpc import get_shared_daemon
+        staged_path = self.resume_area.path_for(output_filename)
+        options = {
+            "dir": self.resume_area.path,
+            "out": output_filename,
+            "file-allocation": allocation,
+            "split": str(connections),
+            "max-connection-per-server": str(connections),
+        }
+        if headers:
+            options["header"] = [f"{name}: {value}" for name, value in headers.items()]
+        daemon = None
+        gid = None
+        flow = open_flow(output_filename, "download")
+        applied_rate = 0
         try:
-            os.chdir(temp_dir)
-            process = subprocess.Popen(['megatools', 'dl', url], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            
+            daemon = get_shared_daemon()
+            if notify:
+                self._send_telegram_message(f"⬇️ Download dimulai: `{output_filename}`")
+            gid = daemon.add_uri([download_url], options)
+
+            watchdog = ThroughputWatchdog(total_size)
             last_notified_percent = 0
-            progress_regex = re.compile(r'(\d+\.\d+)%\s+of\s+.*\((\d+\.\d+)\s*(\wB)\)')
-            
-            while True:
-                line = process.stdout.readline()
-                if not line: break
-                
-                match = progress_regex.search(line)
-                if match:
-                    percent_now = math.floor(float(match.group(1)))
-                    current_size_str = match.group(2)
-                    current_unit = match.group(3)
-                    
-                    if percent_now >= 50 and last_notified_percent < 50 or percent_now == 100:
+            sample_start, sample_bytes = time.time(), 0
+            retuned_at = 0
+            was_active = False
+
+            while not watchdog.stalled:
+                status = daemon.tell_status(gid, ("status", "completedLength", "totalLength", "downloadSpeed", "errorMessage"))
+                current_size = int(status["completedLength"])
+                total_size = int(status["totalLength"]) or total_size
+                watchdog.total_size = total_size
+                # Hanya status active yang diukur: gid yang masih waiting (antre di
+                # daemon atau dimulai ulang oleh changeOption) bukan unduhan macet
+                if status["status"] == "active":
+                    if not was_active:
+                        watchdog.reset()
+                        sample_start, sample_bytes = time.time(), current_size
+                    watchdog.update(current_size)
+                was_active = status["status"] == "active"
+                # Mode RPC: batas per unduhan diganti langsung tanpa restart
+                rate = flow.update(current_size)
+                if rate != applied_rate:
+                    daemon.change_option(gid, {"max-download-limit": str(rate)})
+                    applied_rate = rate
+
+                if status["status"] == "complete":
+                    stats.record(host, connections, current_size - sample_bytes, time.time() - sample_start)
+                    if not self._verify_staged(staged_path, download_url, headers, expected):
+                        return None
+                    self.resume_area.commit(staged_path)
+                    if notify:
+                        self._edit_telegram_message(f"✅ Download Selesai. `{output_filename}` ({self._human_readable_size(current_size)})")
+                    return output_filename
+                if status["status"] in ("error", "removed"):
+                    print(f"❌ aria2c RPC gagal: {status.get('errorMessage')}")
+                    return None
+
+                if notify and total_size:
+                    percent_now = int(current_size * 100 // total_size)
+                    if percent_now >= 50 and last_notified_percent < 50:
+                        speed = self._human_readable_size(int(status["downloadSpeed"]))
+                        self._edit_telegram_message(f"⬇️ Download `{output_filename}` — {percent_now}% ({self._human_readable_size(current_size)}/{self._human_readable_size(total_size)}) — {speed}/s, {watchdog.describe()}")
                         last_notified_percent = percent_now
-                        progress_message = f"⬇️ **Mulai mengunduh...**\nUkuran file: `{current_size_str} {current_unit}`\n\nProgres: `{percent_now}%`"
-                        self._edit_telegram_message(progress_message)
-                        
-            process.wait()
-            if process.returncode != 0:
-                error_output = process.stderr.read()
-                raise subprocess.CalledProcessError(process.returncode, process.args, stderr=error_output)
-                
-            downloaded_files = os.listdir('.')
-            downloaded_files = [f for f in downloaded_files if not f.endswith('.megatools')]
-            
-            if len(downloaded_files) == 1:
-                filename = downloaded_files[0]
-                self._edit_telegram_message(f"✅ **MEGA: Unduhan selesai!**\nFile: `{filename}`\n\n**➡️ Mulai UPLOADING...**")
-                return filename
-            else:
-                return None
+
+                sample_seconds = time.time() - sample_start
+                if was_active and total_size and sample_seconds >= RETUNE_WINDOW_SECONDS:
+                    current_bps = (current_size - sample_bytes) / sample_seconds
+                    remaining_seconds = (total_size - current_size) / current_bps if current_bps > 0 else 0
+                    new_connections = None
+                    if remaining_seconds > 2 * RETUNE_WINDOW_SECONDS and time.time() - retuned_at >= RETUNE_MIN_GAP_SECONDS:
+                        new_connections = stats.suggest_retune(host, connections, current_bps)
+                    stats.record(host, connections, current_size - sample_bytes, sample_seconds)
+                    sample_start, sample_bytes = time.time(), current_size
+                    if new_connections:
+                        print(f"🔧 {host}: {connections} -> {new_connections} koneksi ({self._human_readable_size(current_bps)}/s)")
+                        connections = new_connections
+                        # aria2 memulai ulang gid ini; sampel baru dimulai saat active lagi
+                        was_active = False
+                        daemon.change_option(gid, {"split": str(connections), "max-connection-per-server": str(connections)})
+                        retuned_at = time.time()
+
+                time.sleep(3)
+
+            print(f"❌ aria2c macet: kecepatan < {format_rate(watchdog.min_bps)} selama {watchdog.window} detik.")
         except Exception as e:
-            self._edit_telegram_message(f"❌ **`megatools` gagal mengunduh file.**\n\nDetail: {str(e)[:200]}...")
+            print(f"❌ aria2c RPC error: {e}")
+        finally:
+            flow.close()
+            if daemon and gid:
+                daemon.remove(gid)
+        return None
+
+    def _start_aria2c(self, download_url, output_filename, connections, allocation, headers, progress, rate=0):
+        """Menjalankan aria2c untuk satu URL (rate = batas byte/detik, 0 = tanpa batas). Mengembalikan (process, thread pembaca ringkasan)."""
+        command = ['aria2c', '--allow-overwrite', f'--file-allocation={allocation}', '--console-log-level=warn', 
+                   '--summary-interval=3', '--human-readable=false', '-x', str(connections), '-s', str(connections), '-c', '--async-dns=false', 
+                   '--log-level=warn', '--continue', f'--max-download-limit={rate}',
+                   '--input-file', '-', '-d', self.resume_area.path, '-o', output_filename]
+        for name, value in (headers or {}).items():
+            command.append(f'--header={name}: {value}')
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        process.stdin.write(download_url + '\n')
+        process.stdin.close()
+
+        # File yang sudah di-fallocate berukuran penuh sejak awal, jadi progres
+        # dibaca dari ringkasan aria2c (byte mentah), bukan dari ukuran file.
+        def read_summary():
+            for line in process.stdout:
+                completed = parse_aria2c_progress(line)
+                if completed is not None:
+                    progress["completed"] = completed
+        reader = threading.Thread(target=read_summary, daemon=True)
+        reader.start()
+        return process, reader
+
+    def _stop_process(self, process):
+        """SIGTERM dulu (aria2c menyimpan file .aria2 agar bisa dilanjutkan), lalu kill."""
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    @timed("download.mega")
+    def _download_file_with_mega(self, url):
+        """Mengunduh file dari MEGA secara native (multi-koneksi, dekripsi & verifikasi MAC paralel)."""
+        print(f"Mengunduh file dari MEGA (native): {url}")
+        self._send_telegram_message("⬇️ **Mulai mengunduh...**\nMEGA native sedang mengunduh file.")
+        last_notified = {"percent": 0}
+        flow = open_flow(url, "download")
+
+        def progress(done_bytes, total_bytes):
+            # Dipanggil berurutan (di luar lock progres MEGA): menahan di sini hanya
+            # menunda worker dekripsi berikutnya, sehingga pengambilan segmen ikut melambat
+            flow.pace(done_bytes)
+            percent_now = int(done_bytes * 100 // total_bytes) if total_bytes else 0
+            if percent_now >= 50 and last_notified["percent"] < 50 or percent_now == 100:
+                last_notified["percent"] = percent_now
+                self._edit_telegram_message(f"⬇️ **Mulai mengunduh...**\nUkuran file: `{self._human_readable_size(total_bytes)}`\n\nProgres: `{percent_now}%`")
+
+        try:
+            from mega_downloader import MegaDownloader
+            downloader = MegaDownloader(url, progress_callback=progress)
+            filename, size = downloader.resolve()
+            print(f"MEGA: {filename} ({self._human_readable_size(size)})")
+            # MEGA sendiri mengecek direktori checkpoint; commit lintas filesystem
+            # juga butuh ruang di work_dir
+            if not self.resume_area.same_filesystem():
+                ensure_free_space(self.work_dir, size)
+            final_path = self.resume_area.commit(downloader.download(self.resume_area.path, checkpoint=self.checkpoint))
+            filename = os.path.basename(final_path)
+            self._edit_telegram_message(f"✅ **MEGA: Unduhan selesai!**\nFile: `{filename}`\n\n**➡️ Mulai UPLOADING...**")
+            return filename
+        except Exception as e:
+            self._edit_telegram_message(f"❌ **MEGA gagal mengunduh file.**\n\nDetail: {str(e)[:200]}...")
             return None
         finally:
-            os.chdir(original_cwd)
-            if filename and os.path.exists(os.path.join(temp_dir, filename)):
-                shutil.move(os.path.join(temp_dir, filename), os.path.join(original_cwd, filename))
-            shutil.rmtree(temp_dir, ignore_errors=True)
+            flow.close()
+
+    @timed("download.ytdlp")
+    def _download_file_with_ytdlp(self, url):
+        """Mengunduh video lewat yt-dlp (fragmen paralel, format dipilih untuk ukuran/kecepatan)."""
+        print(f"Mengunduh video dengan yt-dlp: {url}")
+        self._edit_telegram_message("⬇️ **[yt-dlp Mode]** Mengambil info video...")
+        import ytdlp_backend
+        last_notified = {"percent": 0}
+        flow = open_flow(url, "download")
+
+        def progress(done_bytes, total_bytes):
+            flow.pace(done_bytes)
+            percent_now = int(done_bytes * 100 // total_bytes) if total_bytes else 0
+            if percent_now >= 50 and last_notified["percent"] < 50 or percent_now >= 100 and last_notified["percent"] < 100:
+                last_notified["percent"] = percent_now
+                self._edit_telegram_message(f"⬇️ **[yt-dlp Mode]** Progres: `{percent_now}%` ({self._human_readable_size(done_bytes)}/{self._human_readable_size(total_bytes)})")
+
+        try:
+            final_path = ytdlp_backend.download(url, self.work_dir, progress_callback=progress)
+        finally:
+            flow.close()
+        if not final_path or not os.path.exists(final_path):
+            raise Exception("yt-dlp tidak menghasilkan file.")
+        filename = os.path.basename(final_path)
+        self._edit_telegram_message(f"✅ **yt-dlp: Unduhan selesai!**\nFile: `{filename}` ({self._human_readable_size(os.path.getsize(final_path))})\n\n**➡️ Mulai UPLOADING...**")
+        return filename
+
+    def _folder_output_names(self, entries):
+        """Meratakan path relatif anak folder menjadi nama file unik di work_dir."""
+        used = set()
+        names = []
+        for entry in entries:
+            name = entry["name"].replace(os.sep, " - ")
+            base, ext = os.path.splitext(name)
+            counter = 1
+            while name in used:
+                name = f"{base} ({counter}){ext}"
+                counter += 1
+            used.add(name)
+            names.append(name)
+        return names
+
+    @timed("download.folder")
+    def _download_folder(self, entries):
+        """
+        Mengunduh semua file dari listing folder dengan pool terbatas
+        (FOLDER_CONCURRENCY), sehingga waktu total ~ waktu file terbesar.
+        Mengembalikan list nama file yang berhasil (urutan listing).
+        """
+        from folder_resolver import FOLDER_CONCURRENCY, resolve_mediafire_direct_link
+        total = len(entries)
+        names = self._folder_output_names(entries)
+        total_size = sum(entry.get("size") or 0 for entry in entries)
+        self._edit_telegram_message(f"📁 **Folder: {total} file** ({self._human_readable_size(total_size)})\nMengunduh {min(FOLDER_CONCURRENCY, total)} file sekaligus...")
+        progress_lock = threading.Lock()
+        finished = {"ok": 0, "failed": 0}
+
+        def download_one(index):
+            entry, name = entries[index], names[index]
+            result = None
+            try:
+                url = entry.get("url") or resolve_mediafire_direct_link(entry["page_url"])
+                result = self._download_file_with_aria2c([url], name, headers=entry.get("headers"), notify=False)
+            except Exception as e:
+                print(f"❌ Gagal mengunduh {name}: {e}")
+            with progress_lock:
+                finished["ok" if result else "failed"] += 1
+                done = finished["ok"] + finished["failed"]
+                self._edit_telegram_message(f"📁 **Folder:** `{done}/{total}` file selesai ({finished['failed']} gagal)")
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, FOLDER_CONCURRENCY)) as pool:
+            results = list(pool.map(download_one, range(total)))
+
+        downloaded = [name for name in results if name]
+        if downloaded:
+            self._edit_telegram_message(f"✅ **Folder: Unduhan selesai!**\n`{len(downloaded)}/{total}` file berhasil.\n\n**➡️ Mulai UPLOADING...**")
+        return downloaded
 
     # =========================================================
     # --- 3. METODE SELENIUM ---
     # =========================================================
 
+    @timed("browser.startup")
     def _initialize_selenium_driver(self):
         """
         Menginisialisasi dan mengkonfigurasi Chrome Driver (Headless) 
         menggunakan selenium-stealth untuk menghindari deteksi bot.
         Mengaktifkan Performance Logging untuk CDP Network Events.
         """
+        _load_selenium()
         
         chrome_prefs = {
             "download.default_directory": self.temp_download_dir,
@@ -302,6 +719,14 @@ class DownloaderBot:
                     )
             
             self.driver.set_page_load_timeout(60) 
+            # Event downloadWillBegin (membawa guid untuk Browser.cancelDownload) dipakai
+            # untuk mengambil alih download browser
+            try:
+                self.driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+                    'behavior': 'allow', 'downloadPath': self.temp_download_dir, 'eventsEnabled': True,
+                })
+            except Exception as e:
+                print(f"Peringatan: Browser.setDownloadBehavior gagal: {e}")
             
             return True
         except Exception as e:
@@ -316,6 +741,7 @@ class DownloaderBot:
         url = self.url
         downloaded_filename = None
         
+        resolve_span = start_span("page.resolve", handler="selenium")
         driver.get(url)
         self._edit_telegram_message(f"⬇️ **[Mode Download]** Menganalisis situs...")
 
@@ -343,6 +769,8 @@ class DownloaderBot:
                 if not final_download_url: raise Exception("Atribut 'href' pada tombol download kosong.")
 
                 file_name = self._extract_filename_from_url_or_header(final_download_url)
+                resolve_span.end(host="mediafire")
+                self._remember_resolution(file_name, [final_download_url])
                 
                 self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{file_name}`")
                 downloaded_filename = self._download_file_with_aria2c([final_download_url], file_name)
@@ -396,14 +824,24 @@ class DownloaderBot:
                 except TimeoutException:
                     continue
         
-        # 4. Monitoring Download (Logika Monitoring Ketat)
+        resolve_span.end(host="gofile" if "gofile" in url else "aggressive")
+
+        # 4. Ambil alih download browser: URL + cookie + header diteruskan ke aria2c
         if action_performed:
-            start_time = time.time()
-            timeout = 300
+            downloaded_filename = self._intercept_browser_download()
+            if downloaded_filename:
+                return downloaded_filename
+
+        # 5. Monitoring Download (Logika Monitoring Ketat)
+        if action_performed:
+            download_span = start_span("download.browser")
+            watchdog = ThroughputWatchdog()
             initial_files = set(os.listdir(self.temp_download_dir))
+            last_report = time.time()
             
-            while time.time() - start_time < timeout:
+            while not watchdog.stalled:
                 current_files = os.listdir(self.temp_download_dir)
+                watchdog.update(self._directory_size(current_files))
                 
                 is_downloading = any(fname.endswith(('.crdownload', '.tmp')) or "Unconfirmed" in fname for fname in current_files)
                 
@@ -417,13 +855,19 @@ class DownloaderBot:
 
                 if not is_downloading and final_files_list:
                     break
+
+                if time.time() - last_report >= 30:
+                    self._edit_telegram_message(f"⬇️ **[Browser]** Mengunduh... {self._human_readable_size(watchdog.done_bytes)} — {watchdog.describe()}")
+                    last_report = time.time()
                 
                 time.sleep(1)
                 
             else:
-                raise TimeoutException("Unduhan gagal atau melebihi batas waktu 300 detik.")
+                download_span.end(status="error")
+                raise TimeoutException(f"Unduhan macet: kecepatan < {format_rate(watchdog.min_bps)} selama {watchdog.window} detik.")
+            download_span.end()
 
-            # 5. Finalisasi File
+            # 6. Finalisasi File
             final_files_list = [
                 f for f in os.listdir(self.temp_download_dir) 
                 if not f.endswith(('.crdownload', '.tmp')) and not f.startswith('.') and "Unconfirmed" not in f
@@ -433,9 +877,9 @@ class DownloaderBot:
                 latest_file_path = max([os.path.join(self.temp_download_dir, f) for f in final_files_list], key=os.path.getctime)
                 downloaded_filename = os.path.basename(latest_file_path)
                 
-                shutil.move(latest_file_path, os.path.join(os.getcwd(), downloaded_filename))
+                self.staging.commit(latest_file_path)
                 
-                file_size = os.path.getsize(downloaded_filename)
+                file_size = os.path.getsize(self._output_path(downloaded_filename))
                 self._edit_telegram_message(f"✅ **Unduhan selesai!**\nFile: `{downloaded_filename}` ({self._human_readable_size(file_size)})\n\n**➡️ Mulai UPLOADING...**")
                 
                 return downloaded_filename
@@ -445,26 +889,71 @@ class DownloaderBot:
         return downloaded_filename
 
 
+    def _intercept_browser_download(self):
+        """
+        Menunggu event downloadWillBegin (CDP) setelah tombol diklik. Jika URL final
+        bisa diakses dengan cookie + header sesi browser, download browser
+        (satu koneksi) dibatalkan dan file diunduh aria2c multi-koneksi.
+        Mengembalikan nama file, atau None agar browser tetap mengunduh sendiri.
+        """
+        driver = self.driver
+        entries = []
+        event = None
+        deadline = time.time() + BROWSER_INTERCEPT_TIMEOUT
+        try:
+            while event is None and time.time() < deadline:
+                entries.extend(driver.get_log('performance'))
+                event = find_download_event(entries)
+                if event is None:
+                    time.sleep(0.5)
+        except Exception as e:
+            print(f"Peringatan: Log performance tidak tersedia: {e}")
+            return None
+        if event is None:
+            return None
+
+        download_url = event['url']
+        headers = request_headers_for(entries, download_url)
+        headers.setdefault("User-Agent", driver.execute_script("return navigator.userAgent;"))
+        headers.setdefault("Referer", driver.current_url)
+        try:
+            # Network.getCookies (bukan driver.get_cookies) juga memuat cookie domain server file
+            cookies = driver.execute_cdp_cmd('Network.getCookies', {'urls': [download_url]}).get('cookies', [])
+        except Exception:
+            cookies = driver.get_cookies()
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+
+        # Probe dengan identitas browser; gagal = biarkan browser yang mengunduh
+        if self._get_total_file_size_safe(download_url, headers=headers) is None:
+            print("Peringatan: URL download browser tidak bisa diakses di luar browser. Memakai download browser.")
+            return None
+        if event.get('guid'):
+            try:
+                driver.execute_cdp_cmd('Browser.cancelDownload', {'guid': event['guid']})
+            except Exception as e:
+                print(f"Peringatan: Gagal membatalkan download browser: {e}")
+        for fname in os.listdir(self.temp_download_dir):
+            if fname.endswith('.crdownload'):
+                try:
+                    os.remove(os.path.join(self.temp_download_dir, fname))
+                except OSError:
+                    pass
+
+        file_name = event.get('suggestedFilename') or self._extract_filename_from_url_or_header(download_url)
+        self._remember_resolution(file_name, [download_url], headers)
+        print(f"🔀 Download browser diambil alih aria2c: {download_url}")
+        self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{file_name}`")
+        downloaded_filename = self._download_file_with_aria2c([download_url], file_name, headers=headers)
+        if not downloaded_filename:
+            raise Exception("Aria2c gagal mengunduh file hasil intersepsi browser.")
+        self._edit_telegram_message(f"✅ **Unduhan selesai!**\nFile: `{downloaded_filename}`\n\n**➡️ Mulai UPLOADING...**")
+        return downloaded_filename
+
     def _process_sourceforge_download(self):
         """Menangani SourceForge: Mendapatkan mirror URL dan memanggil aria2c."""
         
-        def source_url(download_url):
-            parsed_url = urlparse(download_url)
-            path_parts = parsed_url.path.split('/')
-            project_name = path_parts[2]
-            file_path = '/'.join(path_parts[4:-1])
-            query_params = {'projectname': project_name, 'filename': file_path}
-            new_path = "/settings/mirror_choices"
-            new_url_parts = (parsed_url.scheme, parsed_url.netloc, new_path, '', urlencode(query_params), '')
-            return urlunparse(new_url_parts)
-        
-        def set_url(url, param_name, param_value):
-            parsed_url = urlparse(url)
-            query_params = parse_qs(parsed_url.query)
-            query_params[param_name] = [param_value]
-            new_query = urlencode(query_params, doseq=True)
-            return urlunparse((parsed_url.scheme, parsed_url.netloc, parsed_url.path, parsed_url.params, new_query, parsed_url.fragment))
-        
+        resolve_span = start_span("page.resolve", handler="sourceforge")
         self.driver.get(self.url)
         
         # Ekstraksi nama file dan link tombol pertama
@@ -477,7 +966,7 @@ class DownloaderBot:
         ahref = download_button.get_attribute('href')
         
         # Navigasi ke halaman mirror
-        mirror_url = source_url(self.url)
+        mirror_url = sourceforge_mirror_choices_url(self.url)
         self.driver.get(mirror_url)
         
         list_items = WebDriverWait(self.driver, 10).until(
@@ -485,7 +974,9 @@ class DownloaderBot:
         )
         li_id = [item.get_attribute("id") for item in list_items]
         
-        download_urls = [set_url(ahref, 'use_mirror', mirror_id) for mirror_id in li_id]
+        download_urls = [set_query_param(ahref, 'use_mirror', mirror_id) for mirror_id in li_id]
+        resolve_span.end(mirrors=len(download_urls))
+        self._remember_resolution(aname, download_urls)
         
         self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{aname}`")
         downloaded_filename = self._download_file_with_aria2c(download_urls, aname)
@@ -505,6 +996,7 @@ class DownloaderBot:
         ⚠️ DEBUG: Mencetak respons HTML halaman kedua ke konsol.
         """
         driver = self.driver
+        resolve_span = start_span("page.resolve", handler="apkadmin")
         driver.get(self.url)
         
         SELECTOR_FORM = "form[name='F1']"
@@ -589,6 +1081,8 @@ class DownloaderBot:
         
         # 3. PANGGIL ARIA2C
         file_name = self._extract_filename_from_url_or_header(final_download_url)
+        resolve_span.end()
+        self._remember_resolution(file_name, [final_download_url])
         
         self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{file_name}`")
         downloaded_filename = self._download_file_with_aria2c([final_download_url], file_name)
@@ -602,15 +1096,94 @@ class DownloaderBot:
     # --- 4. MAIN ORCHESTRATOR (run) ---
     # =========================================================
 
+    def _is_ytdlp_url(self, url):
+        try:
+            import ytdlp_backend
+        except ImportError:
+            return False
+        return ytdlp_backend.is_supported(url)
+
+    def _remember_resolution(self, name, urls, headers=None):
+        """Menyimpan link langsung hasil resolve browser agar retry/link ulang melewati browser."""
+        get_default_cache().put(self.url, name, urls, headers)
+
+    def _download_resolved(self, resolved):
+        """Mengunduh hasil resolve Playwright ({name, urls, headers}) dengan aria2c."""
+        file_name = resolved["name"] or self._extract_filename_from_url_or_header(resolved["urls"][0])
+        self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{file_name}`")
+        downloaded_filename = self._download_file_with_aria2c(resolved["urls"], file_name, headers=resolved["headers"])
+        if not downloaded_filename:
+            raise Exception("Aria2c gagal mengunduh file hasil resolve Playwright.")
+        self._edit_telegram_message(f"✅ **Unduhan selesai!**\nFile: `{downloaded_filename}`\n\n**➡️ Mulai UPLOADING...**")
+        return downloaded_filename
+
+    def _run_selenium_handlers(self):
+        # Link langsung dari resolve sebelumnya (sudah divalidasi HEAD): tanpa browser
+        cached = get_default_cache().get(self.url)
+        if cached:
+            print(f"⚡ Memakai link langsung dari cache resolusi: {cached['name']}")
+            try:
+                return self._download_resolved(cached)
+            except Exception as e:
+                print(f"Peringatan: Link dari cache gagal ({e}). Resolve ulang.")
+                get_default_cache().forget(self.url)
+
+        if self.resolved is None and BROWSER_ENGINE == "playwright":
+            try:
+                from playwright_resolver import resolve_urls
+                self.resolved = resolve_urls([self.url])[0]
+            except Exception as e:
+                self.resolved = e
+            if isinstance(self.resolved, Exception):
+                print(f"Peringatan: Resolve Playwright gagal ({self.resolved}). Memakai Selenium.")
+                self.resolved = None
+        if self.resolved is not None:
+            self._remember_resolution(self.resolved["name"], self.resolved["urls"], self.resolved["headers"])
+            return self._download_resolved(self.resolved)
+
+        if not self._initialize_selenium_driver(): 
+            raise Exception("Gagal inisialisasi driver Selenium.")
+        
+        if "sourceforge" in self.url:
+            return self._process_sourceforge_download()
+        elif "apkadmin" in self.url:
+            return self._process_apkadmin_download()
+        else:
+            return self._process_selenium_download()
+
+    def _try_folder_download(self):
+        """
+        Mengunduh URL folder lewat content API. Mengembalikan False jika listing
+        gagal (mis. token situs Gofile berubah) agar run() jatuh ke Selenium.
+        """
+        from folder_resolver import list_folder
+        self._edit_telegram_message("🔍 **Mendaftar isi folder...**")
+        try:
+            with span("page.resolve", handler="folder_api"):
+                entries = list_folder(self.url)
+        except Exception as e:
+            print(f"Peringatan: Listing folder gagal ({e}). Beralih ke Selenium.")
+            return False
+        if not entries:
+            return False
+        self.downloaded_files = self._download_folder(entries)
+        if not self.downloaded_files:
+            raise Exception("Tidak ada file folder yang berhasil diunduh.")
+        return True
+
+    @timed("download.run")
     def run(self):
-        """Titik masuk utama. Memproses URL dan mengarahkan ke handler yang tepat."""
+        """
+        Titik masuk utama. Memproses URL dan mengarahkan ke handler yang tepat.
+        Mengembalikan list nama file di work_dir (lebih dari satu untuk folder), atau None.
+        """
         self._send_telegram_message(f"⏳ **Menganalisis URL...**\nURL: `{self.url}`")
         downloaded_filename = None
         
         try:
             # 1. LOGIKA UTAMA (MEGA, PIXELDRAIN)
             if "mega.nz" in self.url:
-                downloaded_filename = self._download_file_with_megatools(self.url)
+                downloaded_filename = self._download_file_with_mega(self.url)
             
             elif "pixeldrain" in self.url:
                 file_id_match = re.search(r'pixeldrain\.com/(u|l|f)/([a-zA-Z0-9]+)', self.url)
@@ -628,29 +1201,39 @@ class DownloaderBot:
                 download_url = f"https://pixeldrain.com/api/file/{file_id}?download"
                 
                 self._edit_telegram_message(f"⬇️ **Memulai unduhan dengan `aria2c`...**\nFile: `{filename}`")
-                downloaded_filename = self._download_file_with_aria2c([download_url], filename)
+                downloaded_filename = self._download_file_with_aria2c([download_url], filename,
+                                                                      expected={"sha256": file_info.get('hash_sha256')})
                 
                 if downloaded_filename:
                     self._edit_telegram_message(f"✅ **Pixeldrain: Unduhan selesai!**\nFile: `{downloaded_filename}`\n\n**➡️ Mulai UPLOADING...**")
             
-            # 2. LOGIKA SELENIUM
-            elif "sourceforge" in self.url or "gofile" in self.url or "mediafire" in self.url or "apkadmin" in self.url or "http" in self.url:
-                
-                if not self._initialize_selenium_driver(): 
-                    raise Exception("Gagal inisialisasi driver Selenium.")
-                
-                if "sourceforge" in self.url:
-                    downloaded_filename = self._process_sourceforge_download()
-                elif "apkadmin" in self.url:
-                     downloaded_filename = self._process_apkadmin_download()
-                else:
-                    downloaded_filename = self._process_selenium_download()
+            # 2. FOLDER GOFILE/MEDIAFIRE (content API, tanpa browser)
+            elif is_folder_url(self.url) and self._try_folder_download():
+                downloaded_filename = self.downloaded_files
+
+            # 3. LOGIKA SELENIUM (host yang dikenal)
+            elif "sourceforge" in self.url or "gofile" in self.url or "mediafire" in self.url or "apkadmin" in self.url:
+                downloaded_filename = self._run_selenium_handlers()
+
+            # 4. SITUS VIDEO (yt-dlp punya extractor khusus)
+            elif self._is_ytdlp_url(self.url):
+                downloaded_filename = self._download_file_with_ytdlp(self.url)
+
+            # 5. MODE AGRESIF (Selenium) UNTUK URL LAIN
+            elif "http" in self.url:
+                downloaded_filename = self._run_selenium_handlers()
             
             else:
                 raise ValueError("URL tidak dikenali atau tidak didukung.")
 
             if downloaded_filename:
-                # Tulis file nama terakhir
+                # Data parsial tidak dibutuhkan lagi; saat gagal checkpoint dibiarkan
+                # agar bisa di-cache workflow dan dilanjutkan job berikutnya
+                if self.checkpoint:
+                    self.checkpoint.clear()
+                # Selalu list: satu URL folder bisa menghasilkan banyak file
+                if isinstance(downloaded_filename, str):
+                    return [downloaded_filename]
                 return downloaded_filename
             
         except Exception as e:
@@ -659,5 +1242,48 @@ class DownloaderBot:
             return None
             
         finally:
-            # Cleanup otomatis oleh __del__
-            pass
+            # Driver tidak dibutuhkan lagi setelah URL selesai diproses
+            if self.driver:
+                try:
+                    self.driver.quit()
+                except Exception:
+                    pass
+                self.driver = None
+
+
+# =========================================================
+# MENJALANKAN BANYAK JOB SEKALIGUS
+# =========================================================
+
+def run_downloads(urls, base_dir=None, max_workers=4):
+    """
+    Menjalankan beberapa DownloaderBot secara paralel dalam satu proses.
+    Setiap job mendapat work_dir sendiri di bawah base_dir, sehingga nama file
+    yang sama dari dua job tidak saling menimpa. Mengembalikan list
+    (url, list_path_file_atau_None) sesuai urutan input.
+    """
+    base_dir = os.path.abspath(base_dir or os.getcwd())
+
+    # Engine Playwright: semua URL browser di-resolve bersamaan dalam satu Chromium
+    # sebelum unduhan dimulai; yang gagal di-resolve ulang oleh job-nya sendiri
+    resolved = {}
+    if BROWSER_ENGINE == "playwright":
+        cache = get_default_cache()
+        browser_urls = [url for url in urls if uses_browser(url) and cache.get(url, validate=False) is None]
+        if browser_urls:
+            try:
+                from playwright_resolver import resolve_urls
+                results = resolve_urls(browser_urls)
+                resolved = {url: result for url, result in zip(browser_urls, results) if not isinstance(result, Exception)}
+            except Exception as e:
+                print(f"Peringatan: Resolve Playwright batch gagal: {e}")
+
+    def run_one(index_url):
+        index, url = index_url
+        job_dir = os.path.join(base_dir, f"job_{index}")
+        with DownloaderBot(url, work_dir=job_dir, resolved=resolved.get(url)) as downloader:
+            filenames = downloader.run()
+            return url, [os.path.join(job_dir, name) for name in filenames] if filenames else None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(run_one, enumerate(urls)))
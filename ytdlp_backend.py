@@ -0,0 +1,73 @@
+import os
+import yt_dlp
+from yt_dlp.extractor import gen_extractor_classes
+
+# =========================================================
+# KONSTANTA & KONFIGURASI YT-DLP
+# =========================================================
+
+YTDLP_COOKIES_FILE = os.path.abspath(os.environ.get("YTDLP_COOKIES_FILE", "cookies.txt"))
+YTDLP_FRAGMENTS = int(os.environ.get("YTDLP_FRAGMENTS", "8"))
+YTDLP_MAX_HEIGHT = int(os.environ.get("YTDLP_MAX_HEIGHT", "1080"))
+# Video terbaik + audio terbaik (digabung), fallback ke format tunggal
+YTDLP_FORMAT = os.environ.get("YTDLP_FORMAT", "bv*+ba/b")
+# Urutan preferensi: resolusi <= batas, lalu ukuran terkecil, lalu protokol https
+# (lebih cepat dari HLS/DASH) dan bitrate terkecil
+YTDLP_FORMAT_SORT = [f"res:{YTDLP_MAX_HEIGHT}", "+size", "proto", "+br"]
+# Potong unduhan non-fragmen per 10 MB agar tidak dithrottle server
+YTDLP_HTTP_CHUNK_SIZE = 10 * 1024 * 1024
+
+# =========================================================
+# FUNGSI YT-DLP
+# =========================================================
+
+def is_supported(url):
+    """True jika ada extractor yt-dlp khusus (bukan Generic) untuk URL ini."""
+    for extractor in gen_extractor_classes():
+        if extractor.ie_key() != "Generic" and extractor.suitable(url):
+            return True
+    return False
+
+
+def build_options(dest_dir, progress_hook=None):
+    options = {
+        "format": YTDLP_FORMAT,
+        "format_sort": YTDLP_FORMAT_SORT,
+        "concurrent_fragment_downloads": YTDLP_FRAGMENTS,
+        "http_chunk_size": YTDLP_HTTP_CHUNK_SIZE,
+        "merge_output_format": "mp4",
+        "outtmpl": {"default": os.path.join(dest_dir, "%(title).150B [%(id)s].%(ext)s")},
+        "restrictfilenames": True,
+        "noplaylist": True,
+        "retries": 10,
+        "fragment_retries": 10,
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+        "progress_hooks": [progress_hook] if progress_hook else [],
+    }
+    if os.path.exists(YTDLP_COOKIES_FILE):
+        options["cookiefile"] = YTDLP_COOKIES_FILE
+    return options
+
+
+def download(url, dest_dir, progress_callback=None):
+    """
+    Mengunduh video ke dest_dir dan mengembalikan path file final.
+    progress_callback(downloaded_bytes, total_bytes) dipanggil dari progress hook.
+    """
+    def hook(status):
+        if progress_callback and status.get("status") in ("downloading", "finished"):
+            total = status.get("total_bytes") or status.get("total_bytes_estimate")
+            progress_callback(status.get("downloaded_bytes") or 0, total)
+
+    with yt_dlp.YoutubeDL(build_options(dest_dir, hook)) as ydl:
+        info = ydl.extract_info(url, download=True)
+        if info.get("_type") == "playlist":
+            info = (info.get("entries") or [None])[0]
+        if not info:
+            return None
+        downloads = info.get("requested_downloads") or []
+        if downloads and downloads[0].get("filepath"):
+            return downloads[0]["filepath"]
+        return ydl.prepare_filename(info)